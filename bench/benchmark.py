@@ -0,0 +1,277 @@
+#!/usr/bin/env python
+from __future__ import print_function
+
+__doc__ = '''
+Series2Folder benchmarks
+
+Runs the Series2Folder scanning, classification and move code
+outside enigma, using the stub enigma modules in bench/stubs,
+against synthetic recording directories.
+
+Usage:
+    python bench/benchmark.py [--recordings N] [--series N] ...
+
+For each pass it reports the wall time, the number of filesystem
+calls made through the os module and open(), and the peak Python
+memory allocated.
+
+Filesystem calls made inside the os.DirEntry methods aren't
+visible to Python, so they aren't counted.
+'''
+
+import argparse
+import gc
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+
+try:
+    import builtins
+except ImportError:
+    import __builtin__ as builtins
+
+BENCHDIR = os.path.dirname(os.path.abspath(__file__))
+PLUGINDIR = os.path.join(os.path.dirname(BENCHDIR), "plugin")
+sys.path.insert(0, os.path.join(BENCHDIR, "stubs"))
+
+builtins._ = lambda s: s
+builtins.ngettext = lambda singular, plural, n: singular if n == 1 else plural
+
+import enigma
+import NavigationInstance
+import Tools.Directories
+from Components.UsageConfig import _movie_path
+
+
+def loadPlugin():
+    import importlib.util
+    import Plugins.Extensions
+    name = "Plugins.Extensions.Series2Folder"
+    spec = importlib.util.spec_from_file_location(name, os.path.join(PLUGINDIR, "__init__.py"), submodule_search_locations=[PLUGINDIR])
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    import Plugins.Extensions.Series2Folder.plugin as plugin
+    return plugin
+
+
+# Synthetic recording directories
+
+CHANNELS = ("ABC", "SBS", "Seven", "Nine", "TEN")
+STYLES = ("short", "standard", "long", "event")
+
+
+def recordingName(style, show, t, channel, episode):
+    date = time.strftime("%Y%m%d", time.localtime(t))
+    hhmm = time.strftime("%H%M", time.localtime(t))
+    if style == "short":
+        return "%s - %s.ts" % (date, show)
+    if style == "standard":
+        return "%s %s - %s - %s.ts" % (date, hhmm, channel, show)
+    if style == "long":
+        return "%s %s - %s - %s - Episode %d.ts" % (date, hhmm, channel, show, episode)
+    return "%s - %s %s_%d.ts" % (show, date, hhmm, episode)
+
+
+def generate(root, recordings, series, metaFraction, existingFolders, seed):
+    rand = random.Random(seed)
+    os.makedirs(root)
+    shows = ["Series %04d" % i for i in range(series)]
+    for show in rand.sample(shows, min(existingFolders, len(shows))):
+        os.mkdir(os.path.join(root, show))
+    names = set()
+    t = 1420070400
+    for i in range(recordings):
+        show = rand.choice(shows) if rand.random() < 0.8 else "Single %05d" % i
+        channel = rand.choice(CHANNELS)
+        t += rand.randint(1800, 7200)
+        name = recordingName(rand.choice(STYLES), show, t, channel, i)
+        if name in names:
+            continue
+        names.add(name)
+        base = name[:-3]
+        with open(os.path.join(root, name), "wb") as f:
+            f.write(b"\0" * 188)
+        for ext in (".eit", ".ts.ap", ".ts.cuts", ".ts.sc"):
+            if rand.random() < 0.9:
+                open(os.path.join(root, base + ext), "wb").close()
+        if rand.random() < metaFraction:
+            with open(os.path.join(root, name + ".meta"), "w") as f:
+                f.write("1:0:19:1:2:3:4:0:0:0:\n%s\nEpisode %d\n%d\n\n%d\n%d\n" % (show, i, t, 90000 * 1800, 188))
+    return len(names)
+
+
+# Filesystem call counting
+
+COUNTED_OS = ("stat", "lstat", "listdir", "scandir", "rename", "mkdir", "makedirs", "remove", "fstat")
+
+
+class SyscallCounter(object):
+    def __init__(self):
+        self.counts = defaultdict(int)
+        self.lock = threading.Lock()
+        self.saved = []
+
+    def wrap(self, name, func):
+        counts = self.counts
+        lock = self.lock
+
+        def counted(*args, **kwargs):
+            with lock:
+                counts[name] += 1
+            return func(*args, **kwargs)
+        return counted
+
+    def install(self, plugin):
+        for name in COUNTED_OS:
+            if hasattr(os, name):
+                self.patch(os, name, self.wrap(name, getattr(os, name)))
+        if plugin.scandir is not None:
+            self.patch(plugin, "scandir", os.scandir)
+        self.patch(builtins, "open", self.wrap("open", builtins.open))
+
+    def patch(self, obj, name, value):
+        self.saved.append((obj, name, getattr(obj, name)))
+        setattr(obj, name, value)
+
+    def uninstall(self):
+        while self.saved:
+            obj, name, value = self.saved.pop()
+            setattr(obj, name, value)
+
+    def total(self):
+        return sum(self.counts.values())
+
+
+# Minimal session for the action classes
+
+class Session(object):
+    current_dialog = None
+    dialog_stack = []
+
+    def __init__(self):
+        self.nav = NavigationInstance.instance
+        self.opened = []
+
+    def open(self, *args, **kwargs):
+        self.opened.append((args, kwargs))
+
+
+class Quiet(object):
+    def __enter__(self):
+        self.stdout = sys.stdout
+        sys.stdout = open(os.devnull, "w")
+
+    def __exit__(self, *args):
+        sys.stdout.close()
+        sys.stdout = self.stdout
+
+
+def runManual(plugin):
+    actions = plugin.Series2FolderActions(Session())
+    actions.doMoves()
+    while actions.prefetchTimer.isActive():
+        time.sleep(0.001)
+        enigma.runMainLoop(limit=1)
+    return actions
+
+
+def runBackground(plugin):
+    actions = plugin.Series2FolderAutoActions(Session())
+    actions.runMoves()
+    while actions.iterTimer.isActive() or actions.runTimer.isActive():
+        enigma.runMainLoop(limit=1)
+    actions.fullScanTimer.stop()
+    return actions
+
+
+def micro(plugin, root):
+    actions = plugin.Series2FolderActions(Session())
+    actions.prepare(None)
+    actions.rootdir = root
+    entries = actions.listDir(root)
+    names = [entry.name for entry in entries]
+    recordings = [f for f in names if f.endswith(".ts")]
+    return (
+        ("recNameType", len(names), lambda: [actions.recNameType(f) for f in names]),
+        ("recSplit", len(recordings), lambda: [actions.recSplit(f) for f in recordings]),
+        ("getShowInfo", len(recordings), lambda: [actions.getShowInfo(root, f) for f in recordings]),
+        ("getShowInfo (cached)", len(recordings), lambda: [actions.getShowInfo(root, f) for f in recordings]),
+        ("addRecording", len(entries), lambda: [actions.addRecording(entry) for entry in entries]),
+    )
+
+
+def clearMetaCache(plugin):
+    plugin.metaCache.waitSaved()
+    plugin.metaCache.entries.clear()
+    plugin.metaCache.loaded = True
+    plugin.metaCache.dirty = False
+
+
+def measure(label, func, plugin, items):
+    counter = SyscallCounter()
+    gc.collect()
+    with Quiet():
+        tracemalloc.start()
+        counter.install(plugin)
+        start = time.time()
+        try:
+            result = func()
+        finally:
+            elapsed = time.time() - start
+            counter.uninstall()
+            __, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+    print("%-22s %8d items %9.3f s %9.1f us/item %8d fs calls  peak %7.1f KiB" % (
+        label, items, elapsed, elapsed * 1e6 / max(items, 1), counter.total(), peak / 1024.0))
+    if counter.counts:
+        print("    " + ", ".join("%s=%d" % kv for kv in sorted(counter.counts.items())))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Series2Folder benchmarks")
+    parser.add_argument("--recordings", type=int, default=5000, help="number of recordings to generate")
+    parser.add_argument("--series", type=int, default=200, help="number of distinct series")
+    parser.add_argument("--meta", type=float, default=0.8, help="fraction of recordings with a .meta file")
+    parser.add_argument("--existing", type=int, default=20, help="number of existing series folders")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--passes", default="micro,manual,background", help="comma-separated passes to run")
+    parser.add_argument("--keep", action="store_true", help="keep the generated directories")
+    args = parser.parse_args()
+
+    plugin = loadPlugin()
+    work = tempfile.mkdtemp(prefix="s2f-bench-")
+    Tools.Directories._configDir[0] = os.path.join(work, "config")
+    try:
+        for passName in args.passes.split(','):
+            root = os.path.join(work, passName, "movie") + os.sep
+            n = generate(root, args.recordings, args.series, args.meta, args.existing, args.seed)
+            _movie_path[0] = root
+            clearMetaCache(plugin)
+            print("%s: %d recordings in %s" % (passName, n, root))
+            if passName == "micro":
+                for name, items, func in micro(plugin, root):
+                    measure(name, func, plugin, items)
+            elif passName == "manual":
+                measure("manual doMoves", lambda: runManual(plugin), plugin, n)
+            elif passName == "background":
+                measure("background runMoves", lambda: runBackground(plugin), plugin, n)
+            else:
+                print("Unknown pass:", passName)
+    finally:
+        plugin.metaCache.waitSaved()
+        if args.keep:
+            print("Directories kept in", work)
+        else:
+            shutil.rmtree(work, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
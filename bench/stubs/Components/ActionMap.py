@@ -0,0 +1,3 @@
+class ActionMap(object):
+    def __init__(self, *args, **kwargs):
+        pass
@@ -0,0 +1,3 @@
+class ConfigListScreen(object):
+    def __init__(self, list, session=None):
+        self.list = list
@@ -0,0 +1,6 @@
+class Label(object):
+    def __init__(self, text=""):
+        self.text = text
+
+    def setText(self, text):
+        self.text = text
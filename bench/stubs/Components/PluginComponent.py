@@ -0,0 +1,12 @@
+class _Plugins(object):
+    def __init__(self):
+        self.pluginList = []
+
+    def addPlugin(self, p):
+        self.pluginList.append(p)
+
+    def removePlugin(self, p):
+        self.pluginList.remove(p)
+
+
+plugins = _Plugins()
@@ -0,0 +1,3 @@
+class Boolean(object):
+    def __init__(self, fixed=False):
+        self.boolean = fixed
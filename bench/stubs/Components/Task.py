@@ -0,0 +1,35 @@
+class Job(object):
+    def __init__(self, name):
+        self.name = name
+        self.tasks = []
+        self.state_changed = []
+
+    def addTask(self, task):
+        self.tasks.append(task)
+
+
+class Task(object):
+    def __init__(self, job, name):
+        self.job = job
+        self.name = name
+        self.pos = 0
+        self.end = 100
+        job.addTask(self)
+
+
+class PythonTask(Task):
+    pass
+
+
+class JobManager(object):
+    def __init__(self):
+        self.active_jobs = []
+
+    def getPendingJobs(self):
+        return list(self.active_jobs)
+
+    def AddJob(self, job, onSuccess=None, onFail=None):
+        self.active_jobs.append(job)
+
+
+job_manager = JobManager()
@@ -0,0 +1,5 @@
+_movie_path = ["/tmp/"]
+
+
+def defaultMoviePath():
+    return _movie_path[0]
@@ -0,0 +1,59 @@
+class ConfigElement(object):
+    def __init__(self, default=None):
+        self.value = default
+        self.default = default
+        self.notifiers = []
+
+    def addNotifier(self, notifier, initial_call=True, immediate_feedback=True, extra_args=None):
+        self.notifiers.append(notifier)
+
+    def removeNotifier(self, notifier):
+        self.notifiers.remove(notifier)
+
+    def save(self):
+        pass
+
+
+class ConfigSelection(ConfigElement):
+    def __init__(self, choices, default=None):
+        ConfigElement.__init__(self, default if default is not None else choices[0][0])
+
+
+class ConfigYesNo(ConfigElement):
+    def __init__(self, default=False):
+        ConfigElement.__init__(self, default)
+
+
+ConfigEnableDisable = ConfigYesNo
+ConfigOnOff = ConfigYesNo
+
+
+class ConfigText(ConfigElement):
+    def __init__(self, default="", fixed_size=True, visible_width=False, show_help=True):
+        ConfigElement.__init__(self, default)
+        self.show_help = show_help
+
+
+class ConfigInteger(ConfigElement):
+    def __init__(self, default=0, limits=None):
+        ConfigElement.__init__(self, default)
+
+
+class ConfigSubsection(object):
+    pass
+
+
+class ConfigLocations(ConfigElement):
+    pass
+
+
+def getConfigListEntry(*args):
+    return args
+
+
+config = ConfigSubsection()
+config.plugins = ConfigSubsection()
+config.timeshift = ConfigSubsection()
+config.timeshift.isRecording = ConfigYesNo(default=False)
+config.movielist = ConfigSubsection()
+config.movielist.videodirs = ConfigLocations(default=[])
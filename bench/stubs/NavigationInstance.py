@@ -0,0 +1,21 @@
+class _RecordTimer(object):
+    def __init__(self):
+        self.timer_list = []
+        self.processed_timers = []
+
+
+class _Navigation(object):
+    def __init__(self):
+        self.record_event = []
+        self.event = []
+        self.RecordTimer = _RecordTimer()
+        self.playing = None
+
+    def getCurrentlyPlayingServiceReference(self):
+        return self.playing
+
+    def getRecordings(self):
+        return []
+
+
+instance = _Navigation()
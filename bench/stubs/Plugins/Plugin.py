@@ -0,0 +1,7 @@
+class PluginDescriptor(object):
+    WHERE_MOVIELIST = 1
+    WHERE_SESSIONSTART = 2
+    WHERE_PLUGINMENU = 3
+
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
@@ -0,0 +1,5 @@
+from Screens.Screen import Screen
+
+
+class ChoiceBox(Screen):
+    pass
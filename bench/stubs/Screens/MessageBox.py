@@ -0,0 +1,8 @@
+from Screens.Screen import Screen
+
+
+class MessageBox(Screen):
+    TYPE_YESNO = 0
+    TYPE_INFO = 1
+    TYPE_WARNING = 2
+    TYPE_ERROR = 3
@@ -0,0 +1,6 @@
+from Screens.Screen import Screen
+
+
+class MovieSelection(Screen):
+    def reloadList(self):
+        pass
@@ -0,0 +1,11 @@
+class Screen(dict):
+    def __init__(self, session, *args, **kwargs):
+        dict.__init__(self)
+        self.session = session
+        self.onClose = []
+        self.onLayoutFinish = []
+        self.title = ""
+
+    def close(self, *args):
+        for f in self.onClose:
+            f()
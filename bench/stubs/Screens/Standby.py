@@ -0,0 +1 @@
+inTryQuitMainloop = False
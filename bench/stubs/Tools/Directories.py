@@ -0,0 +1,11 @@
+import os
+import tempfile
+
+SCOPE_CONFIG = 0
+_configDir = [os.path.join(tempfile.gettempdir(), "s2f-config")]
+
+
+def resolveFilename(scope, base=""):
+    if not os.path.isdir(_configDir[0]):
+        os.makedirs(_configDir[0])
+    return os.path.join(_configDir[0], base)
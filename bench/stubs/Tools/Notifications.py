@@ -0,0 +1,5 @@
+notifications = []
+
+
+def AddNotification(screen, *args, **kwargs):
+    notifications.append((screen, args, kwargs))
@@ -0,0 +1,5 @@
+def getMachineBrand():
+    return "Bench"
+
+def getMachineName():
+    return "Box"
@@ -0,0 +1,97 @@
+import heapq
+import itertools
+
+_timers = []
+_seq = itertools.count()
+_clock = [0.0]
+
+
+class _CallList(list):
+    pass
+
+
+class eTimer(object):
+    def __init__(self):
+        self.callback = _CallList()
+        self.timeout = self.callback
+        self._active = False
+        self._due = None
+        self._single = True
+        self._interval = 0
+
+    def start(self, msec, singleShot=False):
+        self._active = True
+        self._single = singleShot
+        self._interval = msec / 1000.0
+        self._due = _clock[0] + self._interval
+        heapq.heappush(_timers, (self._due, next(_seq), self))
+
+    def startLongTimer(self, sec):
+        self.start(sec * 1000, True)
+
+    def stop(self):
+        self._active = False
+
+    def isActive(self):
+        return self._active
+
+    def _fire(self):
+        if not self._single:
+            self._due = _clock[0] + self._interval
+            heapq.heappush(_timers, (self._due, next(_seq), self))
+        else:
+            self._active = False
+        for cb in list(self.callback):
+            cb()
+
+
+class eSocketNotifier(object):
+    def __init__(self, fd, mask, start=True):
+        self.callback = _CallList()
+        self.activated = self.callback
+
+
+def runMainLoop(limit=None):
+    """Fire pending timers in due order on a simulated clock until none are left."""
+    fired = 0
+    while _timers:
+        due, __, timer = heapq.heappop(_timers)
+        if not timer._active or timer._due != due:
+            continue
+        _clock[0] = max(_clock[0], due)
+        timer._fire()
+        fired += 1
+        if limit is not None and fired >= limit:
+            break
+    return fired
+
+
+class iRecordableService(object):
+    evRecordStopped = 1
+
+
+class iPlayableService(object):
+    evEnd = 2
+
+
+class ePoint(object):
+    def __init__(self, x, y):
+        self.x, self.y = x, y
+
+
+class eServiceReference(object):
+    isDirectory = 1
+    flagDirectory = 7
+
+    def __init__(self, *args):
+        self.path = args[-1] if args else ""
+        self.flags = 0
+
+    def valid(self):
+        return True
+
+    def getPath(self):
+        return self.path
+
+    def toString(self):
+        return "1:0:0:0:0:0:0:0:0:0:" + self.path
@@ -0,0 +1,9 @@
+import sys
+PY2 = sys.version_info[0] == 2
+def iteritems(d):
+    return iter(d.items())
+def itervalues(d):
+    return iter(d.values())
+string_types = (str,)
+text_type = str
+binary_type = bytes
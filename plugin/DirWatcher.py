@@ -0,0 +1,146 @@
+import ctypes
+import ctypes.util
+import errno
+import os
+import struct
+
+from enigma import eSocketNotifier
+
+# DirWatcher is a minimal interface to the Linux inotify API,
+# integrated with the enigma main loop through an eSocketNotifier
+# on the inotify file descriptor.
+
+# callback is called in the main loop as callback(dir, name, mask)
+# for each inotify event on a watched directory, where dir is the
+# watched directory, name is the name of the file or directory in
+# dir that the event refers to (an empty string for events on
+# the directory itself), and mask is the inotify event mask.
+
+# If the kernel's event queue overflows, callback is called with
+# dir and name both None and IN_Q_OVERFLOW set in mask.
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+# inotify_init1() flags are the same as the corresponding open()
+# flags, which differ between architectures
+
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+
+POLLIN = 1
+
+_EVENT_HEADER = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+_libc = None
+
+
+def _getLibc():
+    global _libc
+    if _libc is None:
+        _libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        _libc.inotify_init1.argtypes = (ctypes.c_int, )
+        _libc.inotify_add_watch.argtypes = (ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32)
+        _libc.inotify_rm_watch.argtypes = (ctypes.c_int, ctypes.c_int)
+    return _libc
+
+
+def isAvailable():
+    try:
+        return hasattr(_getLibc(), "inotify_init1")
+    except (OSError, AttributeError):
+        return False
+
+
+def _fsEncode(path):
+    return path.encode("utf-8") if not isinstance(path, bytes) else path
+
+
+def _fsDecode(name):
+    return name.decode("utf-8", "surrogateescape") if str is not bytes else name
+
+
+class DirWatcher(object):
+    def __init__(self, callback):
+        self.callback = callback
+        self.fd = -1
+        self.notifier = None
+        self.watches = {}
+
+    def start(self):
+        if self.fd >= 0:
+            return
+        libc = _getLibc()
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self.fd = fd
+        self.notifier = eSocketNotifier(fd, POLLIN)
+        self.notifier.callback.append(self.__readEvents)
+
+    def stop(self):
+        if self.notifier is not None:
+            self.notifier.callback.remove(self.__readEvents)
+            self.notifier = None
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+        self.watches.clear()
+
+    def isWatching(self, path):
+        return path in self.watches.values()
+
+    def addWatch(self, path, mask):
+        wd = _getLibc().inotify_add_watch(self.fd, _fsEncode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        self.watches[wd] = path
+        return wd
+
+    def removeWatch(self, path):
+        for wd, watched in list(self.watches.items()):
+            if watched == path:
+                _getLibc().inotify_rm_watch(self.fd, wd)
+                del self.watches[wd]
+
+    def __readEvents(self, fd=None):
+        while self.fd >= 0:
+            try:
+                data = os.read(self.fd, _READ_SIZE)
+            except OSError as e:
+                if e.errno in (errno.EAGAIN, errno.EINTR):
+                    break
+                raise
+            if not data:
+                break
+            self.__dispatch(memoryview(data))
+
+    def __dispatch(self, data):
+        pos = 0
+        end = len(data)
+        headerSize = _EVENT_HEADER.size
+        while pos + headerSize <= end:
+            wd, mask, cookie, length = _EVENT_HEADER.unpack_from(data, pos)
+            pos += headerSize
+            name = _fsDecode(data[pos:pos + length].tobytes().rstrip(b"\0"))
+            pos += length
+            if mask & IN_Q_OVERFLOW:
+                self.callback(None, None, mask)
+                continue
+            dir = self.watches.get(wd)
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+            if dir is not None:
+                self.callback(dir, name, mask)
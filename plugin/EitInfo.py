@@ -0,0 +1,181 @@
+import re
+import struct
+
+# EitInfo holds the information that Series2Folder uses from a
+# recording's .eit file, which holds the DVB EIT event for the
+# recording:
+#   duration  the event's duration in seconds
+#   genre     the event's level 1 content nibble (0-15) from
+#             its content descriptor, or None
+#   season    the season (series) number, or None
+#   episode   the episode number, or None
+#
+# The season and episode numbers are found in the event's name and
+# the texts of its short and extended event descriptors, in forms
+# like "S02E05", "S2 Ep5", "Series 2, Episode 5" or "Ep. 5".
+#
+# The .eit file is an EIT event section without the table
+# header: a 12-byte event header followed by the descriptors.
+# The descriptors are walked with struct, one descriptor at a
+# time, and only their text is decoded, from a memoryview of the
+# file data.
+
+GENRE_NAMES = {
+    0x1: "movie",
+    0x2: "news",
+    0x3: "show",
+    0x4: "sports",
+    0x5: "children",
+    0x6: "music",
+    0x7: "arts",
+    0x8: "social",
+    0x9: "education",
+    0xA: "leisure",
+}
+
+EVENT_HEADER = struct.Struct(">H5s3sH")
+DESCRIPTOR_HEADER = struct.Struct(">BB")
+SHORT_EVENT_DESCRIPTOR = 0x4D
+EXTENDED_EVENT_DESCRIPTOR = 0x4E
+CONTENT_DESCRIPTOR = 0x54
+MAX_EIT_SIZE = 4096
+
+# Text encodings selected by the first byte of a DVB text
+# (EN 300 468 annex A). Texts without a selection byte use
+# ISO/IEC 6937, which is read as Latin-1: its letters without
+# diacritical marks are the same.
+_TEXT_ENCODINGS = dict((i, "iso-8859-%d" % (i + 4)) for i in range(0x01, 0x0C))
+_TEXT_ENCODINGS.update({
+    0x11: "utf-16-be",
+    0x12: "euc-kr",
+    0x13: "gb2312",
+    0x14: "big5",
+    0x15: "utf-8",
+})
+_DEFAULT_ENCODING = "latin-1"
+
+# DVB control codes for emphasis and line breaks
+_CONTROL_CODES = dict.fromkeys((0x86, 0x87, 0xE086, 0xE087), None)
+_CONTROL_CODES.update(dict.fromkeys((0x8A, 0xE08A), u' '))
+
+_seasonEpisode = [re.compile(pattern, re.IGNORECASE | re.UNICODE) for pattern in (
+    r"\bS(?P<season>\d{1,2}) ?E(?P<episode>\d{1,3})\b",
+    r"\b(?:S|Season|Series)\.? ?(?P<season>\d{1,2})\b[,:;.]? ?(?:-\s*)?(?:E|Ep|Episode)\.? ?(?P<episode>\d{1,3})\b",
+    r"\b(?:Season|Series) (?P<season>\d{1,2})\b",
+    r"\b(?:Ep|Episode)\.? ?(?P<episode>\d{1,3})\b",
+)]
+
+
+class EitInfo(object):
+    __slots__ = ("duration", "genre", "season", "episode")
+
+    def __init__(self, duration, genre, season=None, episode=None):
+        self.duration = duration
+        self.genre = genre
+        self.season = season
+        self.episode = episode
+
+    def genreName(self):
+        return GENRE_NAMES.get(self.genre, "")
+
+    # Conversion to and from a tuple of plain values, for MetaCache
+
+    def toTuple(self):
+        return (self.duration, self.genre, self.season, self.episode)
+
+    @classmethod
+    def fromTuple(cls, t):
+        duration, genre, season, episode = t
+        return cls(duration, genre, season, episode)
+
+
+def _bcd(b):
+    return (b >> 4) * 10 + (b & 0x0F)
+
+
+# Decode a DVB text from a memoryview of its bytes
+
+def decodeText(text):
+    if not len(text):
+        return u""
+    first = bytearray(text[0:1])[0]
+    encoding = _DEFAULT_ENCODING
+    if first < 0x20:
+        if first == 0x10 and len(text) >= 3:
+            encoding = "iso-8859-%d" % bytearray(text[2:3])[0]
+            text = text[3:]
+        else:
+            encoding = _TEXT_ENCODINGS.get(first, _DEFAULT_ENCODING)
+            text = text[1:]
+    try:
+        decoded = text.tobytes().decode(encoding, "replace")
+    except LookupError:
+        decoded = text.tobytes().decode(_DEFAULT_ENCODING)
+    return decoded.translate(_CONTROL_CODES)
+
+
+# Find the season and episode numbers in an event's texts.
+# Returns (season, episode), either of which may be None.
+
+def findSeasonEpisode(texts):
+    season = episode = None
+    for text in texts:
+        for pattern in _seasonEpisode:
+            m = pattern.search(text)
+            if m:
+                groups = m.groupdict()
+                if season is None and groups.get("season"):
+                    season = int(groups["season"])
+                if episode is None and groups.get("episode"):
+                    episode = int(groups["episode"])
+                if season is not None and episode is not None:
+                    return season, episode
+    return season, episode
+
+
+# Read the EitInfo for a .eit file. Raises IOError or OSError if
+# the file can't be read, and ValueError if it isn't a valid
+# .eit file.
+
+def readEit(path):
+    with open(path, "rb") as f:
+        data = f.read(MAX_EIT_SIZE)
+    if len(data) < EVENT_HEADER.size:
+        raise ValueError("Incomplete eit file: %s" % path)
+    return parseEit(data)
+
+
+def parseEit(data):
+    view = memoryview(data)
+    eventId, start, duration, loopLength = EVENT_HEADER.unpack_from(data, 0)
+    duration = bytearray(duration)
+    duration = _bcd(duration[0]) * 3600 + _bcd(duration[1]) * 60 + _bcd(duration[2])
+    genre = None
+    name = shortText = u""
+    extended = []
+    pos = EVENT_HEADER.size
+    end = min(len(data), pos + (loopLength & 0x0FFF))
+    while pos + DESCRIPTOR_HEADER.size <= end:
+        tag, length = DESCRIPTOR_HEADER.unpack_from(data, pos)
+        body = pos + DESCRIPTOR_HEADER.size
+        pos = body + length
+        if pos > end:
+            break
+        if tag == SHORT_EVENT_DESCRIPTOR and length >= 5:
+            nameLength = struct.unpack_from(">B", data, body + 3)[0]
+            textStart = body + 4 + nameLength
+            if textStart < pos:
+                name = decodeText(view[body + 4:textStart])
+                textLength = struct.unpack_from(">B", data, textStart)[0]
+                shortText = decodeText(view[textStart + 1:min(textStart + 1 + textLength, pos)])
+        elif tag == EXTENDED_EVENT_DESCRIPTOR and length >= 6:
+            number, itemsLength = struct.unpack_from(">B3xB", data, body)
+            textStart = body + 5 + itemsLength
+            if textStart < pos:
+                textLength = struct.unpack_from(">B", data, textStart)[0]
+                extended.append((number >> 4, view[textStart + 1:min(textStart + 1 + textLength, pos)]))
+        elif tag == CONTENT_DESCRIPTOR and length >= 2 and genre is None:
+            genre = struct.unpack_from(">B", data, body)[0] >> 4
+    extendedText = u"".join(decodeText(text) for number, text in sorted(extended, key=lambda e: e[0]))
+    season, episode = findSeasonEpisode((name, shortText, extendedText))
+    return EitInfo(duration, genre, season, episode)
@@ -0,0 +1,149 @@
+from __future__ import print_function
+
+import errno
+import os
+from os.path import dirname, isdir, lexists
+import shutil
+
+from Components.Task import Job, PythonTask
+
+# FileMover moves recordings to folders on a different filesystem
+# from the recording folder, where os.rename() can't be used.
+
+# The files are copied in a Components.Task job, so the copy runs
+# in a worker thread and its progress is shown in the task list.
+# All of a recording's files are first copied to temporary names
+# in the destination folder, and their sizes checked. Only then
+# are they renamed to their final names and the originals deleted,
+# so an interrupted move leaves the original recording in place.
+# A recording that can't be moved doesn't stop the moves of the
+# others. The errors for all the recordings that couldn't be moved
+# are reported together when the job ends.
+
+COPY_CHUNK = 8 * 1024 * 1024
+PART_EXT = ".s2f-part"
+
+
+# Copy the file src to dst using the kernel's copy_file_range()
+# or sendfile() where they are available, otherwise a buffered
+# copy. progress(n) is called after each block of n bytes is
+# copied. The copy is abandoned if aborted() returns True.
+
+def copyFile(src, dst, progress=None, aborted=None):
+    with open(src, "rb") as fsrc:
+        size = os.fstat(fsrc.fileno()).st_size
+        with open(dst, "wb") as fdst:
+            infd = fsrc.fileno()
+            outfd = fdst.fileno()
+            copied = 0
+            copyChunk = _kernelCopy
+            while copied < size:
+                if aborted and aborted():
+                    raise IOError(errno.ECANCELED, "Move cancelled", src)
+                n = None
+                if copyChunk:
+                    try:
+                        n = copyChunk(infd, outfd, copied, COPY_CHUNK)
+                    except OSError as e:
+                        if e.errno not in (errno.ENOSYS, errno.EINVAL, errno.EXDEV, errno.EOPNOTSUPP):
+                            raise
+                        copyChunk = None
+                if n is None:
+                    fsrc.seek(copied)
+                    fdst.seek(copied)
+                    buf = fsrc.read(COPY_CHUNK)
+                    fdst.write(buf)
+                    n = len(buf)
+                if not n:
+                    break
+                copied += n
+                if progress:
+                    progress(n)
+            fdst.flush()
+    if os.stat(dst).st_size != size:
+        raise IOError(errno.EIO, "Copied file is the wrong size", dst)
+    try:
+        shutil.copystat(src, dst)
+    except (IOError, OSError):
+        pass
+
+
+def _copyFileRange(infd, outfd, offset, count):
+    return os.copy_file_range(infd, outfd, count, offset, offset)
+
+
+def _sendFile(infd, outfd, offset, count):
+    os.lseek(outfd, offset, os.SEEK_SET)
+    return os.sendfile(outfd, infd, offset, count)
+
+
+if hasattr(os, "copy_file_range"):
+    _kernelCopy = _copyFileRange
+elif hasattr(os, "sendfile"):
+    _kernelCopy = _sendFile
+else:
+    _kernelCopy = None
+
+
+class MoveError(Exception):
+    def __init__(self, errors):
+        Exception.__init__(self, "\n".join(errors))
+        self.errors = errors
+
+
+class MoveTask(PythonTask):
+    def __init__(self, job, groups):
+        PythonTask.__init__(self, job, _("Moving recordings"))
+        self.groups = groups
+
+    def addProgress(self, n):
+        self.pos += n
+
+    def isAborted(self):
+        return getattr(self, "aborted", False)
+
+    def work(self):
+        self.end = max(1, sum(os.path.getsize(fromPath) for group in self.groups for fromPath, toPath in group if lexists(fromPath)))
+        self.pos = 0
+        errors = []
+        for group in self.groups:
+            try:
+                self.moveGroup(group)
+            except (IOError, OSError) as e:
+                if e.errno == errno.ECANCELED:
+                    raise
+                print("[Series2Folder] Can't move", group[0][0], e)
+                errors.append(str(e))
+        if errors:
+            raise MoveError(errors)
+
+    def moveGroup(self, group):
+        parts = []
+        try:
+            for fromPath, toPath in group:
+                if lexists(toPath):
+                    raise OSError(errno.EEXIST, os.strerror(errno.EEXIST), toPath)
+                destDir = dirname(toPath)
+                if not isdir(destDir):
+                    os.makedirs(destDir)
+                partPath = toPath + PART_EXT
+                parts.append((partPath, toPath))
+                copyFile(fromPath, partPath, self.addProgress, self.isAborted)
+        except Exception:
+            for partPath, toPath in parts:
+                try:
+                    os.remove(partPath)
+                except OSError:
+                    pass
+            raise
+        for partPath, toPath in parts:
+            os.rename(partPath, toPath)
+        for fromPath, toPath in group:
+            os.remove(fromPath)
+            print("[Series2Folder] moved", fromPath, "to", toPath)
+
+
+class MoveJob(Job):
+    def __init__(self, groups):
+        Job.__init__(self, _("Series2Folder move recordings"))
+        MoveTask(self, groups)
@@ -1,6 +1,7 @@
 from collections import defaultdict
-import importlib
 import six
+import sys
+import threading
 
 # fileScreens is a simple database controlling how Series2Folder interacts
 # with other classes that view or manipulate the filesystem.
@@ -23,24 +24,92 @@ import six
 # If refreshMethodName is None, then the entry is only used for
 # preventing Series2Folder from running when the screen is active.
 
+# The template modules aren't imported by Series2Folder. A screen
+# can only be open if its module has been imported by its own
+# plugin, so a template is resolved from sys.modules when its module
+# has been loaded, and until then it can't match any open screen.
+# Other plugins can add their screens with registerFileScreen().
+
+# activeFileScreens() is called for each background run step, so
+# the refresh methods for each screen class are looked up once and
+# remembered in __typeActions until the registry changes.
+
 fileScreens = defaultdict(tuple)
 
-__fileScreenTemplates = (
+__fileScreenTemplates = [
     ("Screens.MovieSelection", ("MovieSelection", ), "reloadList"),
     ("Plugins.Extensions.EnhancedMovieCenter.MovieSelection", ("EMCSelection", ), "triggerReloadList"),
     ("Plugins.Extensions.AdvancedMovieselection.MovieSelection", ("MovieSelection", ), "reloadList"),
     ("Plugins.Extensions.SerienFilm.MovieSelection", ("MovieSelection", ), "reloadList"),
     ("Plugins.Extensions.FileCommander.plugin", ("FileCommanderScreen", "FileCommanderScreenFileSelect"), None),
     ("Plugins.Extensions.Filebrowser.plugin", ("FilebrowserScreen",), None),
-)
+]
+
+__typeActions = {}
+__lock = threading.Lock()
+
+# The number of loaded modules when the templates were last checked
+__modulesSeen = None
+
+
+# Register a screen class that shows or changes the recordings.
+# Series2Folder doesn't run in the background while it's open, and
+# after a manual run its refreshMethodName method is called, if it
+# isn't None, to update it.
+# The class can be given as a class or, to avoid importing its
+# module before it's needed, as a string "moduleName.className".
+
+def registerFileScreen(screenClass, refreshMethodName=None):
+    global __modulesSeen
+    with __lock:
+        if isinstance(screenClass, six.string_types):
+            moduleName, className = screenClass.rsplit('.', 1)
+            __fileScreenTemplates.append((moduleName, (className, ), refreshMethodName))
+            __modulesSeen = None
+        else:
+            __addScreenClass(screenClass, refreshMethodName)
+
+
+def __addScreenClass(screenClass, refreshMethodName):
+    if screenClass not in fileScreens[refreshMethodName]:
+        fileScreens[refreshMethodName] += (screenClass, )
+        __typeActions.clear()
+
+
+# Move the templates whose modules have been loaded into fileScreens
+
+def __resolveTemplates():
+    global __modulesSeen
+    if __modulesSeen == len(sys.modules):
+        return
+    __modulesSeen = len(sys.modules)
+    if not any(moduleName in sys.modules for moduleName, classNames, refreshMethod in __fileScreenTemplates):
+        return
+    with __lock:
+        pending = []
+        for template in __fileScreenTemplates:
+            moduleName, classNames, refreshMethod = template
+            mod = sys.modules.get(moduleName)
+            if mod is None:
+                pending.append(template)
+                continue
+            for className in classNames:
+                screenClass = getattr(mod, className, None)
+                if screenClass is not None:
+                    __addScreenClass(screenClass, refreshMethod)
+        __fileScreenTemplates[:] = pending
+
+
+# The refresh method names registered for a screen class,
+# including None if any are registered only to defer background
+# runs.
 
-for moduleName, classNames, refreshMethod in __fileScreenTemplates:
-    for className in classNames:
-        try:
-            mod = importlib.import_module(moduleName)
-            fileScreens[refreshMethod] += (getattr(mod, className), )
-        except (ImportError, AttributeError):
-            pass
+def __actionsFor(screenType):
+    actions = __typeActions.get(screenType)
+    if actions is None:
+        actions = tuple(action for action, screenClasses in list(fileScreens.items()) if issubclass(screenType, screenClasses))
+        __typeActions[screenType] = actions
+    return actions
 
 # activeFileScreens() is a convenience function for accessing
 # fileScreens.
@@ -55,6 +124,7 @@ def activeFileScreens(session, allScreens):
     current_dialog = session.current_dialog
     activeScreens = []
     if current_dialog:
+        __resolveTemplates()
         for dialog in (current_dialog, ) + tuple(dse[0] for dse in reversed(session.dialog_stack)):
-            activeScreens += [(dialog, action) for action, screenClasses in six.iteritems(fileScreens) if (allScreens or action is not None) and isinstance(dialog, screenClasses)]
+            activeScreens += [(dialog, action) for action in __actionsFor(dialog.__class__) if allScreens or action is not None]
     return activeScreens
@@ -0,0 +1,344 @@
+import re
+from string import Formatter
+
+from .EitInfo import GENRE_NAMES
+
+# FolderRules routes recordings to destination folders using a
+# table of rules, read from a text file with one rule per line:
+#   condition; condition ... => folder template
+# Blank lines and lines starting with # are ignored.
+#
+# A rule's conditions must all hold for the rule to match, and
+# the first rule in the file that matches a recording gives its
+# folder. The conditions are:
+#   title: regex        the show name contains a match for regex
+#                       (case is ignored)
+#   channel: a, b ...   the channel name in the file name is one of
+#                       the names (case is ignored)
+#   service: a, b ...   the recording's service reference is one of
+#                       the references
+#   tag: a, b ...       the recording has one of the tags
+#   genre: a, b ...     the genre in the .eit file is one of the
+#                       genres, either a name from GENRE_NAMES or the
+#                       DVB content nibble number
+#   duration: <N, >N or N-M
+#                       the duration in the .eit file is less than
+#                       N, more than N or from N to M minutes
+#
+# The folder template is a path relative to the destination root,
+# and may use these placeholders:
+#   {series}   the series folder name
+#   {title}    the show name
+#   {channel}  the channel name
+#   {genre}    the genre name
+#   {year}     the year of the recording
+#   {season}   the season number from the .eit file
+#   {episode}  the episode number from the .eit file
+# {season} and {episode} are numbers, so they can be formatted,
+# e.g. {season:02d}. A folder level that uses a placeholder that
+# has no value for the recording is left out.
+# For example:
+#   title: ^Movie: ; genre: movie => Movies/{year}
+#   channel: ABC Kids, ABC ME => Kids/{series}/Season {season}
+#   duration: <15 => Shorts
+#
+# The rules are compiled into a RuleSet for each run. Rule i is
+# represented by bit i of a mask, and each condition field is
+# compiled into an index from value to the mask of the rules that
+# accept the value, so matching a recording against the whole
+# table is a few dict lookups and mask intersections. The title
+# regexes are combined into a small number of regexes that find
+# all the matching rules in one call, and the mask for each title
+# is remembered, because a series' recordings share a title. The
+# .eit file is only read if the genre or duration are needed to
+# decide the rule.
+
+RULE_SEPARATOR = "=>"
+CONDITION_SEPARATOR = ";"
+VALUE_SEPARATOR = ","
+
+VALUE_FIELDS = ("channel", "service", "tag", "genre")
+FIELDS = ("title", "duration") + VALUE_FIELDS
+EIT_FIELDS = frozenset(("genre", "duration"))
+EIT_PLACEHOLDERS = frozenset(("genre", "season", "episode"))
+PLACEHOLDERS = frozenset(("series", "title", "channel", "genre", "year", "season", "episode"))
+
+# Values used to check folder templates
+_SAMPLE_VALUES = {
+    "series": "", "title": "", "channel": "", "genre": "", "year": "",
+    "season": 1, "episode": 1,
+}
+
+# The maximum number of title regexes combined into one regex.
+# Python limits the number of groups in a regex.
+TITLE_CHUNK = 50
+
+_genreNumbers = dict((name, number) for number, name in GENRE_NAMES.items())
+_durationRange = re.compile(r"^(?:<\s*(?P<below>\d+)|>\s*(?P<above>\d+)|(?P<low>\d+)\s*-\s*(?P<high>\d+))$")
+
+
+def normalizeService(ref):
+    return ref.strip().rstrip(':').lower()
+
+
+class Rule(object):
+    def __init__(self, lineNo, conditions, template):
+        self.lineNo = lineNo
+        self.conditions = conditions
+        self.template = template
+
+        # The levels of the template and the placeholders in each
+        self.levels = [(level, placeholders(level)) for level in template.split('/')]
+        self.placeholders = placeholders(template)
+
+    # Render the template. Levels that use a placeholder with a
+    # value of None or "" are left out.
+
+    def render(self, values):
+        return '/'.join(
+            level.format(**values) for level, names in self.levels
+            if all(values[name] not in (None, "") for name in names)
+        )
+
+
+def placeholders(template):
+    return frozenset(name for __, name, __, __ in Formatter().parse(template) if name is not None)
+
+
+# Parse a rule line into a Rule. Raises ValueError with a
+# description of the problem if the line isn't a valid rule.
+
+def parseRule(lineNo, line):
+    if RULE_SEPARATOR not in line:
+        raise ValueError(_("no %s and folder") % RULE_SEPARATOR)
+    conditionText, template = line.rsplit(RULE_SEPARATOR, 1)
+    template = template.strip()
+    if not template:
+        raise ValueError(_("no folder"))
+    conditions = {}
+    for condition in conditionText.split(CONDITION_SEPARATOR):
+        condition = condition.strip()
+        if not condition:
+            continue
+        if ':' not in condition:
+            raise ValueError(_("condition without a field: %s") % condition)
+        field, value = condition.split(':', 1)
+        field = field.strip().lower()
+        value = value.strip()
+        if field not in FIELDS:
+            raise ValueError(_("unknown field: %s") % field)
+        if field in conditions:
+            raise ValueError(_("more than one %s condition") % field)
+        if not value:
+            raise ValueError(_("no value for %s") % field)
+        conditions[field] = parseCondition(field, value)
+    try:
+        for __, name, spec, conversion in Formatter().parse(template):
+            if name is None:
+                continue
+            if name not in PLACEHOLDERS:
+                raise ValueError(_("unknown placeholder: {%s}") % name)
+            # {series} is filled in after the rule is matched
+            if name == "series" and (spec or conversion):
+                raise ValueError(_("{series} can't be formatted"))
+        template.format(**_SAMPLE_VALUES)
+    except (ValueError, IndexError, KeyError) as e:
+        raise ValueError(_("bad folder template: %s") % e)
+    return Rule(lineNo, conditions, template)
+
+
+def parseCondition(field, value):
+    if field == "title":
+        try:
+            return re.compile(value, re.IGNORECASE | re.UNICODE)
+        except re.error as e:
+            raise ValueError(_("bad title regex: %s") % e)
+    if field == "duration":
+        m = _durationRange.match(value)
+        if not m:
+            raise ValueError(_("bad duration: %s") % value)
+        if m.group("below") is not None:
+            return (0, int(m.group("below")) * 60 - 1)
+        if m.group("above") is not None:
+            return (int(m.group("above")) * 60 + 1, None)
+        return (int(m.group("low")) * 60, int(m.group("high")) * 60)
+    values = set(v.strip() for v in value.split(VALUE_SEPARATOR) if v.strip())
+    if field == "genre":
+        genres = set()
+        for v in values:
+            genre = _genreNumbers.get(v.lower())
+            if genre is None:
+                try:
+                    genre = int(v, 0)
+                except ValueError:
+                    raise ValueError(_("unknown genre: %s") % v)
+            genres.add(genre)
+        return frozenset(genres)
+    if field == "service":
+        return frozenset(normalizeService(v) for v in values)
+    if field == "channel":
+        return frozenset(v.lower() for v in values)
+    return frozenset(values)
+
+
+# Parse the rules in the lines of a rules file.
+# Returns a RuleSet of the valid rules and a list of error
+# messages for the invalid ones.
+
+def parseRules(lines):
+    rules = []
+    errors = []
+    for lineNo, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            rules.append(parseRule(lineNo, line))
+        except ValueError as e:
+            errors.append(_("Folder rules line %d: %s") % (lineNo, e))
+    return RuleSet(rules), errors
+
+
+class RuleSet(object):
+    def __init__(self, rules):
+        self.rules = rules
+        self.allMask = (1 << len(rules)) - 1
+
+        # For each field, the mask of the rules that don't have a
+        # condition on it
+        self.anyMask = dict((field, self.allMask) for field in FIELDS)
+
+        # For each value field, an index from value to the mask of
+        # the rules that accept the value
+        self.valueMasks = dict((field, {}) for field in VALUE_FIELDS)
+
+        # Masks of the rules for each duration range
+        self.durationMasks = {}
+
+        # Masks of the rules that need the .eit file to decide
+        # whether they match
+        self.eitMask = 0
+
+        titlePatterns = []
+        for i, rule in enumerate(rules):
+            bit = 1 << i
+            for field, condition in rule.conditions.items():
+                self.anyMask[field] &= ~bit
+                if field == "title":
+                    titlePatterns.append((condition, bit))
+                elif field == "duration":
+                    self.durationMasks[condition] = self.durationMasks.get(condition, 0) | bit
+                else:
+                    masks = self.valueMasks[field]
+                    for value in condition:
+                        masks[value] = masks.get(value, 0) | bit
+                if field in EIT_FIELDS:
+                    self.eitMask |= bit
+
+        self.titleRegexes, self.titleSingles = self.compileTitles(titlePatterns)
+
+        # Mask of the rules that match each title seen in the run
+        self.titleMasks = {}
+
+    # Combine the title regexes into regexes that match every
+    # title, with an empty named group for each regex that is
+    # found in the title. Regexes with groups of their own (which
+    # may have backreferences that combining them would break) are
+    # matched one at a time, as are the regexes in a chunk that
+    # can't be combined.
+    # Returns a list of (combined regex, {group name: bit}) and a
+    # list of (regex, bit).
+
+    def compileTitles(self, titlePatterns):
+        combinable = [(pattern, bit) for pattern, bit in titlePatterns if not pattern.groups]
+        singles = [(pattern, bit) for pattern, bit in titlePatterns if pattern.groups]
+        regexes = []
+        for start in range(0, len(combinable), TITLE_CHUNK):
+            chunk = combinable[start:start + TITLE_CHUNK]
+            groupBits = {}
+            parts = []
+            for pattern, bit in chunk:
+                name = "_r%d" % len(groupBits)
+                groupBits[name] = bit
+                parts.append("(?:(?=.*?(?:%s))(?P<%s>))?" % (pattern.pattern, name))
+            try:
+                regexes.append((re.compile(''.join(parts), re.IGNORECASE | re.UNICODE), groupBits))
+            except (re.error, AssertionError, OverflowError):
+                singles += chunk
+        return regexes, singles
+
+    def titleMask(self, title):
+        mask = self.titleMasks.get(title)
+        if mask is None:
+            mask = self.anyMask["title"]
+            for regex, groupBits in self.titleRegexes:
+                for name, found in regex.match(title).groupdict().items():
+                    if found is not None:
+                        mask |= groupBits[name]
+            for pattern, bit in self.titleSingles:
+                if pattern.search(title):
+                    mask |= bit
+            self.titleMasks[title] = mask
+        return mask
+
+    def valueMask(self, field, values):
+        mask = self.anyMask[field]
+        masks = self.valueMasks[field]
+        for value in values:
+            mask |= masks.get(value, 0)
+        return mask
+
+    def durationMask(self, duration):
+        mask = self.anyMask["duration"]
+        if duration is not None:
+            for (low, high), bits in self.durationMasks.items():
+                if low <= duration and (high is None or duration <= high):
+                    mask |= bits
+        return mask
+
+    # The folder template for a recording from the first rule
+    # that matches it, rendered with the recording's values, but
+    # with {series} left in place, or None if no rule matches.
+    # loadEit is called to read the recording's .eit file if it's
+    # needed, and returns an EitInfo or None. cleanValue is applied
+    # to the title and channel before they are put in the folder.
+
+    def folder(self, title, channel, service, tags, year, loadEit, cleanValue=None):
+        candidates = self.allMask
+        candidates &= self.valueMask("channel", (channel.lower(), ) if channel else ())
+        candidates &= self.valueMask("service", (normalizeService(service), ) if service else ())
+        candidates &= self.valueMask("tag", tags)
+        if candidates:
+            candidates &= self.titleMask(title)
+        eit = None
+        eitLoaded = False
+        if candidates & self.eitMask and self.lowest(candidates) & self.eitMask:
+            eit = loadEit()
+            eitLoaded = True
+            candidates &= self.valueMask("genre", (eit.genre, ) if eit and eit.genre is not None else ())
+            candidates &= self.durationMask(eit and eit.duration)
+        if not candidates:
+            return None
+        rule = self.rules[self.lowest(candidates).bit_length() - 1]
+        if rule.placeholders & EIT_PLACEHOLDERS and not eitLoaded:
+            eit = loadEit()
+        return rule.render({
+            "series": "{series}",
+            "title": safeValue(title, cleanValue),
+            "channel": safeValue(channel or "", cleanValue),
+            "genre": eit.genreName() if eit else "",
+            "year": year or "",
+            "season": eit and eit.season,
+            "episode": eit and eit.episode,
+        })
+
+    @staticmethod
+    def lowest(mask):
+        return mask & -mask
+
+
+# Template values can't add folder levels
+
+def safeValue(value, cleanValue=None):
+    value = value.replace('/', '_')
+    return cleanValue(value) if cleanValue else value
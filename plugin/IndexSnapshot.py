@@ -0,0 +1,89 @@
+from __future__ import print_function
+
+import json
+import os
+import six
+
+from Tools.Directories import resolveFilename, SCOPE_CONFIG
+
+# IndexSnapshot saves the background run's index of the recording
+# folders (see Series2FolderAutoActions) after each run and when
+# Series2Folder stops, so that the first run after a restart only
+# needs to look at what changed since, instead of scanning and
+# reading the metadata of every recording again.
+#
+# The snapshot is a dict of plain values:
+#   key      the folders and scan settings the index was built for
+#   folders  for each folder in the index, a list of
+#            [path, mtime, dirs, recordings], where mtime is the
+#            folder's modification time when the index for the
+#            folder was last brought up to date, dirs is the list of
+#            the folders in it, and recordings is the list of the
+#            Recording tuples for the recordings left in it
+#   pending  for each folder, a list of [path, names] of the
+#            recordings waiting for the next run
+#
+# A snapshot may be older than the last changes to the folders, if
+# Series2Folder didn't stop cleanly, so each folder's modification
+# time is checked before its index is used.
+
+class IndexSnapshot(object):
+    VERSION = 1
+    FILENAME = "series2folder.index"
+
+    def __init__(self, filename=None):
+        self.filename = filename
+
+    def getFilename(self):
+        if self.filename is None:
+            self.filename = resolveFilename(SCOPE_CONFIG, self.FILENAME)
+        return self.filename
+
+    # Load the snapshot. Returns None if there is no usable
+    # snapshot.
+
+    def load(self):
+        try:
+            with open(self.getFilename()) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return None
+        if six.PY2:
+            data = self.__toStr(data)
+        return data
+
+    def save(self, key, folders, pending):
+        filename = self.getFilename()
+        tmpname = filename + ".tmp"
+        try:
+            with open(tmpname, "w") as f:
+                json.dump({
+                    "version": self.VERSION,
+                    "key": key,
+                    "folders": folders,
+                    "pending": pending,
+                }, f, separators=(',', ':'))
+            os.rename(tmpname, filename)
+        except (IOError, OSError, TypeError, ValueError) as e:
+            print("[Series2Folder] Can't save folder index:", e)
+
+    def remove(self):
+        try:
+            os.remove(self.getFilename())
+        except OSError:
+            pass
+
+    @classmethod
+    def __toStr(cls, v):
+        if isinstance(v, six.text_type):
+            return v.encode("utf-8")
+        if isinstance(v, list):
+            return [cls.__toStr(i) for i in v]
+        if isinstance(v, dict):
+            return dict((cls.__toStr(k), cls.__toStr(i)) for k, i in v.items())
+        return v
+
+
+indexSnapshot = IndexSnapshot()
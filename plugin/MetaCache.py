@@ -0,0 +1,161 @@
+from __future__ import print_function
+
+from collections import OrderedDict
+import json
+import os
+import six
+import threading
+
+from Tools.Directories import resolveFilename, SCOPE_CONFIG
+
+# MetaCache is a persistent cache of the information that
+# Series2Folder extracts from recording .meta and .eit files.
+
+# A finished recording's .meta and .eit files don't change, so
+# re-reading them on every run is wasted effort, particularly on
+# spun-down or network disks.
+#
+# Entries are keyed by the file's path and are only valid
+# while the file's inode number, size and modification time
+# match those recorded when the entry was made, so a rewritten or
+# replaced file is read again.
+#
+# The cache is held in least-recently-used order, and the least
+# recently used entries are dropped when it grows beyond
+# maxEntries. The cache file is in the config directory, on
+# flash on most boxes, so only the values that Series2Folder uses
+# are kept, and the number of entries is limited to about
+# enough for the .meta and .eit files of a few thousand
+# recordings.
+#
+# The cache may be used from several threads at once. It is
+# written in a worker thread, so that saving it doesn't hold up
+# the UI, and only when entries have been added or removed.
+
+class MetaCache(object):
+    VERSION = 3
+    MAX_ENTRIES = 10000
+    FILENAME = "series2folder.cache"
+
+    def __init__(self, filename=None, maxEntries=MAX_ENTRIES):
+        self.filename = filename
+        self.maxEntries = maxEntries
+        self.entries = OrderedDict()
+        self.loaded = False
+        self.dirty = False
+        self.lock = threading.RLock()
+        self.writeLock = threading.Lock()
+        self.saveThread = None
+
+    def getFilename(self):
+        if self.filename is None:
+            self.filename = resolveFilename(SCOPE_CONFIG, self.FILENAME)
+        return self.filename
+
+    def load(self):
+        with self.lock:
+            self.__load()
+
+    def __load(self):
+        self.loaded = True
+        self.entries.clear()
+        try:
+            with open(self.getFilename()) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return
+        for path, entry in data.get("entries", ()):
+            if six.PY2:
+                path = self.__toStr(path)
+                entry = [self.__toStr(v) for v in entry]
+            self.entries[path] = tuple(entry)
+
+    # Save the cache if it has changed. The file is written in a
+    # worker thread unless wait is True.
+
+    def save(self, wait=False):
+        with self.lock:
+            if not self.dirty:
+                return
+            self.dirty = False
+        if wait:
+            self.__write()
+        else:
+            self.saveThread = threading.Thread(target=self.__write, name="Series2Folder cache save")
+            self.saveThread.daemon = True
+            self.saveThread.start()
+
+    # Wait for the last save started by save() to finish
+
+    def waitSaved(self):
+        thread = self.saveThread
+        if thread is not None:
+            thread.join()
+
+    def __write(self):
+        with self.writeLock:
+            with self.lock:
+                entries = list(six.iteritems(self.entries))
+            filename = self.getFilename()
+            tmpname = filename + ".tmp"
+            try:
+                with open(tmpname, "w") as f:
+                    json.dump({
+                        "version": self.VERSION,
+                        "entries": entries,
+                    }, f, separators=(',', ':'))
+                os.rename(tmpname, filename)
+            except (IOError, OSError) as e:
+                print("[Series2Folder] Can't save metadata cache:", e)
+                with self.lock:
+                    self.dirty = True
+
+    # Return the cached value for path if st (the result of
+    # os.stat(path)) matches the cached file identity, otherwise
+    # None.
+
+    def get(self, path, st):
+        with self.lock:
+            return self.__get(path, st)
+
+    def __get(self, path, st):
+        if not self.loaded:
+            self.load()
+        entry = self.entries.get(path)
+        if entry is None:
+            return None
+        if tuple(entry[0:3]) != (st.st_ino, st.st_size, st.st_mtime):
+            del self.entries[path]
+            self.dirty = True
+            return None
+        self.__touch(path, entry)
+        return entry[3:]
+
+    def put(self, path, st, value):
+        with self.lock:
+            self.__put(path, st, value)
+
+    def __put(self, path, st, value):
+        if not self.loaded:
+            self.load()
+        self.entries.pop(path, None)
+        self.entries[path] = (st.st_ino, st.st_size, st.st_mtime) + tuple(value)
+        while len(self.entries) > self.maxEntries:
+            self.entries.popitem(last=False)
+        self.dirty = True
+
+    def __touch(self, path, entry):
+        try:
+            self.entries.move_to_end(path)
+        except AttributeError:
+            del self.entries[path]
+            self.entries[path] = entry
+
+    @staticmethod
+    def __toStr(v):
+        return v.encode("utf-8") if isinstance(v, six.text_type) else v
+
+
+metaCache = MetaCache()
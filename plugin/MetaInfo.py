@@ -0,0 +1,72 @@
+from itertools import islice
+import six
+
+# MetaInfo holds the information from the start of a recording's
+# .meta file:
+#   line 0  service reference
+#   line 1  title (the show name)
+#   line 2  description
+#   line 3  start time (seconds since the epoch)
+#   line 4  space-separated tags
+# The rest of the file (length, file size, service data and so on)
+# isn't used, so it isn't read.
+#
+# .meta files are normally UTF-8, but files written by other
+# devices or old images may be in other encodings. On Python 3,
+# lines that aren't valid UTF-8 are read as Latin-1 rather than
+# failing. On Python 2 the lines are left as byte strings, like the
+# rest of enigma's strings.
+
+META_LINES = 5
+PENDING_MERGE_TAG = "pts_merge"
+
+
+class MetaInfo(object):
+    __slots__ = ("serviceRef", "title", "description", "time", "tags")
+
+    def __init__(self, serviceRef, title, description, time, tags):
+        self.serviceRef = serviceRef
+        self.title = title
+        self.description = description
+        self.time = time
+        self.tags = tags
+
+    # True if the recording is a timeshift save that is still being
+    # merged into the recording
+
+    def pendingMerge(self):
+        return PENDING_MERGE_TAG in self.tags
+
+    # Conversion to and from a tuple of plain values, for MetaCache.
+    # Series2Folder doesn't use the description, so it isn't kept
+    # in the cache, and a MetaInfo from the cache has None for it.
+
+    def toTuple(self):
+        return (self.serviceRef, self.title, self.time, ' '.join(self.tags))
+
+    @classmethod
+    def fromTuple(cls, t):
+        serviceRef, title, time, tags = t
+        return cls(serviceRef, title, None, time, tuple(tags.split()))
+
+
+def _decode(line):
+    if not six.PY2:
+        try:
+            line = line.decode("utf-8")
+        except UnicodeDecodeError:
+            line = line.decode("latin-1")
+    return line.rstrip("\r\n")
+
+
+# Read the MetaInfo for a .meta file. Raises IOError or OSError
+# if the file can't be read, and ValueError if it isn't a valid
+# .meta file.
+
+def readMeta(path):
+    with open(path, "rb") as f:
+        lines = [_decode(line) for line in islice(f, META_LINES)]
+    if len(lines) < 4:
+        raise ValueError("Incomplete meta file: %s" % path)
+    lines += [""] * (META_LINES - len(lines))
+    return MetaInfo(lines[0].strip(), lines[1].strip(), lines[2].strip(), int(lines[3].strip()), tuple(lines[4].split()))
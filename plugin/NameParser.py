@@ -0,0 +1,89 @@
+import re
+from collections import namedtuple
+from itertools import chain
+from os.path import splitext
+
+# NameParser classifies recording file names and extracts the show
+# name, date and time from them, for recordings that don't have a
+# .meta file to give that information.
+
+# Recording name formats are described by regular expressions
+# that are matched against the file name without its .ts
+# extension, using these named groups:
+#   show     the show name
+#   date     the recording date, YYYYMMDD
+#   time     the recording start time, HHMM (optional)
+#   channel  the channel name (optional)
+# The first pattern that matches gives the name type. Patterns
+# added by registerNamePattern() are tried before the built-in ones,
+# so they can be used to recognise the recording names used by
+# other images.
+#
+# A _NNN suffix, added when a recording's name is already in use,
+# is removed from the name before it is matched, unless the
+# pattern is registered with stripSuffix=False.
+
+ParsedName = namedtuple("ParsedName", ("nameType", "date", "time", "show", "suffix", "channel"))
+
+TS = ".ts"
+
+_DATE = r"(?P<date>\d{4}(?:0\d|1[0-2])(?:[0-2]\d|3[01]))"
+_TIME = r"(?P<time>(?:[01]\d|2[0-3])[0-5]\d)"
+
+_builtinPatterns = [
+    # YYYYMMDD - show
+    ("short", re.compile(r"%s - (?P<show>.*?)(?: - .*)?$" % _DATE), True),
+    # YYYYMMDD HHMM - channel - show - episode
+    ("long", re.compile(r"%s %s - (?P<channel>.*?) - (?P<show>.*?) - .*$" % (_DATE, _TIME)), True),
+    # YYYYMMDD HHMM - channel - show
+    ("standard", re.compile(r"%s %s - (?:(?P<channel>.*?) - )?(?P<show>.*)$" % (_DATE, _TIME)), True),
+    # show - YYYYMMDD HHMM_event
+    ("event", re.compile(r"(?P<show>.*?) - (?:.* - )?%s %s_(?:(?! - ).)*$" % (_DATE, _TIME)), False),
+]
+
+_userPatterns = []
+
+
+# Add a recording name format. pattern is a regular expression
+# string or compiled regular expression, and must have a "show"
+# and a "date" group.
+
+def registerNamePattern(nameType, pattern, stripSuffix=True):
+    if not hasattr(pattern, "match"):
+        pattern = re.compile(pattern)
+    if "show" not in pattern.groupindex or "date" not in pattern.groupindex:
+        raise ValueError("Recording name pattern for %s needs show and date groups" % nameType)
+    _userPatterns.append((nameType, pattern, stripSuffix))
+
+
+# Return a ParsedName for a recording's .ts file name, or None
+# if the name isn't in one of the known formats.
+
+def parseName(fullname):
+    base, ext = splitext(fullname)
+    if ext != TS:
+        return None
+    suffix = None
+    stripped = base
+    if base[-4:-3] == '_' and base[-3:].isdigit():
+        suffix = base[-3:]
+        stripped = base[0:-4]
+    for nameType, pattern, stripSuffix in chain(_userPatterns, _builtinPatterns):
+        m = pattern.match(stripped if stripSuffix else base)
+        if m:
+            groups = m.groupdict()
+            return ParsedName(nameType, groups["date"], groups.get("time"), groups["show"], suffix, groups.get("channel"))
+    return None
+
+
+# Format the date and time in a ParsedName as DD.MM.YYYY HH:MM,
+# with #NNN added if the name has a _NNN suffix.
+
+def formatDateTime(parsed):
+    d = parsed.date
+    date_time = '.'.join((d[6:8], d[4:6], d[0:4]))
+    if parsed.time:
+        date_time += ' ' + parsed.time[0:2] + ':' + parsed.time[2:4]
+    if parsed.suffix:
+        date_time += '#' + parsed.suffix
+    return date_time
@@ -0,0 +1,119 @@
+from __future__ import print_function
+
+import json
+import os
+from os.path import lexists
+import six
+
+from Tools.Directories import resolveFilename, SCOPE_CONFIG
+
+# RenameJournal records the renames planned for a Series2Folder
+# run, so that a run interrupted by a crash or power failure can
+# be completed or undone the next time Series2Folder runs.
+
+# The journal is a list of groups of (fromPath, toPath) renames,
+# one group for all the files of a recording. It is written and
+# flushed to disk before any of the renames are done, and removed
+# when the run has done them all.
+
+# recover() looks at each group in a journal left by an
+# interrupted run. If some, but not all, of a recording's files
+# have been moved, the rest are moved to join them (rolled
+# forward). If that fails, the files that were moved are moved
+# back (rolled back). Groups where none or all of the files were
+# moved are already consistent.
+
+class RenameJournal(object):
+    VERSION = 1
+    FILENAME = "series2folder.journal"
+
+    def __init__(self, filename=None):
+        self.filename = filename
+
+    def getFilename(self):
+        if self.filename is None:
+            self.filename = resolveFilename(SCOPE_CONFIG, self.FILENAME)
+        return self.filename
+
+    def write(self, groups):
+        filename = self.getFilename()
+        tmpname = filename + ".tmp"
+        with open(tmpname, "w") as f:
+            json.dump({
+                "version": self.VERSION,
+                "groups": [[list(rename) for rename in group] for group in groups],
+            }, f, separators=(',', ':'))
+            f.flush()
+            os.fsync(f.fileno())
+        os.rename(tmpname, filename)
+
+    def remove(self):
+        try:
+            os.remove(self.getFilename())
+        except OSError:
+            pass
+
+    # True if there is a journal left by an interrupted run
+
+    def pending(self):
+        return lexists(self.getFilename())
+
+    def read(self):
+        try:
+            with open(self.getFilename()) as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.get("version") != self.VERSION:
+            return None
+        groups = []
+        for group in data.get("groups", ()):
+            if six.PY2:
+                group = [[self.__toStr(p) for p in rename] for rename in group]
+            groups.append([tuple(rename) for rename in group])
+        return groups
+
+    # Complete or undo any partly moved recordings recorded in the
+    # journal and remove it. Returns a list of error messages.
+
+    def recover(self):
+        if not self.pending():
+            return []
+        errors = []
+        groups = self.read()
+        if groups is None:
+            # An unreadable journal was never completely written,
+            # so none of its renames were started
+            self.remove()
+            return errors
+        for group in groups:
+            done = [(fromPath, toPath) for fromPath, toPath in group if not lexists(fromPath) and lexists(toPath)]
+            if not done or len(done) == len(group):
+                continue
+            pending = [rename for rename in group if rename not in done]
+            moved = []
+            if not self.__renameAll(pending, moved, errors):
+                self.__renameAll([(toPath, fromPath) for fromPath, toPath in done + moved], [], errors)
+        self.remove()
+        return errors
+
+    def __renameAll(self, renames, moved, errors):
+        for fromPath, toPath in renames:
+            if lexists(toPath):
+                errors.append(_("Can not recover move of %s: %s exists") % (fromPath, toPath))
+                return False
+            try:
+                os.rename(fromPath, toPath)
+                moved.append((fromPath, toPath))
+                print("[Series2Folder] recover rename", fromPath, "to", toPath)
+            except OSError as e:
+                errors.append(str(e))
+                return False
+        return True
+
+    @staticmethod
+    def __toStr(v):
+        return v.encode("utf-8") if isinstance(v, six.text_type) else v
+
+
+renameJournal = RenameJournal()
@@ -0,0 +1,92 @@
+from collections import defaultdict, deque
+from contextlib import contextmanager
+import threading
+from time import time, localtime, strftime
+
+# RunStats collects timings and counters for a Series2Folder run,
+# so that slow runs can be investigated on the receiver without
+# a profiler.
+
+# Times are accumulated for each phase of a run:
+#   scan      listing the recording folder
+#   classify  classifying directory entries and reading .meta files
+#   plan      deciding which recordings to move, and where
+#   rename    moving the recordings
+#   notify    updating screens and showing the results
+# Time spent in worker threads is added for each thread, so the
+# classify time of a manual run may exceed its elapsed time.
+
+# The counters record filesystem calls and other potentially slow
+# operations, and the number of times a background run was
+# deferred, by reason.
+
+# The statistics for the most recent runs are kept in recentRuns.
+
+PHASES = ("scan", "classify", "plan", "rename", "notify")
+MAX_RUNS = 10
+LOGFILE = "/tmp/series2folder-stats.log"
+
+recentRuns = deque(maxlen=MAX_RUNS)
+
+
+class RunStats(object):
+    def __init__(self, mode):
+        self.mode = mode
+        self.start = time()
+        self.end = None
+        self.times = defaultdict(float)
+        self.counts = defaultdict(int)
+        self.deferrals = defaultdict(int)
+        self.lock = threading.Lock()
+
+    @contextmanager
+    def timing(self, phase):
+        start = time()
+        try:
+            yield
+        finally:
+            elapsed = time() - start
+            with self.lock:
+                self.times[phase] += elapsed
+
+    def count(self, name, n=1):
+        with self.lock:
+            self.counts[name] += n
+
+    def deferred(self, reason):
+        self.deferrals[reason] += 1
+
+    # Mark the run as finished and add it to recentRuns
+
+    def done(self):
+        if self.end is None:
+            self.end = time()
+            recentRuns.append(self)
+
+    def report(self):
+        end = self.end if self.end is not None else time()
+        lines = ["%s run at %s, %.2f s elapsed" % (self.mode, strftime("%d.%m.%Y %H:%M:%S", localtime(self.start)), end - self.start)]
+        lines.append("  " + ", ".join("%s %.3f s" % (phase, self.times[phase]) for phase in PHASES))
+        if self.counts:
+            lines.append("  " + ", ".join("%s %d" % item for item in sorted(self.counts.items())))
+        if self.deferrals:
+            lines.append("  deferred: " + ", ".join("%s %d" % item for item in sorted(self.deferrals.items())))
+        return '\n'.join(lines)
+
+
+def recentReport():
+    if not recentRuns:
+        return _("No Series to Folder runs have been recorded since the last restart.")
+    return "\n\n".join(stats.report() for stats in reversed(recentRuns))
+
+
+# Write the statistics of the recent runs to LOGFILE.
+# Returns the name of the file or None if it can't be written.
+
+def dumpRecent():
+    try:
+        with open(LOGFILE, "w") as f:
+            f.write(recentReport() + "\n")
+        return LOGFILE
+    except (IOError, OSError):
+        return None
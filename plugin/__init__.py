@@ -14,6 +14,7 @@ config.plugins.seriestofolder.autofolder = ConfigSelection([
     ("9", _("9 recordings")),
     ("10", _("10 recordings")),
 ], default="2")
+config.plugins.seriestofolder.seasonfolders = ConfigYesNo(default=False)
 config.plugins.seriestofolder.movies = ConfigEnableDisable(default=False)
 # Some images don't support a show_help parameter for ConfigText
 __defaultMoviesStr = "Movies"
@@ -21,7 +22,22 @@ try:
     config.plugins.seriestofolder.moviesfolder = ConfigText(default=__defaultMoviesStr, show_help=False)
 except TypeError:
     config.plugins.seriestofolder.moviesfolder = ConfigText(default=__defaultMoviesStr)
+try:
+    config.plugins.seriestofolder.destroot = ConfigText(default="", show_help=False)
+except TypeError:
+    config.plugins.seriestofolder.destroot = ConfigText(default="")
 config.plugins.seriestofolder.portablenames = ConfigYesNo(default=True)
+config.plugins.seriestofolder.multiroot = ConfigYesNo(default=False)
+config.plugins.seriestofolder.scandepth = ConfigSelection([
+    ("0", _("none")),
+    ("1", _("1 level")),
+    ("2", _("2 levels")),
+    ("3", _("3 levels")),
+], default="0")
+try:
+    config.plugins.seriestofolder.excludedirs = ConfigText(default="", show_help=False)
+except TypeError:
+    config.plugins.seriestofolder.excludedirs = ConfigText(default="")
 config.plugins.seriestofolder.showmovebutton = ConfigYesNo(default=False)
 config.plugins.seriestofolder.showselmovebutton = ConfigYesNo(default=False)
 config.plugins.seriestofolder.striprepeattags = ConfigYesNo(default=False)
@@ -38,6 +54,20 @@ config.plugins.seriestofolder.autonotifications = ConfigSelection([
     ("none", _("none")),
 ], default="error")
 config.plugins.seriestofolder.autoreminder = ConfigInteger(default=5)
+config.plugins.seriestofolder.fullscan = ConfigSelection([
+    ("0", _("only at startup")),
+    ("6", _("every 6 hours")),
+    ("12", _("every 12 hours")),
+    ("24", _("daily")),
+    ("168", _("weekly")),
+], default="24")
+config.plugins.seriestofolder.watchdir = ConfigYesNo(default=False)
+config.plugins.seriestofolder.stepslice = ConfigSelection([
+    ("0", _("auto")),
+    ("20", _("20 ms")),
+    ("50", _("50 ms")),
+    ("100", _("100 ms")),
+], default="0")
 
 def onAutoChange(conf):
     if conf.value and config.plugins.seriestofolder.autoreminder.value:
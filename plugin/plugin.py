@@ -29,19 +29,51 @@ from Components.UsageConfig import defaultMoviePath
 from Components.config import config, ConfigText, getConfigListEntry
 from Tools import Notifications
 from Tools.BoundFunction import boundFunction
+from Tools.Directories import resolveFilename, SCOPE_CONFIG
 import NavigationInstance
-from enigma import eTimer, iRecordableService, iPlayableService, ePoint
+from enigma import eTimer, iRecordableService, iPlayableService, ePoint, eServiceReference
 from time import time, localtime, strftime
 from boxbranding import getMachineBrand, getMachineName
-from collections import defaultdict
-from os.path import isfile, isdir, splitext, join as joinpath, split as splitpath, lexists
+from collections import defaultdict, deque
+from itertools import chain
+import threading
+from os.path import isfile, isdir, splitext, join as joinpath, split as splitpath, lexists, normpath, basename
+import errno
 import os
+import re
+import six
+
+try:
+    from os import scandir
+except ImportError:
+    scandir = None
+
+# Not all images have a stream server that can report its clients
+try:
+    from enigma import eStreamServer
+except ImportError:
+    eStreamServer = None
 
 from .FileScreens import activeFileScreens
+from .MetaCache import metaCache
+from .IndexSnapshot import indexSnapshot
+from .MetaInfo import MetaInfo, readMeta
+from .EitInfo import EitInfo, readEit
+from .RenameJournal import renameJournal
+from .FileMover import MoveJob
+from .RunStats import RunStats
+from . import RunStats as RunStatsModule
+from . import DirWatcher
+from . import NameParser
+from . import FolderRules
 
 _autoSeries2Folder = None
 _session = None
 
+# Errors from recovering an interrupted run when the session
+# started, reported by the next run
+_recoveryErrors = []
+
 def menu(session, service, serviceList=None, **kwargs):
     session.open(Series2Folder, service, serviceList=serviceList)
 
@@ -60,6 +92,10 @@ def autoSeries2Folder(reason, session, **kwargs):
 
     if _session is None:
         _session = session
+        # Complete or undo the moves of a run interrupted by a crash
+        # or power failure, so that the movie list shows the
+        # recordings where they are
+        _recoveryErrors.extend(renameJournal.recover())
 
     if reason == 0:
         if config.plugins.seriestofolder.auto.value:
@@ -77,6 +113,13 @@ def __autoSwitched(conf):
 
 config.plugins.seriestofolder.auto.addNotifier(__autoSwitched, initial_call=False, immediate_feedback=False, extra_args=None)
 
+def __watchDirSwitched(conf):
+    if _autoSeries2Folder:
+        _autoSeries2Folder.updateWatch()
+
+
+config.plugins.seriestofolder.watchdir.addNotifier(__watchDirSwitched, initial_call=False, immediate_feedback=False)
+
 def multiPluginDescriptor(name="Plugin", where=None, description="", icon=None, fnc=None, wakeupfnc=None, needsRestart=None, internal=False, weight=0, multi=False):
     try:
         return PluginDescriptor(name=name, where=where, description=description, icon=icon, fnc=fnc, wakeupfnc=wakeupfnc, needsRestart=needsRestart, internal=internal, weight=weight, multi=multi)
@@ -147,23 +190,250 @@ config.plugins.seriestofolder.showselmovebutton.addNotifier(
     immediate_feedback=False
 )
 
+# Runs of characters that are ignored in series keys
+_keyPunctuation = re.compile(r"[\W_]+", re.UNICODE)
+
+# _ListdirEntry is a minimal stand-in for os.DirEntry on Pythons
+# without os.scandir(). It has to stat() the file to answer
+# is_file() and is_dir().
+
+class _ListdirEntry(object):
+    __slots__ = ("name", "path")
+
+    def __init__(self, dir, name):
+        self.name = name
+        self.path = joinpath(dir, name)
+
+    def is_file(self):
+        return isfile(self.path)
+
+    def is_dir(self):
+        return isdir(self.path)
+
+# Recording holds what Series2Folder needs to know about a
+# recording while deciding where to move it. There may be tens of
+# thousands of them, so they are kept small, and the date and
+# time shown in messages are only formatted for the recordings
+# that are reported.
+#   showname  show name from the .meta file or file name
+#   name      .ts file name
+#   start     start time from the .meta file, or None to use
+#             the date and time in the file name
+#   siblings  bitmask of the recording's other files (see
+#             Series2FolderActionsBase.SIBLING_NAMES), or None
+#             if they haven't been found
+#   key       the recording's series key (see seriesKey())
+#   folder    the destination folder template from the folder
+#             rules, or None to use the series folder
+#   season    the season number for a season folder, or None
+
+class Recording(object):
+    __slots__ = ("showname", "name", "start", "siblings", "key", "folder", "season")
+
+    def __init__(self, showname, name, start, siblings, key, folder=None, season=None):
+        self.showname = showname
+        self.name = name
+        self.start = start
+        self.siblings = siblings
+        self.key = key
+        self.folder = folder
+        self.season = season
+
+    # The recording's date and time as DD.MM.YYYY HH:MM, with #NNN
+    # added if the file name has a _NNN suffix
+
+    def dateTime(self):
+        if self.start is None:
+            parsed = NameParser.parseName(self.name)
+            return NameParser.formatDateTime(parsed) if parsed else ""
+        date_time = strftime("%d.%m.%Y %H:%M", localtime(self.start))
+        filebase = splitext(self.name)[0]
+        if filebase[-4:-3] == "_" and filebase[-3:].isdigit():
+            date_time += '#' + filebase[-3:]
+        return date_time
+
+    def __str__(self):
+        return '%s - %s' % (self.showname, self.dateTime())
+
+    # Conversion to and from a tuple of plain values, for
+    # IndexSnapshot. siblings isn't kept, because the recording's
+    # files may change before it's used again.
+
+    def toTuple(self):
+        return (self.showname, self.name, self.start, self.key, self.folder, self.season)
+
+    @classmethod
+    def fromTuple(cls, t):
+        showname, name, start, key, folder, season = t
+        return cls(showname, name, start, None, key, folder, season)
+
+# PlanEntry is an entry in a move plan (see planFolder()). It says
+# what is to be done with a recording and why.
+#   rec         the Recording
+#   rootdir     the folder the recording is in
+#   foldername  the destination folder, relative to its
+#               destination root, or None
+#   destRoot    the destination root, or None
+#   destDir     the full path of the destination folder, or None
+#               (from destRoot and foldername)
+#   renameList  (from path, to path) pairs for the recording's files
+#   suffix      the _NNN suffix added to the recording's names to
+#               make them unique in the destination folder, or ""
+#   reason      why the recording is moved (one of REASONS)
+#   skipped     why the recording isn't moved (one of SKIPPED), or
+#               None if it is moved
+
+class PlanEntry(object):
+    __slots__ = ("rec", "rootdir", "foldername", "destRoot", "renameList", "suffix", "reason", "skipped")
+
+    REASONS = {
+        "rule": _("folder rule"),
+        "season": _("season folder"),
+        "movies": _("movies folder"),
+        "existing": _("existing folder"),
+        "selected": _("selected series"),
+        "count": _("number of recordings"),
+    }
+    SKIPPED = {
+        "few": _("not enough recordings"),
+        "in place": _("already in its folder"),
+        "busy": _("being recorded or played"),
+        "names": _("too many recordings with similar filenames"),
+        "changed": _("files changed since the plan was made"),
+    }
+
+    def __init__(self, rec, rootdir, foldername, destRoot, renameList, suffix, reason, skipped=None):
+        self.rec = rec
+        self.rootdir = rootdir
+        self.foldername = foldername
+        self.destRoot = destRoot
+        self.renameList = renameList
+        self.suffix = suffix
+        self.reason = reason
+        self.skipped = skipped
+
+    @property
+    def destDir(self):
+        if self.destRoot is None or self.foldername is None:
+            return None
+        return joinpath(self.destRoot, self.foldername)
+
+    # The entry as a tuple of plain values, for comparing plans
+
+    def toTuple(self):
+        return (self.rootdir, self.rec.name, self.foldername, self.suffix, self.reason, self.skipped)
+
+    def describe(self):
+        if self.skipped:
+            return "%s: %s" % (self.rec, self.SKIPPED[self.skipped])
+        text = "%s -> %s (%s)" % (self.rec, self.foldername, self.REASONS[self.reason])
+        if self.suffix:
+            text += _(" as %s") % self.suffix
+        return text
+
+# ChangeSet records the changes that a run made to the recording
+# folders, so that the file screens showing them can be updated in
+# place instead of being reloaded (see updateCallerScreen()).
+#   moved    (.ts file path, destination folder) for each recording
+#            that was moved. Recordings moved to other filesystems
+#            in the background aren't included.
+#   folders  the paths of the folders that were created
+
+class ChangeSet(object):
+    __slots__ = ("moved", "folders")
+
+    def __init__(self):
+        self.moved = []
+        self.folders = []
+
+    def __len__(self):
+        return len(self.moved) + len(self.folders)
+
+    # The paths of the recordings that were moved out of dir
+
+    def removedFrom(self, dir):
+        return set(path for path, destDir in self.moved if splitpath(path)[0] == dir)
+
+    # True if entries have been added to dir: recordings moved
+    # into it or folders created in it
+
+    def addedTo(self, dir):
+        return any(destDir == dir for path, destDir in self.moved) or any(splitpath(path)[0] == dir for path in self.folders)
+
+    # The paths of the folders in dir that recordings were moved
+    # into, or into folders below them
+
+    def changedFolders(self, dir):
+        prefix = joinpath(dir, "")
+        return set(
+            joinpath(dir, destDir[len(prefix):].split(os.sep, 1)[0])
+            for path, destDir in self.moved if destDir.startswith(prefix)
+        )
+
 class Series2FolderActionsBase(object):
+    SERIES_ROOTS = "series2folder.roots"  # Per-series destination roots file in the config directory
+    FOLDER_RULES = "series2folder.rules"  # Destination folder rules file in the config directory
+    SEASON_FOLDER = "Season %d"  # Name of the season folders in a series folder
+    RUN_MODE = "manual"  # Name of the run mode in run statistics
+    SCAN_THREADS = 4  # Number of worker threads for classifying the entries in a folder
+    SCAN_POLL = 50  # ms Interval for checking for folders scanned by the worker threads
+    BUSY_REFRESH = 10  # sec Maximum age of the busy paths snapshot
     TS = ".ts"
     META = ".meta"
     BAREEXTS = frozenset((".eit",))
     TSEXTS = frozenset((".ap", ".cuts", ".meta", ".sc"))
 
+    # The endings of the names of a recording's other files,
+    # replacing its .ts extension, in the order of the bits in
+    # Recording.siblings
+    SIBLING_NAMES = (".eit", ".ts.ap", ".ts.cuts", ".ts.meta", ".ts.sc")
+    SIBLING_BITS = dict((ending, 1 << i) for i, ending in enumerate(SIBLING_NAMES))
+
     def __init__(self, session):
         self.session = session
 
         # Movie recording path
         self.rootdir = defaultMoviePath()
 
-        # Information about moves and errors
+        # Information about moves and errors. Moves are
+        # (Recording, error text) pairs.
         self.moves = []
         self.errMess = []
+        self.changes = ChangeSet()
+
+        # Planned moves
+        self.plan = deque()
+
+        # Rename lists of the recordings that were left partly moved
+        # (see undoRenames())
+        self.unrecovered = []
+
+        # Timings and counters for the current run
+        self.stats = RunStats(self.RUN_MODE)
+
+        # Folders to process, and the results of scanning them
+        # (see startScan())
+        self.roots = []
+        self.scanDepth = 0
+        self.conf_excludedirs = frozenset()
+        self.scanned = deque()
+        self.scanFinished = threading.Event()
+        self.scanFinished.set()
+
+        # Results of parseName() for the run
+        self.parsedNames = {}
+
+        # Compiled destination folder rules for the run, or None
+        self.folderRules = None
+
+        # Snapshot of the paths of recordings that are busy
+        # (see busyPaths())
+        self.busy = frozenset()
+        self.busyTime = None
+
+    def prepare(self, service, selectedOnly=False, serviceList=None, dryRun=False):
+        self.stats = RunStats(self.RUN_MODE)
 
-    def prepare(self, service, selectedOnly=False, serviceList=None):
         # Get local copies of config variables in case they change during a run
         self.conf_autofolder = config.plugins.seriestofolder.autofolder.value
         self.conf_movies = config.plugins.seriestofolder.movies.value
@@ -171,6 +441,18 @@ class Series2FolderActionsBase(object):
         self.conf_portablenames = config.plugins.seriestofolder.portablenames.value
         self.conf_striprepeattags = config.plugins.seriestofolder.striprepeattags.value
         self.conf_repeatstr = config.plugins.seriestofolder.repeatstr.value
+        self.conf_seasonfolders = config.plugins.seriestofolder.seasonfolders.value
+
+        # Repeat tags to strip, longest first so that a tag that
+        # contains another is stripped whole
+        self.repeatTags = sorted(set(tag.strip().lower() for tag in self.conf_repeatstr.split(',') if tag.strip()), key=len, reverse=True)
+        self.conf_destroot = config.plugins.seriestofolder.destroot.value.strip()
+        self.conf_scandepth = int(config.plugins.seriestofolder.scandepth.value)
+        self.conf_excludedirs = frozenset(
+            normpath(d) if os.sep in d else d
+            for d in (d.strip() for d in config.plugins.seriestofolder.excludedirs.value.split(','))
+            if d
+        )
 
         # Update rootdir in case defaultMoviePath changes during
         # the lifetime of a persistent instance
@@ -184,6 +466,19 @@ class Series2FolderActionsBase(object):
         self.moves = []
         self.errMess = []
 
+        # The changes made to the folders
+        self.changes = ChangeSet()
+
+        # Complete or undo the moves of any interrupted run. A dry
+        # run doesn't change anything, so it only reports them.
+        self.errMess += _recoveryErrors
+        del _recoveryErrors[:]
+        self.unrecovered = []
+        if not dryRun:
+            self.errMess += renameJournal.recover()
+        elif renameJournal.pending():
+            self.errMess.append(_("An interrupted run's moves will be completed or undone by the next run that moves recordings"))
+
         if serviceList is None and service is not None:
             serviceList = [service]
 
@@ -194,15 +489,63 @@ class Series2FolderActionsBase(object):
                 if fullname and selectedOnly:
                     showname, __, __, err = self.getShowInfo(self.rootdir, fullname)
                     if showname:
-                        self.moveSelection.add(self.cleanName(self.stripRepeat(showname)))
+                        self.moveSelection.add(self.seriesKey(self.stripRepeat(showname)))
                     elif err:
                         self.errMess.append(err)
 
-        # Full pathnames of current recordings' .ts files
-        self.isRecording = set([timer.Filename + self.TS for timer in self.session.nav.RecordTimer.timer_list if timer.state in (timer.StatePrepared, timer.StateRunning) and not timer.justplay and hasattr(timer, "Filename")])
+        self.parsedNames = {}
+
+        # Take a new snapshot of the busy recordings
+        self.invalidateBusy()
+        self.busyPaths()
 
         # Folder for movies
         self.moviesFolder = self.conf_movies and self.conf_moviesfolder
+        self.moviesKey = self.moviesFolder and self.seriesKey(self.moviesFolder)
+
+        # Indexes from series key to existing folder name for each
+        # destination root (see folderKeys())
+        self.folderKeyIndex = {}
+
+        # The folders to process. A selection is only looked
+        # for in the selected recordings' folder.
+        if selectedOnly:
+            self.roots = [normpath(self.rootdir)]
+            self.scanDepth = 0
+        else:
+            self.roots = self.movieRoots(self.rootdir)
+            self.scanDepth = self.conf_scandepth
+
+        # Folders processed in this run
+        self.rootsDone = set()
+
+        # Moves to other filesystems, done by a MoveJob
+        # at the end of the run
+        self.crossMoves = []
+
+        # Per-series destination roots
+        self.seriesRoots = self.loadSeriesRoots()
+
+        # Destination folder rules
+        self.folderRules = self.loadFolderRules()
+
+        # Device numbers of the recording folders and destination
+        # roots, loaded as needed by deviceOf()
+        self.devices = {}
+
+        self.startRoot(self.roots[0])
+
+    # Set up to process the recordings in rootdir, one of the
+    # folders in the run. The folders are processed one at a time.
+
+    def startRoot(self, rootdir):
+        self.rootdir = rootdir
+
+        # Recordings in a series folder that are for the
+        # series are left where they are. The run's root folders
+        # aren't series folders, whatever their names.
+        self.rootKeys = [self.seriesKey(level) for level in self.rootLevels(rootdir)]
+        self.rootKey = self.rootKeys[-1] if self.rootKeys else None
 
         # lists of shows in each series and for movies
         self.shows = defaultdict(list)
@@ -210,65 +553,693 @@ class Series2FolderActionsBase(object):
         # directories
         self.dirs = set()
 
-    def addRecording(self, f):
-        fullpath = joinpath(self.rootdir, f)
-        if self.recNameType(f) is not None and fullpath not in self.isRecording and isfile(fullpath):
-            origShowname, pending_merge, date_time, err = self.getShowInfo(self.rootdir, f)
-            noRepeatName = self.stripRepeat(origShowname)
-            showname = self.cleanName(noRepeatName)
-            if showname and (not self.moveSelection or showname in self.moveSelection) and not pending_merge:
-                if not self.isPlaying(fullpath):
-                    if self.moviesFolder and noRepeatName.lower().startswith("movie: "):
-                        self.shows[self.moviesFolder].append((origShowname, f, date_time))
-                    else:
-                        self.shows[showname].append((origShowname, f, date_time))
-            elif err:
-                self.errMess.append(err)
-        elif isdir(fullpath):
+        # Index of the files associated with each recording
+        # (see indexSiblings()), or None to look for them
+        # in recFileList()
+        self.siblings = None
+
+        # Sets of the names in each destination folder,
+        # loaded as needed by folderContents()
+        self.folderNames = {}
+
+        # Highest collision suffix number used for each name stem
+        # in each destination folder, loaded as needed by
+        # folderSuffixes()
+        self.folderMaxSuffixes = {}
+
+        # Planned moves: PlanEntry objects
+        self.plan = deque()
+
+        # Series folders in rootdir that are used instead of
+        # creating a folder in the series' destination root
+        # (see seriesFolder())
+        self.folderRoots = {}
+
+        # Destination folders created or checked for rootdir
+        self.madeFolders = set()
+
+    # The recording folders to process: rootdir and, in
+    # multi-root mode, the default movie folder and the
+    # bookmarked recording locations.
+
+    def movieRoots(self, rootdir):
+        roots = [rootdir]
+        if config.plugins.seriestofolder.multiroot.value:
+            roots.append(defaultMoviePath())
+            roots += config.movielist.videodirs.value
+        uniqueRoots = []
+        for root in roots:
+            root = normpath(root)
+            if root not in uniqueRoots:
+                uniqueRoots.append(root)
+        return uniqueRoots
+
+    # The levels of the folder rootdir below the run's root
+    # folder that it's in. A root folder has no levels.
+
+    def rootLevels(self, rootdir):
+        rootdir = normpath(rootdir)
+        for root in self.roots:
+            if rootdir == root:
+                return []
+            prefix = joinpath(root, "")
+            if rootdir.startswith(prefix):
+                return rootdir[len(prefix):].split(os.sep)
+        return [level for level in rootdir.split(os.sep) if level]
+
+    def isExcludedDir(self, path):
+        name = basename(path)
+        return name.startswith('.') or name in self.conf_excludedirs or path in self.conf_excludedirs
+
+    # True if dir is one of the run's roots, or a folder that
+    # is scanned below one of them.
+
+    def isMovieDir(self, dir):
+        dir = normpath(dir)
+        for root in self.roots:
+            if dir == root:
+                return True
+            prefix = root.rstrip(os.sep) + os.sep
+            if dir.startswith(prefix):
+                parts = dir[len(prefix):].split(os.sep)
+                if len(parts) <= self.scanDepth and not any(self.isExcludedDir(prefix + os.sep.join(parts[:i + 1])) for i in range(len(parts))):
+                    return True
+        return False
+
+    # Scan the roots, and the folders below them to scanDepth
+    # levels, in worker threads, one for each device, so that a
+    # slow or spun-down disk doesn't hold up the others.
+    # As each folder is listed, (path, entries, classified, ex) is
+    # appended to self.scanned. classified is the list of
+    # classifyEntry() results for the entries if classify is True,
+    # otherwise None. If the folder can't be listed, entries and
+    # classified are None and ex is the exception.
+    # self.scanFinished is set when all the folders have been
+    # scanned.
+
+    def startScan(self, classify):
+        self.scanned = deque()
+        self.scanFinished = threading.Event()
+        thread = threading.Thread(target=self.scanRoots, args=(list(self.roots), classify, self.scanned, self.scanFinished), name="Series2Folder")
+        thread.daemon = True
+        thread.start()
+
+    def scanRoots(self, roots, classify, scanned, finished):
+        try:
+            deviceRoots = defaultdict(list)
+            for root in roots:
+                deviceRoots[self.deviceOf(root)].append(root)
+            workers = [threading.Thread(target=self.scanDevice, args=(devRoots, classify, scanned)) for devRoots in deviceRoots.values()]
+            for worker in workers:
+                worker.daemon = True
+                worker.start()
+            for worker in workers:
+                worker.join()
+        finally:
+            finished.set()
+
+    def scanDevice(self, roots, classify, scanned):
+        folders = deque((root, 0) for root in roots)
+        while folders:
+            path, depth = folders.popleft()
+            try:
+                entries = self.listDir(path)
+            except Exception as ex:
+                scanned.append((path, None, None, ex))
+                continue
+            if depth < self.scanDepth:
+                folders.extend((entry.path, depth + 1) for entry in entries if entry.is_dir() and not self.isExcludedDir(entry.path))
+            scanned.append((path, entries, self.classifyAll(path, entries) if classify else None, None))
+
+    # Classify the entries in rootdir using a pool of
+    # SCAN_THREADS threads.
+
+    def classifyAll(self, rootdir, entries):
+        nThreads = max(1, min(self.SCAN_THREADS, len(entries) // 16))
+        results = [None] * len(entries)
+
+        def classify(start):
+            for i in range(start, len(entries), nThreads):
+                try:
+                    results[i] = self.classifyEntry(entries[i], rootdir)
+                except Exception as ex:
+                    print("[Series2Folder] Error reading", entries[i].name, ex)
+
+        workers = [threading.Thread(target=classify, args=(i, )) for i in range(1, nThreads)]
+        for worker in workers:
+            worker.start()
+        classify(0)
+        for worker in workers:
+            worker.join()
+        return results
+
+    # Record the error for a folder that can't be scanned. Other
+    # recording locations that don't exist (e.g. unmounted disks)
+    # are skipped quietly.
+
+    def scanFailed(self, path, ex):
+        if path == self.roots[0] or getattr(ex, "errno", None) != errno.ENOENT:
+            self.errMess.append("Can not process folder: %s" % str(ex))
+
+    def listDir(self, path):
+        # The entries returned by os.scandir() carry the file type
+        # read with the directory, so classifying them in
+        # addRecording() doesn't need a stat() for each entry.
+        self.stats.count("listdir")
+        with self.stats.timing("scan"):
+            if scandir is not None:
+                return list(scandir(path))
+            return [_ListdirEntry(path, f) for f in os.listdir(path)]
+
+    # Build an index from recording .ts file name to the bitmask
+    # of the recording's other files (.eit, .ts.ap, .ts.cuts,
+    # .ts.meta, .ts.sc) from the entries in a directory listing.
+
+    def indexSiblings(self, entries):
+        siblings = defaultdict(int)
+        for entry in entries:
+            f = entry.name
+            base, ext = splitext(f)
+            if ext in self.BAREEXTS:
+                if entry.is_file():
+                    siblings[base + self.TS] |= self.SIBLING_BITS[ext]
+            elif ext in self.TSEXTS and base.endswith(self.TS):
+                if entry.is_file():
+                    siblings[base] |= self.SIBLING_BITS[self.TS + ext]
+        return siblings
+
+    # The folder that series folders are created in: the recording
+    # folder if the series already has a folder there that is used,
+    # an entry in the series roots file for the folder, the
+    # configured destination root, or the recording folder.
+
+    def destRoot(self, foldername):
+        topFolder = foldername.split(os.sep, 1)[0]
+        return self.folderRoots.get(topFolder) or self.seriesRoots.get(topFolder) or self.conf_destroot or self.rootdir
+
+    def destDir(self, foldername):
+        return joinpath(self.destRoot(foldername), foldername)
+
+    # An index from series key to the name of an existing folder
+    # in destRoot with that key, built once for each destination
+    # root in the run and kept up to date by makeFolder().
+
+    def folderKeys(self, destRoot):
+        keys = self.folderKeyIndex.get(destRoot)
+        if keys is None:
+            if destRoot == self.rootdir:
+                dirs = self.dirs
+            else:
+                try:
+                    dirs = [entry.name for entry in self.listDir(destRoot) if entry.is_dir()]
+                except OSError:
+                    dirs = []
+            keys = {}
+            for d in sorted(dirs):
+                keys.setdefault(self.seriesKey(d), d)
+            self.folderKeyIndex[destRoot] = keys
+        return keys
+
+    # The folder for a series: the movies folder, an existing folder
+    # whose name has the same series key, or else the most common
+    # of the recordings' cleaned show names. An existing folder is
+    # looked for in the series' destination root and then, if that
+    # is somewhere else, in the recording folder, so that
+    # recordings join a series folder that is already there.
+    # Returns the folder name and whether the folder exists.
+
+    def seriesFolder(self, key, recordings):
+        if self.moviesKey and key == self.moviesKey:
+            foldername = self.moviesFolder
+        else:
+            counts = defaultdict(int)
+            for rec in recordings:
+                counts[self.cleanName(self.stripRepeat(rec.showname))] += 1
+            foldername = min(counts, key=lambda name: (-counts[name], name.isupper(), name))
+        destRoot = self.destRoot(foldername)
+        existing = self.folderKeys(destRoot).get(key)
+        if existing is not None:
+            return existing, True
+        if destRoot != self.rootdir:
+            existing = self.folderKeys(self.rootdir).get(key)
+            if existing is not None:
+                self.folderRoots[existing] = self.rootdir
+                return existing, True
+        return foldername, False
+
+    # Load the optional series roots file, which has lines of the form
+    #   series folder name = destination root
+    # to send the series to a folder in destination root.
+
+    def loadSeriesRoots(self):
+        seriesRoots = {}
+        try:
+            with open(resolveFilename(SCOPE_CONFIG, self.SERIES_ROOTS)) as f:
+                for line in f:
+                    line = line.strip()
+                    if line and not line.startswith('#') and '=' in line:
+                        foldername, destRoot = line.rsplit('=', 1)
+                        if foldername.strip() and destRoot.strip():
+                            seriesRoots[foldername.strip()] = destRoot.strip()
+        except (IOError, OSError):
+            pass
+        return seriesRoots
+
+    # Load and compile the optional folder rules file (see
+    # FolderRules). Errors in the rules are reported with the run's
+    # other errors. Returns None if there are no rules.
+
+    def loadFolderRules(self):
+        try:
+            with open(resolveFilename(SCOPE_CONFIG, self.FOLDER_RULES)) as f:
+                folderRules, errors = FolderRules.parseRules(f)
+        except (IOError, OSError):
+            return None
+        self.errMess += errors
+        return folderRules if folderRules.rules else None
+
+    def deviceOf(self, path):
+        dev = self.devices.get(path)
+        if dev is None:
+            try:
+                dev = os.stat(path).st_dev
+            except OSError:
+                dev = -1
+            self.devices[path] = dev
+        return dev
+
+    # True if recordings moved to a folder in destRoot must be
+    # copied to another filesystem. If either filesystem isn't
+    # available, the move is treated as a rename, and fails with
+    # the rename error.
+
+    def isCrossDevice(self, destRoot):
+        if destRoot == self.rootdir:
+            return False
+        rootDev = self.deviceOf(self.rootdir)
+        destDev = self.deviceOf(destRoot)
+        return rootDev != -1 and destDev != -1 and rootDev != destDev
+
+    # The set of names in a destination folder. It is read once
+    # per run and kept up to date as recordings are moved into it.
+
+    def folderContents(self, foldername):
+        names = self.folderNames.get(foldername)
+        if names is None:
+            self.stats.count("listdir")
+            try:
+                names = set(os.listdir(self.destDir(foldername)))
+            except OSError:
+                names = set()
+            self.folderNames[foldername] = names
+        return names
+
+    # A dict mapping the name stems in a destination folder
+    # (see splitSuffix()) to the highest collision suffix number
+    # used with the stem.
+
+    def folderSuffixes(self, foldername):
+        maxSuffixes = self.folderMaxSuffixes.get(foldername)
+        if maxSuffixes is None:
+            maxSuffixes = {}
+            for f in self.folderContents(foldername):
+                stem, num = self.splitSuffix(f)
+                if num > maxSuffixes.get(stem, 0):
+                    maxSuffixes[stem] = num
+            self.folderMaxSuffixes[foldername] = maxSuffixes
+        return maxSuffixes
+
+    def addFolderName(self, foldername, f):
+        self.folderContents(foldername).add(f)
+        maxSuffixes = self.folderMaxSuffixes.get(foldername)
+        if maxSuffixes is not None:
+            stem, num = self.splitSuffix(f)
+            if num > maxSuffixes.get(stem, 0):
+                maxSuffixes[stem] = num
+
+    def addRecording(self, entry):
+        self.addClassified(self.classifyEntry(entry, self.rootdir))
+
+    # classifyEntry() does the filesystem accesses for
+    # addRecording(). It doesn't change any state or use enigma,
+    # so it can be run in a worker thread.
+    # It returns None for entries that aren't of interest,
+    # (name, None, None, None) for directories and
+    # (name, getShowInfo() result, folder, season) for recordings,
+    # where folder and season are as in Recording.
+
+    def classifyEntry(self, entry, rootdir):
+        with self.stats.timing("classify"):
+            f = entry.name
+            fullpath = joinpath(rootdir, f)
+            if self.recNameType(f) is not None and fullpath not in self.busy and entry.is_file():
+                showInfo, meta = self.getRecordingInfo(rootdir, f)
+                folder = self.ruleFolder(rootdir, f, showInfo, meta)
+                season = None
+                if folder is None and self.conf_seasonfolders and showInfo[0]:
+                    eit = self.getEitInfo(rootdir, f)
+                    season = eit and eit.season
+                return f, showInfo, folder, season
+            elif entry.is_dir():
+                return f, None, None, None
+            return None
+
+    # addClassified() adds the result of classifyEntry() to
+    # self.shows or self.dirs. It must be run in the main thread.
+
+    def addClassified(self, classified):
+        if classified is None:
+            return
+        f, showInfo, folder, season = classified
+        if showInfo is None:
             self.dirs.add(f)
+            return
+        origShowname, pending_merge, start, err = showInfo
+        noRepeatName = self.stripRepeat(origShowname)
+        key = self.seriesKey(noRepeatName)
+        if self.cleanName(noRepeatName) and (not self.moveSelection or key in self.moveSelection) and not pending_merge:
+            if not self.isBusy(joinpath(self.rootdir, f)):
+                if folder is None and self.moviesFolder and noRepeatName.lower().startswith("movie: "):
+                    key = self.moviesKey
+                # Recordings sent to a rule or season folder are
+                # checked against rootdir in folderPath()
+                if key != self.rootKey or folder is not None or season is not None:
+                    siblings = self.siblings.get(f, 0) if self.siblings is not None else None
+                    self.shows[key].append(Recording(origShowname, f, start, siblings, key, folder, season))
+        elif err:
+            self.errMess.append(err)
+
+    # Moves are done in two stages. planFolder() decides which
+    # recordings to move and their destination names, without
+    # changing anything on disk, and leaves the plan in self.plan.
+    # executeMove() then does the planned renames, one recording at
+    # a time, after journalPlan() has recorded them in the journal.
+
+    # Plan the moves for the recordings in a scanned folder. entries
+    # are the folder's directory entries, and classified is the list
+    # of classifyEntry() results for them, or None to classify them
+    # here. prepare() must have been called for the run.
+    # Returns the plan, a list of PlanEntry, which is also left in
+    # self.plan.
+
+    def planFolder(self, rootdir, entries, classified=None):
+        self.startRoot(rootdir)
+        self.siblings = self.indexSiblings(entries)
+        if classified is None:
+            classified = [self.classifyEntry(entry, rootdir) for entry in entries]
+        for c in classified:
+            self.addClassified(c)
+        self.shows = sorted(self.shows.items())
+        self.planShows()
+        return list(self.plan)
+
+    # Recordings that a folder rule sends to a folder are always
+    # moved, and don't count towards the number of recordings
+    # needed to create a series folder. Recordings with a season
+    # number go in a season folder in the series folder.
 
-    def processRecording(self):
-        foldername, fileInfo = self.shows.pop(0)
+    def planSeries(self):
+        key, recordings = self.shows.pop(0)
+        foldername, exists = self.seriesFolder(key, recordings)
         numRecordings = int(self.conf_autofolder)
-        if (numRecordings != 0 and len(fileInfo) >= numRecordings) or foldername == self.moviesFolder or foldername in self.dirs or self.moveSelection:
-            for origShowname, fullname, date_time in fileInfo:
-                if not self.isPlaying(joinpath(self.rootdir, fullname)):
+        numSeries = sum(1 for rec in recordings if rec.folder is None)
+        if foldername == self.moviesFolder:
+            seriesReason = "movies"
+        elif exists or key == self.rootKey:
+            seriesReason = "existing"
+        elif self.moveSelection:
+            seriesReason = "selected"
+        elif numRecordings != 0 and numSeries >= numRecordings:
+            seriesReason = "count"
+        else:
+            seriesReason = None
+        for rec in recordings:
+            skipped = None
+            if rec.folder is not None:
+                reason = "rule"
+                destFolder = self.folderPath([level.replace("{series}", foldername) for level in rec.folder.split('/')])
+            elif seriesReason is None:
+                reason = None
+                destFolder = None
+                skipped = "few"
+            elif rec.season is not None:
+                reason = "season"
+                destFolder = self.folderPath([foldername, self.SEASON_FOLDER % rec.season])
+            else:
+                reason = seriesReason
+                destFolder = foldername
+            if skipped:
+                pass
+            elif destFolder is None:
+                skipped = "in place"
+            elif self.isBusy(joinpath(self.rootdir, rec.name)):
+                skipped = "busy"
+            if skipped:
+                self.plan.append(PlanEntry(rec, self.rootdir, destFolder, None, (), "", reason, skipped))
+                continue
+            renameList, suffix = self.recRenameList(destFolder, rec)
+            # Reserve the destination names for the rest of the plan
+            for fromPath, toPath in renameList:
+                self.addFolderName(destFolder, splitpath(toPath)[1])
+            self.plan.append(PlanEntry(rec, self.rootdir, destFolder, self.destRoot(destFolder), renameList, suffix, reason, None if renameList else "names"))
+
+    # The destination folder, relative to the destination root, for
+    # a recording sent to a rule or season folder with the given
+    # folder levels. If the folder would be created in the folder
+    # being processed, and its first levels are the last levels of
+    # that folder below the run's root folder, the rest of the
+    # folder is taken to be relative to it. A folder in another
+    # destination root keeps all its levels.
+    # Returns None if the recording is already in the folder.
+
+    def folderPath(self, levels):
+        parts = [level.strip() for level in levels]
+        parts = [part for part in parts if part not in ("", ".", "..")]
+        if not parts:
+            return None
+        foldername = os.sep.join(parts)
+        if self.destRoot(foldername) != self.rootdir:
+            if normpath(self.destDir(foldername)) == normpath(self.rootdir):
+                return None
+            return foldername
+        keys = [self.seriesKey(part) for part in parts]
+        rootKeys = self.rootKeys
+        for n in range(min(len(keys), len(rootKeys)), 0, -1):
+            if keys[:n] == rootKeys[-n:]:
+                parts = parts[n:]
+                break
+        return os.sep.join(parts) or None
 
-                    errorText = self.renameRecording(foldername, fullname)
-                    self.moves.append('%s - %s%s' % (origShowname, date_time, errorText))
+    # Plan the moves for self.shows and record them in the journal
 
-    def renameRecording(self, foldername, fullname):
-        errorText = ''
-        nerrors = 0
-        renameList = self.recRenameList(foldername, fullname)
+    def planMoves(self):
+        self.planShows()
+        self.journalPlan()
+
+    def planShows(self):
+        with self.stats.timing("plan"):
+            while self.shows:
+                self.planSeries()
+
+    def journalPlan(self):
+        self.writeJournal(self.unrecovered + [entry.renameList for entry in self.plan if not entry.skipped and not self.isCrossDevice(entry.destRoot)])
+
+    def writeJournal(self, renameLists):
+        if renameLists:
+            self.stats.count("journal write")
+            try:
+                renameJournal.write(renameLists)
+            except (IOError, OSError) as e:
+                print("[Series2Folder] Can't write rename journal:", e)
+
+    def executeMove(self):
+        with self.stats.timing("rename"):
+            self.__executeMove()
+
+    def __executeMove(self):
+        entry = self.plan.popleft()
+        rec = entry.rec
+        if not entry.skipped and self.isBusy(joinpath(self.rootdir, rec.name)):
+            entry.skipped = "busy"
+        if entry.skipped:
+            if entry.skipped == "names":
+                self.errMess.append(_("Too many recordings with similar filenames: %s") % rec.name)
+                self.moves.append((rec, _(" - Error")))
+            self.keepRecording(entry.foldername, rec)
+            return
+        if self.isCrossDevice(entry.destRoot):
+            self.crossMoves.append(entry.renameList)
+            self.moves.append((rec, _(" - moving in background")))
+            return
+        errorText = self.renameRecording(entry.foldername, rec.name, entry.renameList, entry.destRoot)
+        self.moves.append((rec, errorText))
+        if errorText:
+            self.keepRecording(entry.foldername, rec)
+        else:
+            self.changes.moved.append((normpath(joinpath(self.rootdir, rec.name)), normpath(entry.destDir)))
+
+    def executePlan(self):
+        while self.plan:
+            self.executeMove()
+        self.planDone()
+
+    # Apply a plan made by planFolder(), possibly in an earlier run,
+    # without scanning the folders again. prepare() must have been
+    # called for the run. Entries whose files have changed since the
+    # plan was made are skipped, so that nothing is overwritten.
+
+    def applyPlan(self, plan):
+        byRoot = defaultdict(list)
+        for entry in plan:
+            byRoot[entry.rootdir].append(entry)
+        for rootdir in sorted(byRoot):
+            self.startRoot(rootdir)
+            for entry in byRoot[rootdir]:
+                if not entry.skipped and not (self.planEntryCurrent(entry) and self.planEntryValid(entry)):
+                    entry.skipped = "changed"
+            self.plan = deque(byRoot[rootdir])
+            self.journalPlan()
+            self.executePlan()
+
+    # True if the entry's destination root is still where the
+    # current configuration sends the folder: its destination root,
+    # or the recording folder for a series folder that is already
+    # there (see seriesFolder())
+
+    def planEntryCurrent(self, entry):
+        if entry.destRoot == self.destRoot(entry.foldername):
+            return True
+        self.stats.count("stat")
+        return entry.destRoot == entry.rootdir and isdir(joinpath(entry.rootdir, entry.foldername.split(os.sep, 1)[0]))
+
+    def planEntryValid(self, entry):
+        self.stats.count("stat", 2 * len(entry.renameList))
+        return all(lexists(fromPath) and not lexists(toPath) for fromPath, toPath in entry.renameList)
+
+    # Called when all the moves in the plan have been done. The
+    # journal is only kept for recordings that are left partly
+    # moved.
+
+    def planDone(self):
+        if self.unrecovered:
+            self.writeJournal(self.unrecovered)
+        else:
+            renameJournal.remove()
+
+    # Called at the end of the run to start the moves to other
+    # filesystems
+
+    def startCrossMoves(self):
+        if self.crossMoves:
+            JobManager.AddJob(MoveJob(self.crossMoves))
+            self.crossMoves = []
+
+    # Called for each recording that executeMove() leaves in
+    # rootdir, with its Recording
+
+    def keepRecording(self, foldername, rec):
+        pass
+
+    def renameRecording(self, foldername, fullname, renameList, destRoot=None):
         if renameList:
+            try:
+                self.makeFolder(foldername, destRoot)
+            except OSError as e:
+                self.errMess.append(e.__str__())
+                return _(" - Error")
+            done = []
             for fromPath, toPath in renameList:
+                self.stats.count("rename")
                 try:
-                    os.renames(fromPath, toPath)
+                    os.rename(fromPath, toPath)
+                    done.append((fromPath, toPath))
                     print("[Series2Folder] rename", fromPath, "to", toPath)
                 except Exception as e:
                     self.errMess.append(e.__str__())
-                    nerrors += 1
-                    errorText = ngettext(" - Error", " - Errors", nerrors)
-        else:
-            self.errMess.append(_("Too many recordings with similar filenames: %s") % fullname)
-            errorText = _(" - Error")
-        return errorText
-
-    def recRenameList(self, foldername, fullname):
-        i = 0
-        destBase, destExt = splitext(fullname)
-        while True:
-            if i:
-                suffix = "_%03d" % i
-            else:
-                suffix = ''
-            i += 1
-            renameList = tuple(((joinpath(self.rootdir, f), joinpath(self.rootdir, foldername, self.addSuffix(f, suffix))) for f in self.recFileList(self.rootdir, fullname)))
-            if not any((lexists(t[1]) for t in renameList)):
-                return renameList
-            if i > 999:
-                return []
+                    self.undoRenames(done, renameList)
+                    return _(" - Error")
+        return ''
+
+    # Move the files of a recording that renameRecording() had
+    # moved back, in reverse order, so that a recording isn't left
+    # split between two folders. If that fails, the recording's
+    # renames are kept in the journal (see planDone()) for the next
+    # run to complete or undo.
+
+    def undoRenames(self, done, renameList):
+        for fromPath, toPath in reversed(done):
+            self.stats.count("rename")
+            try:
+                os.rename(toPath, fromPath)
+                print("[Series2Folder] undo rename", fromPath, "to", toPath)
+            except Exception as e:
+                self.errMess.append(e.__str__())
+                self.unrecovered.append(renameList)
+                return
+
+    # Create a destination folder in destRoot (by default, the
+    # folder's destination root) if it doesn't already exist.
+    # Each folder is only checked once in a run.
+
+    def makeFolder(self, foldername, destRoot=None):
+        if destRoot is None:
+            destRoot = self.destRoot(foldername)
+        path = joinpath(destRoot, foldername)
+        if path not in self.madeFolders:
+            self.stats.count("stat")
+            if not isdir(path):
+                self.recordNewFolders(foldername, destRoot)
+                self.stats.count("mkdir")
+                os.makedirs(path)
+            self.madeFolders.add(path)
+            topFolder = foldername.split(os.sep, 1)[0]
+            self.folderKeys(destRoot).setdefault(self.seriesKey(topFolder), topFolder)
+            self.dirs.add(topFolder)
+
+    # Add the levels of foldername in destRoot that don't exist yet
+    # to the change set, before they're created
+
+    def recordNewFolders(self, foldername, destRoot):
+        path = destRoot
+        for level in foldername.split(os.sep):
+            path = joinpath(path, level)
+            self.stats.count("stat")
+            if not isdir(path):
+                self.changes.folders.append(normpath(path))
+
+    # Use the recording's names if they are free in the folder,
+    # otherwise the suffix after the highest one already used
+    # for the name in the folder. Only if that is beyond _999
+    # look for an unused suffix.
+    # Returns the rename list and the suffix used ("" if none),
+    # or an empty rename list if there are no free names.
+
+    def recRenameList(self, foldername, rec):
+        fullname = rec.name
+        recFiles = self.recFileList(self.rootdir, rec)
+        folderNames = self.folderContents(foldername)
+        destDir = self.destDir(foldername)
+        if not any((f in folderNames for f in recFiles)):
+            return tuple(((joinpath(self.rootdir, f), joinpath(destDir, f)) for f in recFiles)), ""
+        nextSuffix = self.folderSuffixes(foldername).get(self.splitSuffix(fullname)[0], 0) + 1
+        for i in chain((nextSuffix, ) if nextSuffix <= 999 else (), range(1, 1000)):
+            suffix = "_%03d" % i
+            destFiles = [self.addSuffix(f, suffix) for f in recFiles]
+            if not any((f in folderNames for f in destFiles)):
+                return tuple(((joinpath(self.rootdir, f), joinpath(destDir, d)) for f, d in zip(recFiles, destFiles))), suffix
+        return (), ""
+
+    # Split a recording file name into the stem that addSuffix()
+    # adds a suffix to and the number of any existing _NNN suffix
+    # (0 if there is none).
+
+    def splitSuffix(self, f):
+        base, ext = splitext(f)
+        if ext in self.TSEXTS:
+            base = splitext(base)[0]
+        if base[-4:-3] == '_' and base[-3:].isdigit():
+            return base[0:-4], int(base[-3:])
+        return base, 0
 
     def addSuffix(self, f, suffix):
         if not suffix:
@@ -284,20 +1255,27 @@ class Series2FolderActionsBase(object):
         return base1 + suffix + ext1
 
     def finish(self, notification=False, stopping=False):
+        with self.stats.timing("notify"):
+            self.showResults(notification)
+        self.stats.done()
+        metaCache.save(wait=stopping)
+
+    def showResults(self, notification):
         if self.moves:
             title = ngettext("Series to Folder moved the following recording", "Series to Folder moved the following recordings", len(self.moves))
             if self.errMess:
                 title += ngettext(" - with an error", " - with errors", len(self.errMess))
         else:
-            title = _("Series to Folder did not find anything to move in %s") % self.rootdir
+            title = _("Series to Folder did not find anything to move in %s") % ", ".join(self.roots)
 
-        if self.errMess or len(self.moves) > 20:
+        moves = ['%s%s' % (rec, errorText) for rec, errorText in self.moves]
+        if self.errMess or len(moves) > 20:
             if self.errMess:
-                self.moves.append("--------")
-            self.moves += self.errMess
-            self.session.open(ErrorBox, text='\n'.join(self.moves), title=title)
-        elif self.moves:
-            self.MsgBox('\n'.join([title + ':'] + self.moves), notification=notification)
+                moves.append("--------")
+            moves += self.errMess
+            self.session.open(ErrorBox, text='\n'.join(moves), title=title)
+        elif moves:
+            self.MsgBox('\n'.join([title + ':'] + moves), notification=notification)
         else:
             self.MsgBox(title, timeout=10, notification=notification)
         self.moves = []
@@ -309,13 +1287,54 @@ class Series2FolderActionsBase(object):
         else:
             self.session.open(MessageBox, msg, type=msgType, timeout=timeout)
 
-    def isPlaying(self, fullpath):
-        playing = NavigationInstance.instance.getCurrentlyPlayingServiceReference()
-        return playing is not None and playing.valid() and playing.getPath() == fullpath
-
-    def recFileList(self, rootdir, fullname):
+    # The full pathnames of the .ts files of the recordings that
+    # are being recorded, played or streamed to network clients.
+    # The snapshot is kept until a record or playback event
+    # invalidates it, or it is BUSY_REFRESH seconds old, because
+    # there are no events for streaming clients.
+    # Recordings being saved from timeshift aren't included: they
+    # are tagged as pending a merge in their .meta file, and
+    # addClassified() skips them.
+    # Only call busyPaths() from the main thread. Worker threads
+    # can use the current snapshot, self.busy.
+
+    def busyPaths(self):
+        if self.busyTime is None or time() - self.busyTime > self.BUSY_REFRESH:
+            self.stats.count("busy snapshot")
+            self.busy = self.getBusyPaths()
+            self.busyTime = time()
+        return self.busy
+
+    def getBusyPaths(self):
+        nav = NavigationInstance.instance
+        busy = set([timer.Filename + self.TS for timer in nav.RecordTimer.timer_list if timer.state in (timer.StatePrepared, timer.StateRunning) and not timer.justplay and hasattr(timer, "Filename")])
+        playing = nav.getCurrentlyPlayingServiceReference()
+        if playing is not None and playing.valid():
+            busy.add(playing.getPath())
+        if eStreamServer is not None:
+            try:
+                for client in eStreamServer.getInstance().getConnectedClients():
+                    busy.add(eServiceReference(client[1]).getPath())
+            except Exception as e:
+                print("[Series2Folder] Can't get stream clients:", e)
+        busy.discard("")
+        return frozenset(normpath(path) for path in busy)
+
+    def invalidateBusy(self, *args):
+        self.busyTime = None
+
+    def isBusy(self, fullpath):
+        self.stats.count("busy check")
+        return fullpath in self.busyPaths()
+
+    def recFileList(self, rootdir, rec):
+        fullname = rec.name
+        if rec.siblings is not None:
+            base = fullname[0:-len(self.TS)]
+            return [fullname] + [base + ending for ending in self.SIBLING_NAMES if rec.siblings & self.SIBLING_BITS[ending]]
         base, ext = splitext(fullname)
         recFiles = [fullname]
+        self.stats.count("stat", len(self.BAREEXTS) + len(self.TSEXTS))
         for e in self.BAREEXTS:
             f = base + e
             if isfile(joinpath(rootdir, f)):
@@ -331,14 +1350,33 @@ class Series2FolderActionsBase(object):
         name = name.strip()
 
         if self.conf_striprepeattags:
-            repeat_str = self.conf_repeatstr.strip()
-            if repeat_str:
-                if name.startswith(repeat_str):
-                    name = name[len(repeat_str):].strip()
-                elif name.endswith(repeat_str):
-                    name = name[:-len(repeat_str)].strip()
+            stripped = True
+            while stripped and name:
+                stripped = False
+                lowerName = name.lower()
+                for tag in self.repeatTags:
+                    if lowerName.startswith(tag):
+                        name = name[len(tag):].strip()
+                        stripped = True
+                        break
+                    elif lowerName.endswith(tag):
+                        name = name[:-len(tag)].strip()
+                        stripped = True
+                        break
         return name
 
+    # The key used to group recordings into series and to match
+    # them with existing folders: the name with case differences
+    # ignored and runs of punctuation and white space replaced by
+    # a single space.
+
+    def seriesKey(self, name):
+        if isinstance(name, six.binary_type):
+            name = name.decode("utf-8", "replace")
+        key = _keyPunctuation.sub(' ', name).strip()
+        key = key.casefold() if hasattr(key, "casefold") else key.lower()
+        return key or name
+
     def cleanName(self, name):
         name = name.strip()
 
@@ -351,78 +1389,129 @@ class Series2FolderActionsBase(object):
         name = ''.join(['_' if c in non_allowed_characters or ord(c) < 32 else c for c in name])
         return name
 
-    def getShowInfo(self, rootdir, fullname):
+    # Return the MetaInfo from a recording's .meta file. Raises
+    # an exception if there's no .meta file or it can't be read.
+    # Recordings' MetaInfo is kept in the metadata cache, so it
+    # can be looked up again without reading the file.
+
+    def getMetaInfo(self, rootdir, fullname):
         path = joinpath(rootdir, fullname) + self.META
+        self.stats.count("stat")
+        st = os.stat(path)
+        cached = metaCache.get(path, st)
+        if cached is not None:
+            return MetaInfo.fromTuple(cached)
+        self.stats.count("meta read")
+        meta = readMeta(path)
+        metaCache.put(path, st, meta.toTuple())
+        return meta
+
+    def getShowInfo(self, rootdir, fullname):
+        return self.getRecordingInfo(rootdir, fullname)[0]
+
+    # Returns the getShowInfo() result for a recording and its
+    # MetaInfo, or None if it doesn't have a readable .meta file.
+
+    def getRecordingInfo(self, rootdir, fullname):
         err_mess = None
         try:
-            lines = open(path).readlines()
-            showname = lines[1].strip()
-            t = int(lines[3].strip())
-            pending_merge = len(lines) > 4 and "pts_merge" in lines[4].strip().split(' ')
-            date_time = strftime("%d.%m.%Y %H:%M", localtime(t))
-            filebase = splitext(fullname)[0]
-            if filebase[-4:-3] == "_" and filebase[-3:].isdigit():
-                date_time += '#' + filebase[-3:]
+            meta = self.getMetaInfo(rootdir, fullname)
+            showname = meta.title
+            t = meta.time
+            pending_merge = meta.pendingMerge()
         except Exception:
-            showname, date_time, pending_merge, err_mess = self.recSplit(fullname)
+            meta = None
+            showname, __, pending_merge, err_mess = self.recSplit(fullname)
+            t = None
 
         if showname:
             showname.replace('/', '_')
             showname = showname[:255]
 
-        return showname, pending_merge, date_time, err_mess
+        return (showname, pending_merge, t, err_mess), meta
 
-    def recNameType(self, fullname):
-        def isDate(s):
-            return s.isdigit() and len(s) == 8 and int(s[4:6]) <= 12 and int(s[6:8]) <= 31
+    # Return the EitInfo from a recording's .eit file, or None if
+    # it doesn't have one or it can't be read. Like MetaInfo, it is
+    # kept in the metadata cache.
 
-        def isHHMM(s):
-            return s.isdigit() and len(s) == 4 and int(s[0:2]) < 24 and int(s[2:4]) < 60
+    def getEitInfo(self, rootdir, fullname):
+        path = joinpath(rootdir, splitext(fullname)[0] + ".eit")
+        try:
+            self.stats.count("stat")
+            st = os.stat(path)
+            cached = metaCache.get(path, st)
+            if cached is not None:
+                return EitInfo.fromTuple(cached)
+            self.stats.count("eit read")
+            eit = readEit(path)
+        except (IOError, OSError, ValueError):
+            return None
+        metaCache.put(path, st, eit.toTuple())
+        return eit
+
+    # The destination folder template from the first folder rule
+    # that matches a recording, or None. Like classifyEntry(), it
+    # can be run in a worker thread.
+
+    def ruleFolder(self, rootdir, fullname, showInfo, meta):
+        showname, __, start, __ = showInfo
+        if self.folderRules is None or not showname:
+            return None
+        parsed = self.parseName(fullname)
+        if start is not None:
+            year = strftime("%Y", localtime(start))
+        else:
+            year = parsed and parsed.date[0:4]
+        return self.folderRules.folder(
+            self.stripRepeat(showname),
+            parsed and parsed.channel,
+            meta and meta.serviceRef,
+            meta.tags if meta else (),
+            year,
+            lambda: self.getEitInfo(rootdir, fullname),
+            self.cleanName
+        )
 
-        base, ext = splitext(fullname)
-        if ext == self.TS:
-            parts = base.split(' - ')
-            if len(parts) > 1:
-                t = parts[0]
-                if len(t) == 8 and isDate(t[0:8]):
-                    return "short"
-                elif len(t) == 13 and isDate(t[0:8]) and t[8] == ' ' and isHHMM(t[9:13]):
-                    return "long" if len(parts) >= 4 else "standard"
-                else:
-                    t = parts[-1]
-                    if len(t) >= 14 and isDate(t[0:8]) and t[8] == ' ' and isHHMM(t[9:13]) and t[13] == '_':
-                        return "event"
-        return None
+    # Return the NameParser.ParsedName for a recording's .ts file
+    # name, or None if the name isn't in a recognised format.
+    # The results are kept for the run.
+
+    def parseName(self, fullname):
+        if not fullname.endswith(self.TS):
+            return None
+        try:
+            return self.parsedNames[fullname]
+        except KeyError:
+            parsed = self.parsedNames[fullname] = NameParser.parseName(fullname)
+            return parsed
+
+    def recNameType(self, fullname):
+        parsed = self.parseName(fullname)
+        return parsed and parsed.nameType
 
     def recSplit(self, fullname):
-        nameType = self.recNameType(fullname)
-        if nameType is None:
+        parsed = self.parseName(fullname)
+        if parsed is None:
             return None, None, False, _("Can not extract show name for: %s") % fullname
-        base = splitext(fullname)[0]
-        parts = base.split(' - ')
-        if nameType == "event":
-            t = parts[-1]
-            date_time = '.'.join((t[6:8], t[4:6], t[0:4])) + ' ' + t[9:11] + ':' + t[11:13]
-            showname = parts[0]
-        else:
-            t = parts[0]
-            showname = parts[1]
-            date_time = '.'.join((t[6:8], t[4:6], t[0:4]))
-            if nameType in ("standard", "long"):
-                date_time += ' ' + t[9:11] + ':' + t[11:13]
-                showname = parts[2]
-        if base[-4:-3] == "_" and base[-3:].isdigit():
-            date_time += '#' + base[-3:]
-            if nameType != "event":
-                showname = showname[0:-4]
-        return showname, date_time, False, None
+        return parsed.show, NameParser.formatDateTime(parsed), False, None
 
 
 class Series2FolderActions(Series2FolderActionsBase):
+
+    # The Series2FolderActions instance that is running, if any
+    running = None
+
     def __init__(self, session):
         super(Series2FolderActions, self).__init__(session)
+        self.prefetchTimer = eTimer()
+        self.prefetchTimer.callback.append(self.checkPrefetch)
 
-    def doMoves(self, service=None, selectedOnly=False, serviceList=None):
+        # In a dry run, the plans for the folders are collected in
+        # self.preview instead of being carried out
+        self.dryRun = False
+        self.preview = []
+
+    def doMoves(self, service=None, selectedOnly=False, serviceList=None, dryRun=False):
 
         if Screens.Standby.inTryQuitMainloop:
             self.MsgBox(_("Your %s %s is trying to shut down. No recordings moved.") % (getMachineBrand(), getMachineName()), timeout=10)
@@ -436,36 +1525,110 @@ class Series2FolderActions(Series2FolderActionsBase):
             self.MsgBox(_("Series to Folder is already running in the background."), timeout=10)
             return
 
-        self.prepare(service, selectedOnly=selectedOnly, serviceList=serviceList)
-
-        try:
-            contents = os.listdir(self.rootdir)
-        except Exception as ex:
-            self.errMess.append("Can not process folder: %s" % str(ex))
-            self.finish()
+        if Series2FolderActions.running:
+            self.MsgBox(_("Series to Folder is already running."), timeout=10)
             return
 
-        for f in contents:
-            self.addRecording(f)
+        self.prepare(service, selectedOnly=selectedOnly, serviceList=serviceList, dryRun=dryRun)
+        self.dryRun = dryRun
+        self.preview = []
 
-        # create a directory for each series and move shows into it
-        # also add any single shows to existing series directories
+        # Scan the folders in worker threads so that the UI
+        # doesn't freeze while a slow disk is read. The moves are
+        # done in the main thread by prefetchDone(), one folder
+        # at a time as the scan of each is completed.
 
-        self.shows = sorted(self.shows.items())
-        while self.shows:
-            self.processRecording()
+        Series2FolderActions.running = self
+        NavigationInstance.instance.record_event.append(self.invalidateBusy)
+        NavigationInstance.instance.event.append(self.invalidateBusy)
+        self.startScan(True)
+        self.prefetchTimer.start(self.SCAN_POLL, False)
 
+    def checkPrefetch(self):
+        try:
+            while self.scanned:
+                self.prefetchDone(*self.scanned.popleft())
+            if not self.scanFinished.is_set() or self.scanned:
+                return
+        except Exception:
+            # Don't leave the run marked as running
+            self.cleanup()
+            raise
+        self.cleanup()
+        self.startCrossMoves()
         self.updateCallerScreen()
-
         self.finish()
 
+    # Stop the run's timer and event callbacks and mark it as
+    # finished. Called on every exit from a run, including when
+    # the run fails.
+
+    def cleanup(self):
+        self.prefetchTimer.stop()
+        if Series2FolderActions.running is self:
+            Series2FolderActions.running = None
+        if self.invalidateBusy in NavigationInstance.instance.record_event:
+            NavigationInstance.instance.record_event.remove(self.invalidateBusy)
+        if self.invalidateBusy in NavigationInstance.instance.event:
+            NavigationInstance.instance.event.remove(self.invalidateBusy)
+        # A background run may be waiting for this run to end
+        if _autoSeries2Folder:
+            _autoSeries2Folder.deferralEvent()
+
+    def prefetchDone(self, path, entries, classified, ex):
+        if ex is not None:
+            self.scanFailed(path, ex)
+            return
+        if path in self.rootsDone:
+            return
+        self.rootsDone.add(path)
+
+        # create a directory for each series and move shows into it
+        # also add any single shows to existing series directories
+
+        plan = self.planFolder(path, entries, classified)
+        if self.dryRun:
+            self.preview += plan
+            self.plan = deque()
+        else:
+            self.journalPlan()
+            self.executePlan()
+
+    def showResults(self, notification):
+        if not self.dryRun:
+            return super(Series2FolderActions, self).showResults(notification)
+        moves = [entry.describe() for entry in self.preview if not entry.skipped]
+        skipped = [entry.describe() for entry in self.preview if entry.skipped and entry.skipped != "few"]
+        if moves:
+            title = ngettext("Series to Folder would move the following recording", "Series to Folder would move the following recordings", len(moves))
+        else:
+            title = _("Series to Folder did not find anything to move in %s") % ", ".join(self.roots)
+        lines = moves
+        if moves and (skipped or self.errMess):
+            lines.append("--------")
+        lines += skipped + self.errMess
+        if lines:
+            self.session.open(ErrorBox, text='\n'.join(lines), title=title)
+        else:
+            self.MsgBox(title, timeout=10, notification=notification)
+        self.preview = []
+        self.errMess = []
+
     def updateCallerScreen(self):
+        with self.stats.timing("notify"):
+            return self.__updateCallerScreen()
+
+    def __updateCallerScreen(self):
         fails = False
         if self.moves:
             for (dialog, action) in activeFileScreens(self.session, False):
                 try:
-                    getattr(dialog, action)()
-                except Exception as e:
+                    if self.updateInPlace(dialog):
+                        self.stats.count("screen updated")
+                    else:
+                        self.stats.count("screen reloaded")
+                        getattr(dialog, action)()
+                except Exception:
                     fails = True
                     pass
             if fails:
@@ -473,15 +1636,69 @@ class Series2FolderActions(Series2FolderActionsBase):
                 self.MsgBox(msg, msgType=MessageBox.TYPE_WARNING)
         return not fails
 
+    # Apply the run's changes to a screen's movie list without
+    # reloading it, if the list has the MovieList interface and the
+    # changes only remove rows from it: the rows for the recordings
+    # moved out of the folder it shows are removed, and the rows for
+    # the folders they were moved to are redrawn.
+    # MovieList has no way to insert a row in its sorted position,
+    # and its rows' contents differ between images, so if the run
+    # created a folder in the shown folder, or moved recordings
+    # into it, the screen is reloaded instead. That includes the
+    # first move of a new series out of the shown folder.
+    # Returns False if the screen needs to be reloaded.
+
+    def updateInPlace(self, dialog):
+        try:
+            movieList = dialog["list"]
+        except (KeyError, TypeError, AttributeError):
+            return False
+        root = getattr(movieList, "root", None)
+        rows = getattr(movieList, "list", None)
+        if root is None or rows is None or not hasattr(movieList, "removeService"):
+            return False
+        dir = root.getPath()
+        if not dir:
+            return False
+        dir = normpath(dir)
+        if self.changes.addedTo(dir):
+            return False
+        removed = self.changes.removedFrom(dir)
+        changedFolders = self.changes.changedFolders(dir)
+        for serviceRef in [row[0] for row in rows if row[0] and normpath(row[0].getPath()) in removed]:
+            movieList.removeService(serviceRef)
+        if hasattr(movieList, "invalidateItem"):
+            for i, row in enumerate(movieList.list):
+                if row[0] and normpath(row[0].getPath()) in changedFolders:
+                    movieList.invalidateItem(i)
+        return True
+
 class Series2FolderAutoActions(Series2FolderActionsBase):
+    RUN_MODE = "background"
 
     ITER_STEP = 20  # ms Time to wait between search and processing steps
+    STEP_SLICE = 50  # ms Initial time allowed for scanning or moving in each step
+    MIN_SLICE = 10  # ms Smallest step time when the step time adapts to the UI
+    MAX_SLICE = STEP_SLICE  # ms Largest step time when the step time adapts to the UI
+    SLICE_GROW = 10  # ms Increase in the step time after a step that used all its time
+    LATENCY_LIMIT = 40  # ms Lateness of the step timer that shows that the UI is busy
+    IDLE_LATENCY = 5  # ms Greatest lateness of the step timer that shows that the UI is idle
     START_DELAY = 2 * 60  # sec Delay time before first scan after restart
     TASK_DEFER = 1 * 60  # sec Defer time when task running
     FILESCREEN_DEFER = 1 * 60  # sec Defer time when in a file list screen
     TSRECORD_DEFER = 1 * 60  # sec Defer time when timeshift recording is active
     RECPLAYEND_DEFER = 5  # sec Defer time after a recording or playback ends
     RECPLAYENDACTIVE_DEFER = 1 * 60  # sec Defer time after a recording or playback ends while Series2FolderAutoActions is active
+    RECORD_END_WINDOW = 1 * 60  # sec Greatest difference between a timer's end time and the time its recording stopped event is seen
+    RESUME_CHECK = 1000  # ms Delay before checking whether a deferred run can resume after an event that may end the deferral
+
+    # inotify events on the recording directory that are passed
+    # to gotDirEvent()
+    WATCH_MASK = (
+        DirWatcher.IN_CLOSE_WRITE | DirWatcher.IN_CREATE |
+        DirWatcher.IN_MOVED_TO | DirWatcher.IN_MOVED_FROM | DirWatcher.IN_DELETE |
+        DirWatcher.IN_DELETE_SELF | DirWatcher.IN_MOVE_SELF | DirWatcher.IN_ONLYDIR
+    )
 
     def __init__(self, session):
         super(Series2FolderAutoActions, self).__init__(session)
@@ -489,16 +1706,75 @@ class Series2FolderAutoActions(Series2FolderActionsBase):
         self.iterTimer.callback.append(self.runStep)
         self.runTimer = eTimer()
         self.runTimer.callback.append(self.runMoves)
+        self.fullScanTimer = eTimer()
+        self.fullScanTimer.callback.append(self.requestFullScan)
+        self.resumeTimer = eTimer()
+        self.resumeTimer.callback.append(self.checkResume)
         self.nextRun = -1
+        self.dirList = deque()
         self.conf_autonotifications = config.plugins.seriestofolder.autonotifications.value
 
+        # True while a folder is being processed
+        self.inRoot = False
+
+        # The time allowed for each step, in ms, when the time the
+        # next step is due, and whether the last step used all its
+        # time (see adaptSlice())
+        self.stepSlice = self.STEP_SLICE
+        self.stepDue = None
+        self.sliceUsed = False
+
+        # Index of the recordings left in each folder and of the
+        # existing folders in it, kept between runs so that a run
+        # after a recording stops only needs to look at the series
+        # of the new recordings.
+        # indexes maps each folder to (seriesIndex, dirs), where
+        # seriesIndex maps the series key for a series to its
+        # self.shows entries. seriesIndex is the index for rootdir.
+        # indexKey records the folders that the index was built
+        # for.
+        self.indexKey = None
+        self.indexes = {}
+        self.seriesIndex = {}
+
+        # The modification time of each folder in indexes when its
+        # index was last brought up to date, for IndexSnapshot
+        self.indexTimes = {}
+
+        # True until the first run after autoStart(), which starts
+        # from the index saved by the last autoStop(), if it's
+        # still valid
+        self.warmStart = False
+
+        # When True, the next run scans all the folders
+        self.needFullScan = True
+
+        # Names of recordings in each folder that need to be
+        # processed by the next incremental run, and the names
+        # being processed by the current run
+        self.pendingFiles = defaultdict(set)
+        self.runFiles = {}
+        self.incremental = False
+
+        # Optional inotify watcher on the recording folders
+        self.dirWatcher = None
+        self.watchedDirs = set()
+
+        # While a run is deferred, the callback lists of the jobs
+        # and screens that it's waiting for, with deferralEvent()
+        # added, and whether deferralEvent() is a timeshift
+        # recording notifier (see watchDeferral())
+        self.deferred = False
+        self.deferralWatches = []
+        self.watchingTimeshift = False
+
     def prepare(self, service):
         super(Series2FolderAutoActions, self).prepare(service)
 
         self.conf_autonotifications = config.plugins.seriestofolder.autonotifications.value
 
-        # Listing of the recording directory
-        self.dirList = []
+        # Listing of the folder being processed
+        self.dirList = deque()
 
     def autoStart(self):
         self.runTimer.stop()
@@ -508,15 +1784,22 @@ class Series2FolderAutoActions(Series2FolderActionsBase):
             NavigationInstance.instance.event.append(self.gotPlayEvent)
         self.iterTimer.stop()
         self.runTimer.stop()
+        self.needFullScan = True
+        self.warmStart = True
+        self.updateWatch()
         self.runTimer.startLongTimer(self.START_DELAY)
 
     def autoStop(self):
+        self.saveIndex()
         self.finish(stopping=True)
         self.__del__()
 
     def __del__(self):
         self.iterTimer.stop()
         self.runTimer.stop()
+        self.fullScanTimer.stop()
+        self.stopWatch()
+        self.unwatchDeferral()
         if self.gotRecordEvent in NavigationInstance.instance.record_event:
             NavigationInstance.instance.record_event.remove(self.gotRecordEvent)
         if self.gotPlayEvent in NavigationInstance.instance.event:
@@ -526,16 +1809,72 @@ class Series2FolderAutoActions(Series2FolderActionsBase):
         return self.iterTimer.isActive()
 
     def gotPlayEvent(self, event):
+        self.invalidateBusy()
         if event == iPlayableService.evEnd:
             playing = NavigationInstance.instance.getCurrentlyPlayingServiceReference()
             playing = playing and playing.valid() and playing.getPath() or ""
-            if playing.startswith(self.rootdir):
+            if playing and self.isMovieDir(splitpath(playing)[0]):
+                self.addPending(playing)
                 self.gotServiceEvent(event)
 
     def gotRecordEvent(self, record, event):
+        self.invalidateBusy()
         if event == iRecordableService.evRecordStopped:
+            paths = self.recordingPaths(record)
+            if paths:
+                for path in paths:
+                    self.addPending(path)
+            else:
+                self.addPending(None)
             self.gotServiceEvent(event)
 
+    # Find the .ts file names for a stopped recording service from
+    # its record timer. Record services are SWIG proxies, and two
+    # proxies for the same service don't compare equal, so, like
+    # RecordTimer, the services they refer to are compared. If the
+    # timer has already let go of its service, the timers that
+    # ended around now are taken to be the recording's.
+    # Returns an empty list if no timer can be found.
+
+    def recordingPaths(self, record):
+        recordTimer = NavigationInstance.instance.RecordTimer
+        timers = [timer for timer in recordTimer.timer_list + recordTimer.processed_timers if hasattr(timer, "Filename")]
+        service = self.serviceOf(record)
+        paths = [
+            timer.Filename + self.TS for timer in timers
+            if getattr(timer, "record_service", None) is not None and self.serviceOf(timer.record_service) == service
+        ]
+        if not paths:
+            now = time()
+            paths = [
+                timer.Filename + self.TS for timer in timers
+                if getattr(timer, "record_service", None) is None and abs(getattr(timer, "end", 0) - now) <= self.RECORD_END_WINDOW
+            ]
+        return paths
+
+    @staticmethod
+    def serviceOf(record):
+        try:
+            return record.__deref__()
+        except AttributeError:
+            return record
+
+    # Queue a recording for the next incremental run. Recordings
+    # outside the processed folders are ignored. If the recording
+    # can't be identified, or is in a folder that isn't in the
+    # index, the next run scans all the folders.
+
+    def addPending(self, path):
+        if path:
+            dir, fullname = splitpath(path)
+            dir = normpath(dir)
+            if dir in self.indexes:
+                self.pendingFiles[dir].add(fullname)
+            elif self.isMovieDir(dir):
+                self.needFullScan = True
+        else:
+            self.needFullScan = True
+
     def gotServiceEvent(self, event):
         self.runTimer.stop()
         if self.isActive():
@@ -543,56 +1882,456 @@ class Series2FolderAutoActions(Series2FolderActionsBase):
         else:
             self.runTimer.startLongTimer(self.RECPLAYEND_DEFER)
 
+    # Start, retarget or stop the inotify watches on the recording
+    # folders to match the current configuration. Folders below
+    # them aren't watched.
+
+    def updateWatch(self):
+        if not config.plugins.seriestofolder.watchdir.value or not DirWatcher.isAvailable():
+            self.stopWatch()
+            return
+        roots = set(self.movieRoots(defaultMoviePath()))
+        if self.watchedDirs == roots:
+            return
+        try:
+            if self.dirWatcher is None:
+                self.dirWatcher = DirWatcher.DirWatcher(self.gotDirEvent)
+                self.dirWatcher.start()
+        except OSError as e:
+            print("[Series2Folder] Can't watch recording folders", e)
+            self.stopWatch()
+            return
+        for dir in self.watchedDirs - roots:
+            self.dirWatcher.removeWatch(dir)
+            self.watchedDirs.discard(dir)
+        for dir in roots - self.watchedDirs:
+            try:
+                self.dirWatcher.addWatch(dir, self.WATCH_MASK)
+                self.watchedDirs.add(dir)
+            except OSError as e:
+                print("[Series2Folder] Can't watch", dir, e)
+
+    def stopWatch(self):
+        if self.dirWatcher is not None:
+            self.dirWatcher.stop()
+            self.dirWatcher = None
+        self.watchedDirs = set()
+
+    # Series folders are tracked from their create, move and
+    # delete events in the watched folder, so they don't need
+    # their own watches. A watch that the kernel has removed, for
+    # example because the folder's filesystem was unmounted, is
+    # added again by the next run's updateWatch().
+
+    def gotDirEvent(self, dir, name, mask):
+        if mask & DirWatcher.IN_Q_OVERFLOW:
+            self.requestFullScan()
+        elif mask & (DirWatcher.IN_DELETE_SELF | DirWatcher.IN_MOVE_SELF | DirWatcher.IN_IGNORED):
+            self.watchedDirs.discard(dir)
+            self.needFullScan = True
+        elif dir not in self.indexes:
+            pass
+        elif mask & DirWatcher.IN_ISDIR:
+            indexDirs = self.indexes[dir][1]
+            if mask & (DirWatcher.IN_CREATE | DirWatcher.IN_MOVED_TO):
+                indexDirs.add(name)
+            elif mask & (DirWatcher.IN_DELETE | DirWatcher.IN_MOVED_FROM):
+                indexDirs.discard(name)
+        elif mask & (DirWatcher.IN_CLOSE_WRITE | DirWatcher.IN_MOVED_TO):
+            fullname = self.recordingName(name)
+            if fullname and self.recNameType(fullname) is not None:
+                self.addPending(joinpath(dir, fullname))
+                self.gotServiceEvent(None)
+        elif mask & (DirWatcher.IN_DELETE | DirWatcher.IN_MOVED_FROM):
+            if dir in self.pendingFiles:
+                self.pendingFiles[dir].discard(name)
+
+    # The name of the .ts file for a recording file or any of its
+    # associated files, or None if name isn't a recording file.
+
+    def recordingName(self, name):
+        base, ext = splitext(name)
+        if ext == self.TS:
+            return name
+        if ext in self.BAREEXTS:
+            return base + self.TS
+        if ext in self.TSEXTS and base.endswith(self.TS):
+            return base
+        return None
+
+    def requestFullScan(self):
+        self.needFullScan = True
+        self.gotServiceEvent(None)
+
+    # True if a run has been started and not completed
+
+    def runInProgress(self):
+        return self.inRoot or bool(self.scanned) or not self.scanFinished.is_set()
+
     def runMoves(self):
+        # If a run is restarted before it completes, the series
+        # index may be incomplete: a full run rebuilds the index
+        # from scratch, and an incremental run updates a folder's
+        # index once it starts planning the folder's moves. An
+        # incremental run restarted before then, for example after
+        # a deferral, still has its pending recordings to process.
+        if self.runInProgress() and (not self.incremental or (self.inRoot and not self.dirList)):
+            self.needFullScan = True
+        self.inRoot = False
+        self.unwatchDeferral()
+
         self.prepare(None)
+        self.updateWatch()
+
+        # An incremental run only processes the pending recordings,
+        # so it needs an index of all their folders, built for the
+        # current configuration
+        indexKey = (tuple(self.roots), self.scanDepth, self.conf_excludedirs)
+        if self.warmStart:
+            self.warmStart = False
+            snapshot = indexSnapshot.load()
+            if snapshot and self.needFullScan:
+                self.restoreIndex(snapshot, indexKey)
+        self.runFiles = dict((dir, set(names)) for dir, names in self.pendingFiles.items() if names)
+        self.incremental = not self.needFullScan and self.indexKey == indexKey and all(dir in self.indexes for dir in self.runFiles)
+        if self.incremental:
+            self.scanned = deque((dir, [_ListdirEntry(dir, f) for f in sorted(names)], None, None) for dir, names in sorted(self.runFiles.items()))
+            self.scanFinished = threading.Event()
+            self.scanFinished.set()
+        else:
+            self.indexKey = indexKey
+            self.indexes = {}
+            self.indexTimes = {}
+            self.startScan(False)
+
+        self.startStep(self.ITER_STEP)
+
+    # Start processing the next scanned folder, if there is one.
+    # Returns False if there are no scanned folders waiting to be
+    # processed.
+
+    def nextRoot(self):
+        while self.scanned:
+            path, entries, classified, ex = self.scanned.popleft()
+            if ex is not None:
+                self.scanFailed(path, ex)
+                continue
+            if path in self.rootsDone:
+                continue
+            self.rootsDone.add(path)
+            self.startRoot(path)
+            if self.incremental:
+                self.seriesIndex, self.dirs = self.indexes[path]
+            else:
+                self.siblings = self.indexSiblings(entries)
+                self.seriesIndex = {}
+                self.indexes[path] = (self.seriesIndex, self.dirs)
+            self.dirList = deque(entries)
+            self.inRoot = True
+            if not self.dirList:
+                self.scanDone()
+                self.planMoves()
+            return True
+        return False
+
+    # Called when the scan of a folder's directory entries is
+    # complete. In an incremental run, add the recordings already
+    # in the folder for each series being processed.
+
+    def scanDone(self):
+        if self.incremental:
+            for foldername, recordings in self.shows.items():
+                scanned = set(rec.name for rec in recordings)
+                recordings += [
+                    rec for rec in self.seriesIndex.get(foldername, ())
+                    if rec.name not in scanned and lexists(joinpath(self.rootdir, rec.name))
+                ]
+        self.shows = sorted(self.shows.items())
 
-        try:
-            self.dirList = os.listdir(self.rootdir)
-        except Exception as ex:
-            self.dirList = []
-            self.errMess.append("Can not process folder: %s" % str(ex))
-            self.finish()
+    def planSeries(self):
+        self.seriesIndex[self.shows[0][0]] = []
+        super(Series2FolderAutoActions, self).planSeries()
+
+    def keepRecording(self, foldername, rec):
+        self.seriesIndex[rec.key].append(rec)
+
+    # Called when a run has processed all its recordings
+
+    def runDone(self):
+        for dir, names in self.runFiles.items():
+            pending = self.pendingFiles.get(dir)
+            if pending is not None:
+                pending -= names
+                if not pending:
+                    del self.pendingFiles[dir]
+        self.runFiles = {}
+        if not self.incremental:
+            self.needFullScan = False
+            self.startFullScanTimer()
+        self.saveIndex()
+
+    # Start the timer for the next periodic full scan, if they're
+    # configured
+
+    def startFullScanTimer(self):
+        self.fullScanTimer.stop()
+        fullScanHours = int(config.plugins.seriestofolder.fullscan.value)
+        if fullScanHours:
+            self.fullScanTimer.startLongTimer(fullScanHours * 60 * 60)
+
+    # Save the index in the IndexSnapshot, if it's complete, so that
+    # the first run after the next autoStart() can use it. It's
+    # saved after each run as well as by autoStop(), in case
+    # Series2Folder isn't stopped cleanly.
+
+    def saveIndex(self):
+        if self.needFullScan or self.runInProgress() or not self.indexes:
             return
+        folders = [
+            [path, self.indexTimes.get(path), sorted(dirs), [rec.toTuple() for recordings in seriesIndex.values() for rec in recordings]]
+            for path, (seriesIndex, dirs) in self.indexes.items()
+        ]
+        pending = [[dir, sorted(names)] for dir, names in self.pendingFiles.items() if names]
+        indexSnapshot.save(self.snapshotKey(self.indexKey), folders, pending)
 
-        self.iterTimer.start(self.ITER_STEP, True)
+    @staticmethod
+    def snapshotKey(indexKey):
+        roots, scanDepth, excludedirs = indexKey
+        return [list(roots), scanDepth, sorted(excludedirs)]
+
+    @staticmethod
+    def folderTime(path):
+        try:
+            return os.stat(path).st_mtime
+        except OSError:
+            return None
+
+    # Start from the index in an IndexSnapshot instead of a full
+    # scan, if it was built for indexKey. The index for a folder
+    # whose modification time hasn't changed since it was saved is
+    # used as it is. For a folder that has changed, the index is
+    # updated from a listing of the folder: recordings that have
+    # gone are dropped, and new recordings are queued for the next
+    # run. If a folder can't be listed, or new folders that the
+    # full scan would look in have appeared, the index isn't used.
+
+    def restoreIndex(self, snapshot, indexKey):
+        try:
+            if snapshot["key"] != self.snapshotKey(indexKey):
+                return
+            folders = snapshot["folders"]
+            snapshotPending = snapshot["pending"]
+        except (KeyError, TypeError, ValueError):
+            return
+        if not set(self.roots) <= set(folder[0] for folder in folders):
+            return
+        indexes = {}
+        indexTimes = {}
+        pendingFiles = defaultdict(set)
+        for dir, names in snapshotPending:
+            pendingFiles[dir].update(names)
+        try:
+            for path, mtime, dirs, recordings in folders:
+                recordings = [Recording.fromTuple(t) for t in recordings]
+                dirs = set(dirs)
+                folderTime = self.folderTime(path)
+                if mtime is None or folderTime != mtime:
+                    self.stats.count("changed index folder")
+                    names = set()
+                    folderDirs = set()
+                    for entry in self.listDir(path):
+                        if entry.is_dir():
+                            folderDirs.add(entry.name)
+                        elif self.recNameType(entry.name) is not None:
+                            names.add(entry.name)
+                    if self.scanDepth and folderDirs - dirs:
+                        return
+                    pendingFiles[path].update(names - set(rec.name for rec in recordings))
+                    recordings = [rec for rec in recordings if rec.name in names]
+                    dirs = folderDirs
+                seriesIndex = {}
+                for rec in recordings:
+                    # The snapshot's strings are byte strings on
+                    # Python 2, but the series keys are unicode
+                    if six.PY2:
+                        rec.key = self.seriesKey(rec.key)
+                    seriesIndex.setdefault(rec.key, []).append(rec)
+                indexes[path] = (seriesIndex, dirs)
+                indexTimes[path] = folderTime
+        except (OSError, TypeError, ValueError):
+            return
+        if not all(dir in indexes for dir, names in pendingFiles.items() if names):
+            return
+        self.indexKey = indexKey
+        self.indexes = indexes
+        self.indexTimes = indexTimes
+        for dir, names in pendingFiles.items():
+            if names:
+                self.pendingFiles[dir] |= names
+        self.needFullScan = False
+        self.stats.count("index restored")
+        self.startFullScanTimer()
 
     def runStep(self):
-        if self.dirList or self.shows:
-            defer = self.runWhen()
-            if defer < 0:
+        defer = self.runWhen()
+        if defer < 0:
+            self.finish()
+            return
+        elif defer > 0:
+            # The run restarts from the beginning after the deferral,
+            # or sooner if what it's waiting for ends
+            self.stats.done()
+            self.runTimer.stop()
+            self.runTimer.startLongTimer(defer)
+            self.watchDeferral()
+            return
+        if not self.inRoot and not self.nextRoot():
+            if self.scanFinished.is_set() and not self.scanned:
+                self.startCrossMoves()
+                self.runDone()
                 self.finish()
-                return
-            elif defer > 0:
-                self.runTimer.stop()
-                self.runTimer.startLongTimer(defer)
-                return
-            if self.dirList:
-                self.addRecording(self.dirList.pop(0))
-                if not self.dirList:
-                    self.shows = sorted(self.shows.items())
-                self.iterTimer.start(self.ITER_STEP, True)
             else:
-                self.iterTimer.stop()
-                if self.shows:
-                    self.processRecording()
-                if self.shows:
-                    self.iterTimer.start(self.ITER_STEP, True)
-                else:
-                    self.finish()
+                # Wait for the scan of the next folder
+                self.startStep(self.SCAN_POLL)
+            return
+        # Scan or move as much as fits in the step time, but
+        # always make progress
+        self.adaptSlice()
+        self.stats.count("step")
+        endStep = time() + self.stepSlice / 1000.0
+        if self.dirList:
+            dirList = self.dirList
+            self.addRecording(dirList.popleft())
+            while dirList and time() < endStep:
+                self.addRecording(dirList.popleft())
+            self.sliceUsed = bool(dirList)
+            if not dirList:
+                self.scanDone()
+                self.planMoves()
+        elif self.plan:
+            plan = self.plan
+            self.executeMove()
+            while plan and time() < endStep:
+                self.executeMove()
+            self.sliceUsed = bool(plan)
+        if not self.dirList and not self.plan:
+            self.planDone()
+            self.indexTimes[self.rootdir] = self.folderTime(self.rootdir)
+            self.inRoot = False
+        self.startStep(self.ITER_STEP)
+
+    def startStep(self, delay):
+        self.stepDue = time() + delay / 1000.0
+        self.iterTimer.start(delay, True)
+
+    # Set the time for the next step. With the "auto" step time,
+    # the time is adapted to how busy the UI is: if the step timer
+    # fires late, the main loop has other work to do, so the step
+    # time is halved. If the timer fires on time, so the UI is
+    # idle, and the last step used all its time, it is increased
+    # a little, up to MAX_SLICE, so that a step never holds up
+    # the UI for long.
+
+    def adaptSlice(self):
+        configured = int(config.plugins.seriestofolder.stepslice.value)
+        if configured:
+            self.stepSlice = configured
+            return
+        latency = (time() - self.stepDue) * 1000 if self.stepDue is not None else 0
+        if latency > self.LATENCY_LIMIT:
+            self.stepSlice = max(self.MIN_SLICE, self.stepSlice // 2)
+            self.stats.count("step shortened")
+        elif self.sliceUsed and latency <= self.IDLE_LATENCY:
+            self.stepSlice = min(self.MAX_SLICE, self.stepSlice + self.SLICE_GROW)
+        self.sliceUsed = False
 
     def runWhen(self):
+        self.stats.count("deferral check")
+        defer, reason = self.deferral()
+        if reason:
+            self.stats.deferred(reason)
+        return defer
+
+    # Returns how long to defer a run, in seconds, and why: 0 if
+    # it can go ahead, or -1 if it must stop.
+
+    def deferral(self):
         if Screens.Standby.inTryQuitMainloop:
-            return -1
+            return -1, None
         if JobManager.getPendingJobs():
-            return self.TASK_DEFER
+            return self.TASK_DEFER, "task"
         if activeFileScreens(self.session, True):
-            return self.FILESCREEN_DEFER
+            return self.FILESCREEN_DEFER, "file screen"
+        if Series2FolderActions.running:
+            return self.TASK_DEFER, "manual run"
         if config.timeshift.isRecording.value:
-            return self.TSRECORD_DEFER
-        return 0
+            return self.TSRECORD_DEFER, "timeshift"
+        return 0, None
+
+    # While a run is deferred, watch for the end of the jobs, file
+    # screens, manual run and timeshift recording that can defer
+    # it, so that it can resume as soon as they are all over. The
+    # deferral timer is kept in case an event is missed.
+
+    def watchDeferral(self):
+        self.unwatchDeferral()
+        self.deferred = True
+        for job in JobManager.getPendingJobs():
+            self.addDeferralWatch(job.state_changed)
+        for dialog, action in activeFileScreens(self.session, True):
+            self.addDeferralWatch(dialog.onClose)
+        if not self.watchingTimeshift:
+            config.timeshift.isRecording.addNotifier(self.deferralEvent, initial_call=False)
+            self.watchingTimeshift = True
+
+    def addDeferralWatch(self, callbacks):
+        if self.deferralEvent not in callbacks:
+            callbacks.append(self.deferralEvent)
+            self.deferralWatches.append(callbacks)
+
+    def unwatchDeferral(self):
+        self.deferred = False
+        self.resumeTimer.stop()
+        for callbacks in self.deferralWatches:
+            if self.deferralEvent in callbacks:
+                callbacks.remove(self.deferralEvent)
+        self.deferralWatches = []
+        if self.watchingTimeshift:
+            try:
+                config.timeshift.isRecording.removeNotifier(self.deferralEvent)
+                self.watchingTimeshift = False
+            except (AttributeError, ValueError):
+                # Some images can't remove notifiers, so the
+                # notifier stays, and is ignored while no run
+                # is deferred
+                pass
+
+    # Called when something that may be deferring a run changes.
+    # Job and timeshift events can come before the job or recording
+    # has ended, so the check is done a little later, once for a
+    # burst of events.
+
+    def deferralEvent(self, *args):
+        if self.deferred:
+            self.resumeTimer.start(self.RESUME_CHECK, True)
+
+    def checkResume(self):
+        if not self.deferred:
+            return
+        defer, reason = self.deferral()
+        if defer == 0:
+            self.runTimer.stop()
+            self.runMoves()
+        elif defer > 0:
+            # Watch any new jobs or screens
+            self.watchDeferral()
+        else:
+            self.unwatchDeferral()
 
     def finish(self, notification=True, stopping=False):
         self.iterTimer.stop()
+        self.stats.done()
+        metaCache.save(wait=stopping)
 
         doNotification = {
             "all": not stopping,
@@ -610,6 +2349,7 @@ class Series2Folder(ChoiceBox):
         list = [
             (ngettext("Move selected series recording to folder", "Move selected series recordings to folder", int(serviceList is None or len(serviceList))), "CALLFUNC", boundFunction(self.doMoves, selectedOnly=True, serviceList=serviceList), service),
             (_("Move series recordings to folders"), "CALLFUNC", self.doMoves, service),
+            (_("Preview moving series recordings to folders"), "CALLFUNC", boundFunction(self.doMoves, dryRun=True), service),
             (_("Configure move series recordings to folders"), "CALLFUNC", self.doConfig),
         ]
         if config.plugins.seriestofolder.auto.value or not config.plugins.seriestofolder.autoreminder.value:
@@ -625,8 +2365,8 @@ class Series2Folder(ChoiceBox):
             super(Series2Folder, self).__init__(session, title=_("Series to Folder actions%s") % text, list=list, selection=0)
         self.actions = Series2FolderActions(session)
 
-    def doMoves(self, service, selectedOnly=False, serviceList=None):
-        self.actions.doMoves(service, selectedOnly=selectedOnly, serviceList=serviceList)
+    def doMoves(self, service, selectedOnly=False, serviceList=None, dryRun=False):
+        self.actions.doMoves(service, selectedOnly=selectedOnly, serviceList=serviceList, dryRun=dryRun)
         self.close()
 
     def doConfig(self, arg):
@@ -663,7 +2403,7 @@ class Series2FolderConfig(ConfigListScreen, Screen):
         self["description"] = Label()
         self["key_red"] = Label(_("Cancel"))
         self["key_green"] = Label(_("Save"))
-        self["key_yellow"] = Label()
+        self["key_yellow"] = Label(_("Statistics"))
         self["VKeyIcon"] = Boolean(False)
         self.list = []
         self.noShowHelp = True
@@ -676,6 +2416,26 @@ class Series2FolderConfig(ConfigListScreen, Screen):
             config.plugins.seriestofolder.autofolder,
             _('Create a folder for a series automatically if there are this number of recordings or more. If set to "no autocreate", only move recordings if a folder already exists for them.')
         )
+        self._confDestRoot = getConfigListEntry(
+            _("Folder for series folders"),
+            config.plugins.seriestofolder.destroot,
+            _("Create series folders in this folder instead of the recording folder. It may be on another disk or a network share. Leave empty to use the recording folder.")
+        )
+        self._confMultiRoot = getConfigListEntry(
+            _("Process all recording locations"),
+            config.plugins.seriestofolder.multiroot,
+            _("Also process the recordings in the default movie folder and in all your bookmarked recording locations, not just the current folder.")
+        )
+        self._confScanDepth = getConfigListEntry(
+            _("Also process folders below"),
+            config.plugins.seriestofolder.scandepth,
+            _("Also process recordings in folders below the recording locations, to this number of levels. Recordings in a series folder for that series are left alone.")
+        )
+        self._confExcludeDirs = getConfigListEntry(
+            _("Folders to skip"),
+            config.plugins.seriestofolder.excludedirs,
+            _("A comma-separated list of folder names or full paths of folders not to process when processing folders below the recording locations.")
+        )
         self._confPortableNames = getConfigListEntry(
             _("Use portable folder names"),
             config.plugins.seriestofolder.portablenames,
@@ -687,9 +2447,14 @@ class Series2FolderConfig(ConfigListScreen, Screen):
             _("Strip repeat tagging from series titles when creating directory names.")
         )
         self._confRepeatStr = getConfigListEntry(
-            _("Repeat tag to strip"),
+            _("Repeat tags to strip"),
             config.plugins.seriestofolder.repeatstr,
-            _("Repeat tag to be stripped from from series titles when creating directory names.")
+            _("Repeat or new tags to be stripped from series titles when creating directory names, separated by commas. Case is ignored.")
+        )
+        self._confSeasonFolders = getConfigListEntry(
+            _("Put seasons into folders"),
+            config.plugins.seriestofolder.seasonfolders,
+            _("Put recordings into a folder for their season in the series folder, if the season number can be found in the recording's programme information.")
         )
         self._confMovies = getConfigListEntry(
             _("Put movies into folder"),
@@ -724,6 +2489,24 @@ class Series2FolderConfig(ConfigListScreen, Screen):
             _("Configure which notification popups will be shown by Series to Folder when run in the background")
         )
 
+        self._confWatchDir = getConfigListEntry(
+            _("Watch recording folder for new files"),
+            config.plugins.seriestofolder.watchdir,
+            _("Also process recordings that are copied or moved into the recording folder, not just recordings made on this receiver. Requires Linux inotify support.")
+        )
+
+        self._confStepSlice = getConfigListEntry(
+            _("Background step time"),
+            config.plugins.seriestofolder.stepslice,
+            _("How long Series to Folder works in the background before letting the receiver do other things. With \"auto\", the time is shortened when the receiver is busy, and lengthened up to 50 ms when it's idle.")
+        )
+
+        self._confFullScan = getConfigListEntry(
+            _("Full background scan"),
+            config.plugins.seriestofolder.fullscan,
+            _("After a recording finishes, Series to Folder only checks the series of the new recording. Configure how often it also checks the whole recording folder.")
+        )
+
         self.haveConditionals = set()
 
         ConfigListScreen.__init__(self, self.list, session)
@@ -732,6 +2515,7 @@ class Series2FolderConfig(ConfigListScreen, Screen):
             "cancel": self.keyCancel,
             "red": self.keyCancel,
             "green": self.keySave,
+            "yellow": self.showStats,
             "blue": self.keyboard,
             "ok": self.keyboard,
         }, prio=-2)
@@ -746,24 +2530,36 @@ class Series2FolderConfig(ConfigListScreen, Screen):
         disabled = []
         self.haveConditionals.clear()
 
-        def addConditional(cond, item):
+        def addConditional(cond, item, enabled=None):
             self.haveConditionals.add(cond)
-            (list if cond[1].value else disabled).append(item)
+            if enabled is None:
+                enabled = cond[1].value
+            (list if enabled else disabled).append(item)
 
         list += [
             self._confShowmovebutton,
             self._confShowselmovebutton,
             self._confAutofolder,
+            self._confSeasonFolders,
             self._confStripRepeats,
         ]
         addConditional(self._confStripRepeats, self._confRepeatStr)
         list += [
+            self._confMultiRoot,
+            self._confScanDepth,
+        ]
+        addConditional(self._confScanDepth, self._confExcludeDirs, self._confScanDepth[1].value != "0")
+        list += [
+            self._confDestRoot,
             self._confPortableNames,
             self._confMovies,
         ]
         addConditional(self._confMovies, self._confMoviesfolder)
         list.append(self._confAuto)
         addConditional(self._confAuto, self._confAutoNotifications)
+        addConditional(self._confAuto, self._confWatchDir)
+        addConditional(self._confAuto, self._confFullScan)
+        addConditional(self._confAuto, self._confStepSlice)
 
         self.list = list
         configList.list = list
@@ -806,6 +2602,13 @@ class Series2FolderConfig(ConfigListScreen, Screen):
         ConfigListScreen.keyRight(self)
         self.updateConfig()
 
+    def showStats(self):
+        text = RunStatsModule.recentReport()
+        logfile = RunStatsModule.dumpRecent()
+        if logfile:
+            text += "\n\n" + _("Saved to %s") % logfile
+        self.session.open(ErrorBox, text=text, title=_("Series to Folder run statistics"))
+
     def keyboard(self):
         selection = self["config"].getCurrent()
         if isinstance(selection[1], ConfigText):
@@ -0,0 +1,117 @@
+from __future__ import print_function
+
+import os
+import sys
+
+import pytest
+
+try:
+    import builtins
+except ImportError:
+    import __builtin__ as builtins
+
+# The tests run Series2Folder against the enigma2 stand-ins that the
+# benchmark uses, so they can run without an enigma2 image.
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+TOP_DIR = os.path.dirname(TESTS_DIR)
+PLUGIN_DIR = os.path.join(TOP_DIR, "plugin")
+PLUGIN_PKG = "Plugins.Extensions.Series2Folder"
+
+sys.path.insert(0, os.path.join(TOP_DIR, "bench", "stubs"))
+
+builtins._ = lambda s: s
+builtins.ngettext = lambda singular, plural, n: singular if n == 1 else plural
+
+
+def loadPlugin():
+    import importlib.util
+    import Plugins.Extensions  # noqa: F401
+
+    if PLUGIN_PKG not in sys.modules:
+        spec = importlib.util.spec_from_file_location(
+            PLUGIN_PKG, os.path.join(PLUGIN_DIR, "__init__.py"),
+            submodule_search_locations=[PLUGIN_DIR])
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[PLUGIN_PKG] = module
+        spec.loader.exec_module(module)
+
+
+loadPlugin()
+
+
+class Session(object):
+    current_dialog = None
+
+    def __init__(self):
+        import NavigationInstance
+        self.nav = NavigationInstance.instance
+        self.dialog_stack = []
+        self.opened = []
+
+    def open(self, *args, **kwargs):
+        self.opened.append((args, kwargs))
+
+
+# Keep the files that Series2Folder saves in its config directory,
+# and the settings a test changes, to that test.
+
+@pytest.fixture(autouse=True)
+def configDir(tmp_path, monkeypatch):
+    import Tools.Directories
+    from Plugins.Extensions.Series2Folder.MetaCache import metaCache
+    from Plugins.Extensions.Series2Folder.RenameJournal import renameJournal
+    from Plugins.Extensions.Series2Folder.IndexSnapshot import indexSnapshot
+
+    confdir = tmp_path / "config"
+    confdir.mkdir()
+    saved = Tools.Directories._configDir[0]
+    Tools.Directories._configDir[0] = str(confdir)
+    for singleton in (metaCache, renameJournal, indexSnapshot):
+        monkeypatch.setattr(singleton, "filename", None)
+    metaCache.entries.clear()
+    monkeypatch.setattr(metaCache, "loaded", False)
+    yield confdir
+    metaCache.waitSaved()
+    Tools.Directories._configDir[0] = saved
+
+
+@pytest.fixture
+def settings(monkeypatch):
+    from Components.config import config
+
+    def setting(name, value):
+        monkeypatch.setattr(getattr(config.plugins.seriestofolder, name), "value", value)
+    return setting
+
+
+@pytest.fixture
+def movieDir(tmp_path):
+    from Components.UsageConfig import _movie_path
+
+    moviedir = tmp_path / "movie"
+    moviedir.mkdir()
+    saved = _movie_path[0]
+    _movie_path[0] = str(moviedir) + "/"
+    yield moviedir
+    _movie_path[0] = saved
+
+
+@pytest.fixture
+def session():
+    return Session()
+
+
+# Make the files of a recording in dir, named in the standard
+# "YYYYMMDD HHMM - channel - show" style, and return its .ts name.
+
+@pytest.fixture
+def makeRecording():
+    def make(dir, show, day, channel="ABC", exts=(".ts", ".ts.meta", ".eit")):
+        base = "201501%02d 19%02d - %s - %s" % (day, day, channel, show)
+        for ext in exts:
+            with open(os.path.join(str(dir), base + ext), "w") as f:
+                if ext == ".ts.meta":
+                    f.write("1:0:1:%X:0:0:0:0:0:0:\n%s\ndesc\n%d\n\n" % (day, show, 1420070400 + day * 86400))
+        return base + ".ts"
+    return make
@@ -0,0 +1,93 @@
+import os
+import struct
+
+import pytest
+
+from Plugins.Extensions.Series2Folder import DirWatcher as DirWatcherModule
+from Plugins.Extensions.Series2Folder.DirWatcher import (
+    DirWatcher, IN_CLOSE_WRITE, IN_CREATE, IN_DELETE, IN_DELETE_SELF, IN_IGNORED, IN_ISDIR, IN_MOVED_TO, IN_Q_OVERFLOW
+)
+
+
+class Events(object):
+    def __init__(self):
+        self.events = []
+
+    def __call__(self, dir, name, mask):
+        self.events.append((dir, name, mask))
+
+
+# An inotify event as read from the inotify file descriptor, with
+# the name padded with NULs to a multiple of 16 bytes
+
+def event(wd, mask, name=b"", cookie=0):
+    length = (len(name) + 16) // 16 * 16 if name else 0
+    return struct.pack("iIII", wd, mask, cookie, length) + name.ljust(length, b"\0")
+
+
+def dispatch(watcher, data):
+    watcher._DirWatcher__dispatch(memoryview(data))
+
+
+def testDispatch():
+    events = Events()
+    watcher = DirWatcher(events)
+    watcher.watches = {1: "/movie", 2: "/other"}
+    dispatch(watcher, event(1, IN_CLOSE_WRITE, b"20150101 - News.ts") + event(2, IN_CREATE | IN_ISDIR, b"News") + event(1, IN_DELETE_SELF))
+    assert events.events == [
+        ("/movie", "20150101 - News.ts", IN_CLOSE_WRITE),
+        ("/other", "News", IN_CREATE | IN_ISDIR),
+        ("/movie", "", IN_DELETE_SELF),
+    ]
+
+
+def testIgnoredRemovesWatch():
+    events = Events()
+    watcher = DirWatcher(events)
+    watcher.watches = {1: "/movie", 2: "/other"}
+    dispatch(watcher, event(1, IN_IGNORED) + event(1, IN_CLOSE_WRITE, b"a.ts"))
+    assert events.events == [("/movie", "", IN_IGNORED)]
+    assert watcher.watches == {2: "/other"}
+    assert not watcher.isWatching("/movie")
+
+
+def testOverflowAndUnknownWatches():
+    events = Events()
+    watcher = DirWatcher(events)
+    watcher.watches = {1: "/movie"}
+    dispatch(watcher, event(-1, IN_Q_OVERFLOW) + event(7, IN_CLOSE_WRITE, b"a.ts"))
+    assert events.events == [(None, None, IN_Q_OVERFLOW)]
+
+
+def testTruncatedEvent():
+    events = Events()
+    watcher = DirWatcher(events)
+    watcher.watches = {1: "/movie"}
+    data = event(1, IN_CLOSE_WRITE, b"a.ts") + event(1, IN_DELETE, b"b.ts")
+    dispatch(watcher, data[:-20])
+    assert events.events == [("/movie", "a.ts", IN_CLOSE_WRITE)]
+
+
+@pytest.mark.skipif(not DirWatcherModule.isAvailable(), reason="inotify isn't available")
+def testWatch(tmp_path):
+    events = Events()
+    watcher = DirWatcher(events)
+    watcher.start()
+    try:
+        watcher.addWatch(str(tmp_path), IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF)
+        assert watcher.isWatching(str(tmp_path))
+        (tmp_path / "a.ts").write_text("")
+        (tmp_path / "News").mkdir()
+        for callback in list(watcher.notifier.callback):
+            callback(watcher.fd)
+        assert (str(tmp_path), "a.ts", IN_CLOSE_WRITE) in events.events
+        assert (str(tmp_path), "News", IN_CREATE | IN_ISDIR) in events.events
+
+        watcher.removeWatch(str(tmp_path))
+        assert not watcher.isWatching(str(tmp_path))
+        with pytest.raises(OSError):
+            watcher.addWatch(str(tmp_path / "missing"), IN_CREATE)
+    finally:
+        watcher.stop()
+    assert watcher.fd == -1
+    assert watcher.notifier is None
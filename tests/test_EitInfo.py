@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import struct
+
+import pytest
+
+from Plugins.Extensions.Series2Folder.EitInfo import decodeText, EitInfo, findSeasonEpisode, parseEit, readEit
+
+
+def text(s, encoding=b"\x15"):
+    return encoding + s.encode("utf-8")
+
+
+def shortEvent(name, shortText=b""):
+    body = b"eng" + struct.pack(">B", len(name)) + name + struct.pack(">B", len(shortText)) + shortText
+    return struct.pack(">BB", 0x4D, len(body)) + body
+
+
+def extendedEvent(number, itemText):
+    body = struct.pack(">B3sB", number << 4, b"eng", 0) + struct.pack(">B", len(itemText)) + itemText
+    return struct.pack(">BB", 0x4E, len(body)) + body
+
+
+def content(nibbles):
+    return struct.pack(">BB", 0x54, 2) + struct.pack(">BB", nibbles, 0)
+
+
+# An EIT event with a duration of 1:30:45 and the descriptors
+
+def event(*descriptors):
+    data = b"".join(descriptors)
+    return struct.pack(">H5s3sH", 1, b"\0" * 5, b"\x01\x30\x45", len(data)) + data
+
+
+def testParseEit():
+    eit = parseEit(event(shortEvent(text("Doctor Who"), text("Series 3, Episode 7. The Doctor returns.")), content(0x14)))
+    assert eit.duration == 5445
+    assert eit.genre == 0x1
+    assert eit.genreName() == "movie"
+    assert (eit.season, eit.episode) == (3, 7)
+
+
+def testExtendedDescriptorsAreJoinedInOrder():
+    eit = parseEit(event(
+        shortEvent(text("Doctor Who")),
+        extendedEvent(1, text("ies 3 Episode 2")),
+        extendedEvent(0, text("The Doctor returns. Ser")),
+    ))
+    assert (eit.season, eit.episode) == (3, 2)
+
+
+def testOnlyHeader():
+    eit = parseEit(event())
+    assert eit.toTuple() == (5445, None, None, None)
+    assert eit.genreName() == ""
+
+
+@pytest.mark.parametrize("data", [
+    # Descriptor longer than the loop
+    event(shortEvent(text("S1E2")))[:-3],
+    # Descriptor header without a body
+    event(b"\x4D"),
+    event(b"\x4D\x00"),
+    # Name length beyond the descriptor
+    event(b"\x4D\x05eng\xff\x00"),
+    # Text length beyond the descriptor
+    event(b"\x4D\x08eng\x02S1\xff" + b"E2"),
+    # Extended descriptor with items beyond the descriptor
+    event(b"\x4E\x06\x00eng\xff\x00"),
+    # Content descriptor too short
+    event(b"\x54\x01\x10"),
+    # Unknown descriptors and garbage
+    event(b"\x99\x03abc", b"\xff" * 20),
+])
+def testMalformedEit(data):
+    eit = parseEit(data)
+    assert eit.duration in (0, 5445)
+    assert eit.season is None
+    assert eit.genre is None
+
+
+def testTextBeyondDescriptorIsTruncated():
+    eit = parseEit(event(content(0x20), b"\x4D\x0Beng\x00\xffSeason 4", b"\x4D\x03eng"))
+    assert eit.season is None
+    assert eit.genre == 0x2
+
+
+def testLoopLengthBeyondData():
+    data = event(shortEvent(text("S1E2")))
+    eit = parseEit(data[:10] + b"\x0f\xff" + data[12:])
+    assert (eit.season, eit.episode) == (1, 2)
+
+
+def testReadEit(tmp_path):
+    path = tmp_path / "a.eit"
+    path.write_bytes(event(shortEvent(text("News"), text("S01E02")), content(0x20)))
+    assert readEit(str(path)).toTuple() == (5445, 0x2, 1, 2)
+
+
+@pytest.mark.parametrize("data", [b"", b"\0" * 11])
+def testTruncatedEitFile(tmp_path, data):
+    path = tmp_path / "a.eit"
+    path.write_bytes(data)
+    with pytest.raises(ValueError):
+        readEit(str(path))
+
+
+@pytest.mark.parametrize("data, decoded", [
+    (b"", u""),
+    (b"Caf\xe9", u"Café"),
+    (b"\x15Caf\xc3\xa9", u"Café"),
+    (b"\x05Caf\xe9", u"Café"),
+    (b"\x10\x00\x02Caf\xe9", u"Café"),
+    (b"\x11\x00C\x00a\x00f\x00\xe9", u"Café"),
+    (b"\x86Doctor\x87 Who\x8aSeries 3", u"Doctor Who Series 3"),
+    (b"\x15bad \xff utf-8", u"bad � utf-8"),
+    (b"\x10\x00\x63Caf\xe9", u"Café"),
+])
+def testDecodeText(data, decoded):
+    assert decodeText(memoryview(data)) == decoded
+
+
+@pytest.mark.parametrize("texts, seasonEpisode", [
+    (["S02E05"], (2, 5)),
+    (["s2 e5"], (2, 5)),
+    (["S2 Ep5"], (2, 5)),
+    (["Series 2, Episode 5"], (2, 5)),
+    (["Season 2: Ep. 5"], (2, 5)),
+    (["Series 2 - Episode 5"], (2, 5)),
+    (["Season 12"], (12, None)),
+    (["Ep. 5"], (None, 5)),
+    (["Episode 5", "Series 2"], (2, 5)),
+    (["Series 2", "S03E04"], (2, 4)),
+    (["The 2005 series", "Apollo 13"], (None, None)),
+    (["BS2E5X"], (None, None)),
+    ([], (None, None)),
+])
+def testFindSeasonEpisode(texts, seasonEpisode):
+    assert findSeasonEpisode(texts) == seasonEpisode
+
+
+def testTuple():
+    eit = EitInfo(1800, 0x4, 2, 3)
+    assert EitInfo.fromTuple(eit.toTuple()).toTuple() == (1800, 0x4, 2, 3)
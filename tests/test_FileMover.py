@@ -0,0 +1,64 @@
+import os
+
+import pytest
+
+from Plugins.Extensions.Series2Folder import FileMover
+from Plugins.Extensions.Series2Folder.FileMover import copyFile, MoveError, MoveJob, PART_EXT
+
+
+def makeFile(path, content):
+    with open(str(path), "wb") as f:
+        f.write(content)
+
+
+def readFile(path):
+    with open(str(path), "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("kernelCopy", (True, False))
+def testCopyFile(tmp_path, monkeypatch, kernelCopy):
+    if not kernelCopy:
+        monkeypatch.setattr(FileMover, "_kernelCopy", None)
+    monkeypatch.setattr(FileMover, "COPY_CHUNK", 1000)
+    content = os.urandom(2500)
+    makeFile(tmp_path / "a.ts", content)
+    copied = []
+    copyFile(str(tmp_path / "a.ts"), str(tmp_path / "b.ts"), copied.append)
+    assert readFile(tmp_path / "b.ts") == content
+    assert sum(copied) == len(content)
+
+
+def testMoveGroups(tmp_path):
+    src = tmp_path / "movie"
+    dst = src / "dst"
+    src.mkdir()
+    makeFile(src / "a.ts", b"ts")
+    makeFile(src / "a.ts.meta", b"meta")
+    group = [(str(src / name), str(dst / name)) for name in ("a.ts", "a.ts.meta")]
+    MoveJob([group]).tasks[0].work()
+    assert sorted(os.listdir(str(src))) == ["dst"]
+    assert sorted(os.listdir(str(dst))) == ["a.ts", "a.ts.meta"]
+    assert readFile(dst / "a.ts.meta") == b"meta"
+
+
+def testFailedGroupDoesntStopOthers(tmp_path):
+    src = tmp_path / "movie"
+    dst = src / "dst"
+    dst.mkdir(parents=True)
+    for name in ("a", "b", "c"):
+        makeFile(src / (name + ".ts"), name.encode())
+        makeFile(src / (name + ".eit"), name.encode())
+    makeFile(dst / "a.eit", b"other")
+    makeFile(dst / "c.ts", b"other")
+    groups = [[(str(src / (name + ext)), str(dst / (name + ext))) for ext in (".ts", ".eit")] for name in ("a", "b", "c")]
+
+    with pytest.raises(MoveError) as e:
+        MoveJob(groups).tasks[0].work()
+    assert len(e.value.errors) == 2
+    # The recordings that couldn't be moved are left in place,
+    # without partly copied files in the destination
+    assert sorted(os.listdir(str(src))) == ["a.eit", "a.ts", "c.eit", "c.ts", "dst"]
+    assert sorted(os.listdir(str(dst))) == ["a.eit", "b.eit", "b.ts", "c.ts"]
+    assert not [name for name in os.listdir(str(dst)) if name.endswith(PART_EXT)]
+    assert readFile(dst / "b.ts") == b"b"
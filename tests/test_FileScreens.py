@@ -0,0 +1,90 @@
+import sys
+import types
+
+import pytest
+
+from Plugins.Extensions.Series2Folder import FileScreens
+from Plugins.Extensions.Series2Folder.FileScreens import activeFileScreens, registerFileScreen
+
+
+class Session(object):
+    def __init__(self, current_dialog=None, dialog_stack=()):
+        self.current_dialog = current_dialog
+        self.dialog_stack = [(dialog, None) for dialog in dialog_stack]
+
+
+class Screen(object):
+    pass
+
+
+# Run each test with an empty registry
+
+@pytest.fixture(autouse=True)
+def registry(monkeypatch):
+    monkeypatch.setattr(FileScreens, "fileScreens", FileScreens.defaultdict(tuple))
+    monkeypatch.setattr(FileScreens, "__fileScreenTemplates", [])
+    monkeypatch.setattr(FileScreens, "__typeActions", {})
+    monkeypatch.setattr(FileScreens, "__modulesSeen", None)
+
+
+@pytest.fixture
+def screenModule():
+    module = types.ModuleType("s2f_test_screens")
+
+    class MovieList(Screen):
+        pass
+
+    class Browser(Screen):
+        pass
+
+    module.MovieList = MovieList
+    module.Browser = Browser
+    return module
+
+
+def testNoDialog():
+    registerFileScreen(Screen, "reload")
+    assert activeFileScreens(Session(), True) == []
+
+
+def testRegisteredClass():
+    class MovieList(Screen):
+        pass
+
+    class ExtendedList(MovieList):
+        pass
+
+    registerFileScreen(MovieList, "reload")
+    registerFileScreen(MovieList, "reload")
+    registerFileScreen(Screen)
+    movies = ExtendedList()
+    other = Screen()
+    session = Session(movies, (other, ))
+    assert sorted(activeFileScreens(session, True), key=repr) == sorted(
+        [(movies, "reload"), (movies, None), (other, None)], key=repr)
+    assert activeFileScreens(session, False) == [(movies, "reload")]
+
+
+def testTemplateResolvedWhenModuleIsLoaded(monkeypatch, screenModule):
+    registerFileScreen("s2f_test_screens.MovieList", "reload")
+    registerFileScreen("s2f_test_screens.Browser")
+    movies = screenModule.MovieList()
+    browser = screenModule.Browser()
+    session = Session(movies, (browser, ))
+    assert activeFileScreens(session, True) == []
+
+    monkeypatch.setitem(sys.modules, "s2f_test_screens", screenModule)
+    assert activeFileScreens(session, True) == [(movies, "reload"), (browser, None)]
+    assert activeFileScreens(session, False) == [(movies, "reload")]
+    assert FileScreens.__fileScreenTemplates == []
+
+
+def testRegisteringClearsRememberedActions():
+    class MovieList(Screen):
+        pass
+
+    movies = MovieList()
+    session = Session(movies)
+    assert activeFileScreens(session, True) == []
+    registerFileScreen(MovieList, "reload")
+    assert activeFileScreens(session, True) == [(movies, "reload")]
@@ -0,0 +1,174 @@
+import pytest
+
+from Plugins.Extensions.Series2Folder import FolderRules
+from Plugins.Extensions.Series2Folder.EitInfo import EitInfo
+from Plugins.Extensions.Series2Folder.FolderRules import normalizeService, parseRule, parseRules, safeValue
+
+
+class EitLoader(object):
+    def __init__(self, eit):
+        self.eit = eit
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.eit
+
+
+def ruleSet(*lines):
+    rules, errors = parseRules(lines)
+    assert errors == []
+    return rules
+
+
+def folder(rules, title="News", channel="ABC", service=None, tags=(), year="2015", eit=None):
+    return rules.folder(title, channel, service, tags, year, EitLoader(eit))
+
+
+def testParseRules():
+    rules, errors = parseRules([
+        "# comment",
+        "",
+        "title: ^News => News",
+        "no separator",
+        "channel: ABC => ",
+        "colour: red => Red",
+        "title: a; title: b => AB",
+        "title: ( => Bad",
+        "duration: about 5 => Bad",
+        "genre: gardening => Bad",
+        "title: a => {nothing}",
+        "title: a => {series:>10}",
+        "title: a => {season:q}",
+        "channel: SBS => SBS/{year}",
+    ])
+    assert [rule.lineNo for rule in rules.rules] == [3, 14]
+    assert [error.split(":", 1)[0] for error in errors] == ["Folder rules line %d" % n for n in range(4, 14)]
+
+
+@pytest.mark.parametrize("line", [
+    "title: a =>",
+    "title => Folder",
+    "title: => Folder",
+    "duration: 5 => Folder",
+    "duration: >x => Folder",
+])
+def testParseRuleErrors(line):
+    with pytest.raises(ValueError):
+        parseRule(1, line)
+
+
+def testParseRuleConditions():
+    rule = parseRule(1, "channel: ABC, abc me ; tag: a,b ; genre: movie, 0x4 ; duration: 10-20 ; service: 1:0:1:AB:: => X")
+    assert rule.conditions["channel"] == frozenset(("abc", "abc me"))
+    assert rule.conditions["tag"] == frozenset(("a", "b"))
+    assert rule.conditions["genre"] == frozenset((1, 4))
+    assert rule.conditions["duration"] == (600, 1200)
+    assert rule.conditions["service"] == frozenset(("1:0:1:ab",))
+    assert parseRule(1, "duration: <15 => X").conditions["duration"] == (0, 899)
+    assert parseRule(1, "duration: > 60 => X").conditions["duration"] == (3601, None)
+
+
+def testFirstMatchingRuleWins():
+    rules = ruleSet(
+        "title: ^the news => Late",
+        "title: news; channel: sbs => SBS News",
+        "title: news => News",
+        "channel: abc => ABC",
+    )
+    assert folder(rules, "The News") == "Late"
+    assert folder(rules, "World News", "SBS") == "SBS News"
+    assert folder(rules, "World News", "abc") == "News"
+    assert folder(rules, "Sport", "ABC") == "ABC"
+    assert folder(rules, "Sport", "SBS") is None
+    assert folder(rules, "Sport", None) is None
+
+
+def testServiceAndTags():
+    rules = ruleSet(
+        "service: 1:0:19:1:2:3:0:0:0:0: => HD",
+        "tag: kids, family => Family",
+    )
+    assert folder(rules, service="1:0:19:1:2:3:0:0:0:0:") == "HD"
+    assert folder(rules, service="1:0:1:1:2:3:0:0:0:0:") is None
+    assert folder(rules, tags=("family", "repeat")) == "Family"
+    assert folder(rules, tags=("repeat", )) is None
+
+
+def testTitleRegexesWithGroups():
+    rules = ruleSet(
+        r"title: (\w)\1 => Double",
+        "title: zz => Zed",
+    )
+    assert folder(rules, "Zoo") == "Double"
+    assert folder(rules, "Buzz") == "Double"
+    assert folder(rules, "Fizz Buzz") == "Double"
+    assert folder(rules, "Zed") is None
+
+
+def testManyTitleRegexes(monkeypatch):
+    monkeypatch.setattr(FolderRules, "TITLE_CHUNK", 3)
+    rules = ruleSet(*["title: ^show %d$ => Show %d" % (i, i) for i in range(10)])
+    assert len(rules.titleRegexes) == 4
+    for i in range(10):
+        assert folder(rules, "Show %d" % i) == "Show %d" % i
+    assert folder(rules, "Show 10") is None
+
+
+def testEitOnlyLoadedWhenNeeded():
+    rules = ruleSet(
+        "channel: abc; genre: movie => Movies",
+        "duration: <15 => Shorts",
+        "channel: sbs => SBS",
+    )
+    loadEit = EitLoader(EitInfo(600, 0x1))
+    assert rules.folder("Film", "SBS", None, (), "2015", loadEit) == "Shorts"
+    assert loadEit.calls == 1
+
+    loadEit = EitLoader(EitInfo(3600, 0x1))
+    assert rules.folder("Film", "SBS", None, (), "2015", loadEit) == "SBS"
+    loadEit = EitLoader(EitInfo(3600, 0x1))
+    assert rules.folder("Film", "ABC", None, (), "2015", loadEit) == "Movies"
+
+    rules = ruleSet("channel: sbs => SBS", "genre: news => News")
+    loadEit = EitLoader(None)
+    assert rules.folder("Film", "SBS", None, (), "2015", loadEit) == "SBS"
+    assert loadEit.calls == 0
+
+
+def testNoEit():
+    rules = ruleSet("genre: news => News", "duration: >10 => Long", "title: . => Other")
+    assert folder(rules, eit=None) == "Other"
+
+
+def testTemplateValues():
+    rules = ruleSet(
+        "channel: abc => {channel}/{series}/{year}/Season {season:02d}/{genre}",
+        "channel: sbs => {title}/Episode {episode}",
+    )
+    eit = EitInfo(1800, 0x2, 3, 12)
+    assert folder(rules, "News", "ABC", eit=eit) == "ABC/{series}/2015/Season 03/news"
+    assert folder(rules, "News", "SBS", eit=eit) == "News/Episode 12"
+
+
+def testLevelsWithoutValuesAreLeftOut():
+    rules = ruleSet("title: . => {channel}/{series}/Season {season}/{year}")
+    assert folder(rules, channel=None, year="", eit=EitInfo(1800, None)) == "{series}"
+
+
+def testValuesDontAddLevels():
+    rules = ruleSet("title: . => {title}")
+    assert folder(rules, "AC/DC Live") == "AC_DC Live"
+    assert rules.folder("AC/DC: Live", None, None, (), "", EitLoader(None), lambda v: v.replace(":", "")) == "AC_DC Live"
+
+
+def testHelpers():
+    assert normalizeService(" 1:0:19:AB:: ") == "1:0:19:ab"
+    assert safeValue("a/b") == "a_b"
+    assert safeValue("a/b", str.upper) == "A_B"
+
+
+def testRuleWithoutConditionsMatchesAll():
+    rules = ruleSet("channel: abc => ABC", "=> Other")
+    assert folder(rules, channel="ABC") == "ABC"
+    assert folder(rules, channel=None) == "Other"
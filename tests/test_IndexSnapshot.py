@@ -0,0 +1,34 @@
+import json
+
+from Plugins.Extensions.Series2Folder.IndexSnapshot import IndexSnapshot
+
+
+def testSaveLoad(tmp_path):
+    snapshot = IndexSnapshot(str(tmp_path / "index"))
+    assert snapshot.load() is None
+    key = [["/media/hdd/movie/"], 1, ["trash"]]
+    folders = [["/media/hdd/movie", 1420070400.5, ["News"], [["News", "20150101 - News.ts", None, 3, "news", None, None]]]]
+    pending = [["/media/hdd/movie", ["20150102 - News.ts"]]]
+    snapshot.save(key, folders, pending)
+    data = snapshot.load()
+    assert (data["key"], data["folders"], data["pending"]) == (key, folders, pending)
+    # Loading doesn't use the snapshot up
+    assert snapshot.load() is not None
+    snapshot.remove()
+    assert snapshot.load() is None
+    snapshot.remove()
+
+
+def testUnusableSnapshot(tmp_path):
+    filename = tmp_path / "index"
+    snapshot = IndexSnapshot(str(filename))
+    for content in ("", "{", "[]", json.dumps({"version": 0, "key": [], "folders": [], "pending": []})):
+        filename.write_text(content)
+        assert snapshot.load() is None
+
+
+def testSaveFailure(tmp_path, capsys):
+    snapshot = IndexSnapshot(str(tmp_path / "missing" / "index"))
+    snapshot.save([], [], [])
+    assert "Can't save folder index" in capsys.readouterr().out
+    assert snapshot.load() is None
@@ -0,0 +1,91 @@
+import os
+
+from Plugins.Extensions.Series2Folder.MetaCache import MetaCache
+
+
+class Stat(object):
+    def __init__(self, ino=1, size=100, mtime=1000.0):
+        self.st_ino = ino
+        self.st_size = size
+        self.st_mtime = mtime
+
+
+def testGetPut(tmp_path):
+    cache = MetaCache(str(tmp_path / "cache"))
+    st = Stat()
+    assert cache.get("/a.ts.meta", st) is None
+    cache.put("/a.ts.meta", st, ("Show", "desc"))
+    assert cache.get("/a.ts.meta", st) == ("Show", "desc")
+
+
+def testChangedFileInvalidatesEntry(tmp_path):
+    cache = MetaCache(str(tmp_path / "cache"))
+    cache.put("/a.ts.meta", Stat(), ("Show",))
+    for st in (Stat(ino=2), Stat(size=101), Stat(mtime=1001.0)):
+        cache.put("/a.ts.meta", Stat(), ("Show",))
+        assert cache.get("/a.ts.meta", st) is None
+        assert "/a.ts.meta" not in cache.entries
+
+
+def testLeastRecentlyUsedEviction(tmp_path):
+    cache = MetaCache(str(tmp_path / "cache"), maxEntries=3)
+    st = Stat()
+    for name in ("a", "b", "c"):
+        cache.put(name, st, (name,))
+    # Using "a" makes "b" the least recently used
+    assert cache.get("a", st) == ("a",)
+    cache.put("d", st, ("d",))
+    assert list(cache.entries) == ["c", "a", "d"]
+    cache.put("c", st, ("c2",))
+    cache.put("e", st, ("e",))
+    assert list(cache.entries) == ["d", "c", "e"]
+    assert cache.get("a", st) is None
+
+
+def testSaveLoad(tmp_path):
+    filename = str(tmp_path / "cache")
+    cache = MetaCache(filename)
+    cache.put("/a.ts.meta", Stat(), ("Show", 12))
+    cache.save(wait=True)
+    assert not cache.dirty
+
+    other = MetaCache(filename)
+    assert other.get("/a.ts.meta", Stat()) == ("Show", 12)
+
+
+def testUnchangedCacheIsNotSaved(tmp_path):
+    filename = str(tmp_path / "cache")
+    cache = MetaCache(filename)
+    cache.load()
+    cache.save()
+    assert not os.path.exists(filename)
+
+
+def testUnusableCacheFile(tmp_path):
+    filename = tmp_path / "cache"
+    for content in ("not json", '{"version": 2, "entries": [["/a", [1, 100, 1000.0, "x"]]]}', "[]"):
+        filename.write_text(content)
+        cache = MetaCache(str(filename))
+        assert cache.get("/a", Stat()) is None
+        assert not cache.entries
+
+
+def testSaveInWorkerThread(tmp_path):
+    filename = str(tmp_path / "cache")
+    cache = MetaCache(filename)
+    cache.put("/a.ts.meta", Stat(), ("Show", 12))
+    cache.save()
+    cache.waitSaved()
+    assert MetaCache(filename).get("/a.ts.meta", Stat()) == ("Show", 12)
+
+
+def testFailedSaveIsRetried(tmp_path, capsys):
+    cache = MetaCache(str(tmp_path / "missing" / "cache"))
+    cache.put("/a.ts.meta", Stat(), ("Show", 12))
+    cache.save(wait=True)
+    assert "Can't save metadata cache" in capsys.readouterr().out
+    assert cache.dirty
+    (tmp_path / "missing").mkdir()
+    cache.save(wait=True)
+    assert not cache.dirty
+    assert os.path.exists(str(tmp_path / "missing" / "cache"))
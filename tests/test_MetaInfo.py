@@ -0,0 +1,52 @@
+import pytest
+
+from Plugins.Extensions.Series2Folder.MetaInfo import MetaInfo, readMeta
+
+
+def writeMeta(tmp_path, content):
+    path = tmp_path / "20150101 1930 - ABC - News.ts.meta"
+    path.write_bytes(content)
+    return str(path)
+
+
+def testReadMeta(tmp_path):
+    path = writeMeta(tmp_path, b"1:0:1:0:0:0:0:0:0:0:\nNews \n Late edition\n1420104600\npts_merge repeat\n3000\n123456\n")
+    meta = readMeta(path)
+    assert meta.serviceRef == "1:0:1:0:0:0:0:0:0:0:"
+    assert meta.title == "News"
+    assert meta.description == "Late edition"
+    assert meta.time == 1420104600
+    assert meta.tags == ("pts_merge", "repeat")
+    assert meta.pendingMerge()
+
+
+def testReadMetaWithoutTags(tmp_path):
+    meta = readMeta(writeMeta(tmp_path, b"1:0:1:0:0:0:0:0:0:0:\r\nNews\r\n\r\n1420104600"))
+    assert meta.title == "News"
+    assert meta.tags == ()
+    assert not meta.pendingMerge()
+
+
+@pytest.mark.parametrize("content", [
+    b"",
+    b"1:0:1:0:0:0:0:0:0:0:\n",
+    b"1:0:1:0:0:0:0:0:0:0:\nNews\ndesc\n",
+    b"1:0:1:0:0:0:0:0:0:0:\nNews\ndesc\nnot a time\n\n",
+])
+def testTruncatedOrInvalidMeta(tmp_path, content):
+    with pytest.raises(ValueError):
+        readMeta(writeMeta(tmp_path, content))
+
+
+def testLatin1Title(tmp_path):
+    meta = readMeta(writeMeta(tmp_path, b"1:0:1:0:0:0:0:0:0:0:\nCaf\xe9\n\n1420104600\n\n"))
+    assert meta.title in ("Caf\xe9", b"Caf\xe9")
+
+
+def testTuple():
+    meta = MetaInfo("1:0:1:0:0:0:0:0:0:0:", "News", "desc", 1420104600, ("a", "b"))
+    t = meta.toTuple()
+    assert "desc" not in t
+    other = MetaInfo.fromTuple(t)
+    for attr in MetaInfo.__slots__:
+        assert getattr(other, attr) == (None if attr == "description" else getattr(meta, attr))
@@ -0,0 +1,60 @@
+import pytest
+
+from Plugins.Extensions.Series2Folder import NameParser
+from Plugins.Extensions.Series2Folder.NameParser import formatDateTime, parseName, ParsedName, registerNamePattern
+
+
+@pytest.mark.parametrize("fullname, parsed", [
+    ("20150101 - News.ts", ParsedName("short", "20150101", None, "News", None, None)),
+    ("20150101 - News - Late.ts", ParsedName("short", "20150101", None, "News", None, None)),
+    ("20150101 1930 - ABC - News.ts", ParsedName("standard", "20150101", "1930", "News", None, "ABC")),
+    ("20150101 1930 - News.ts", ParsedName("standard", "20150101", "1930", "News", None, None)),
+    ("20150101 1930 - ABC - News - Late edition.ts", ParsedName("long", "20150101", "1930", "News", None, "ABC")),
+    ("20150101 1930 - ABC - News_002.ts", ParsedName("standard", "20150101", "1930", "News", "002", "ABC")),
+    ("News - 20150101 1930_ABC.ts", ParsedName("event", "20150101", "1930", "News", None, None)),
+    ("News - Late - 20150101 1930_ABC.ts", ParsedName("event", "20150101", "1930", "News", None, None)),
+])
+def testParseName(fullname, parsed):
+    assert parseName(fullname) == parsed
+
+
+@pytest.mark.parametrize("fullname", [
+    "20150101 1930 - ABC - News.eit",
+    "20150101 1930 - ABC - News",
+    "News.ts",
+    "20151301 - News.ts",
+    "20150101 2460 - ABC - News.ts",
+    "",
+])
+def testUnknownNames(fullname):
+    assert parseName(fullname) is None
+
+
+def testFormatDateTime():
+    assert formatDateTime(parseName("20150102 1930 - ABC - News.ts")) == "02.01.2015 19:30"
+    assert formatDateTime(parseName("20150102 - News_012.ts")) == "02.01.2015#012"
+
+
+def testRegisterNamePattern(monkeypatch):
+    monkeypatch.setattr(NameParser, "_userPatterns", [])
+    registerNamePattern("other", r"(?P<show>.*?)_(?P<date>\d{8})_(?P<time>\d{4})$")
+    assert parseName("News_20150101_1930_001.ts") == ParsedName("other", "20150101", "1930", "News", "001", None)
+    # Registered patterns are tried before the built-in ones
+    registerNamePattern("first", r"(?P<date>\d{8}) (?P<show>.*)$")
+    assert parseName("20150101 1930 - ABC - News.ts").nameType == "first"
+
+
+def testRegisterNamePatternWithoutSuffixStripping(monkeypatch):
+    monkeypatch.setattr(NameParser, "_userPatterns", [])
+    registerNamePattern("other", r"(?P<show>.*?)_(?P<date>\d{8})_(?P<time>\d{4})$", stripSuffix=False)
+    assert parseName("News_20150101_1930.ts").nameType == "other"
+    assert parseName("News_20150101_1930_001.ts") is None
+
+
+def testRegisterNamePatternNeedsShowAndDate(monkeypatch):
+    monkeypatch.setattr(NameParser, "_userPatterns", [])
+    with pytest.raises(ValueError):
+        registerNamePattern("other", r"(?P<show>.*)$")
+    with pytest.raises(ValueError):
+        registerNamePattern("other", r"(?P<date>\d{8})$")
+    assert not NameParser._userPatterns
@@ -0,0 +1,93 @@
+import os
+
+from Plugins.Extensions.Series2Folder.RenameJournal import RenameJournal
+
+
+def makeFiles(dir, names):
+    for name in names:
+        with open(os.path.join(str(dir), name), "w") as f:
+            f.write(name)
+
+
+def recordingGroup(tmp_path):
+    src = tmp_path / "movie"
+    dst = src / "News"
+    dst.mkdir(parents=True)
+    exts = (".ts", ".ts.meta", ".eit")
+    base = "20150101 1900 - ABC - News"
+    makeFiles(src, [base + ext for ext in exts])
+    return src, dst, [(str(src / (base + ext)), str(dst / (base + ext))) for ext in exts]
+
+
+def testWriteRead(tmp_path):
+    journal = RenameJournal(str(tmp_path / "journal"))
+    assert not journal.pending()
+    groups = [[("/a", "/b/a"), ("/a.meta", "/b/a.meta")], [("/c", "/d/c")]]
+    journal.write(groups)
+    assert journal.pending()
+    assert journal.read() == groups
+    journal.remove()
+    assert not journal.pending()
+    assert journal.recover() == []
+
+
+def testRollForwardAfterCrashBetweenRenames(tmp_path):
+    src, dst, group = recordingGroup(tmp_path)
+    journal = RenameJournal(str(tmp_path / "journal"))
+    journal.write([group])
+    # Crash after the first rename of the recording
+    os.rename(*group[0])
+
+    assert journal.recover() == []
+    assert not journal.pending()
+    for fromPath, toPath in group:
+        assert not os.path.lexists(fromPath)
+        assert os.path.exists(toPath)
+
+
+def testRollBackWhenDestinationExists(tmp_path):
+    src, dst, group = recordingGroup(tmp_path)
+    journal = RenameJournal(str(tmp_path / "journal"))
+    journal.write([group])
+    os.rename(*group[0])
+    # Something else made the .eit destination after the crash
+    with open(group[2][1], "w") as f:
+        f.write("other")
+
+    errors = journal.recover()
+    assert len(errors) == 1
+    assert group[2][1] in errors[0]
+    assert not journal.pending()
+    for fromPath, toPath in group:
+        assert os.path.exists(fromPath)
+    assert not os.path.lexists(group[0][1])
+    with open(group[2][1]) as f:
+        assert f.read() == "other"
+
+
+def testCompleteAndUnstartedGroupsAreLeft(tmp_path):
+    src, dst, group = recordingGroup(tmp_path)
+    base = "20150102 1900 - ABC - News"
+    moved = [(str(src / (base + ext)), str(dst / (base + ext))) for ext in (".ts", ".eit")]
+    makeFiles(dst, [base + ext for ext in (".ts", ".eit")])
+    journal = RenameJournal(str(tmp_path / "journal"))
+    journal.write([group, moved])
+
+    assert journal.recover() == []
+    for fromPath, toPath in group:
+        assert os.path.exists(fromPath)
+        assert not os.path.lexists(toPath)
+    for fromPath, toPath in moved:
+        assert not os.path.lexists(fromPath)
+        assert os.path.exists(toPath)
+
+
+def testUnreadableJournalIsRemoved(tmp_path):
+    src, dst, group = recordingGroup(tmp_path)
+    filename = tmp_path / "journal"
+    filename.write_text('{"version": 1, "groups": [[["%s", ' % group[0][0])
+    journal = RenameJournal(str(filename))
+    assert journal.pending()
+    assert journal.recover() == []
+    assert not journal.pending()
+    assert os.path.exists(group[0][0])
@@ -0,0 +1,87 @@
+import threading
+
+import pytest
+
+from Plugins.Extensions.Series2Folder import RunStats as RunStatsModule
+from Plugins.Extensions.Series2Folder.RunStats import RunStats, recentReport, dumpRecent
+
+
+# Run each test with no recent runs
+
+@pytest.fixture(autouse=True)
+def recentRuns(monkeypatch):
+    runs = RunStatsModule.deque(maxlen=RunStatsModule.MAX_RUNS)
+    monkeypatch.setattr(RunStatsModule, "recentRuns", runs)
+    return runs
+
+
+def testCountsAndTimes():
+    stats = RunStats("manual")
+    stats.count("stat")
+    stats.count("stat", 6)
+    stats.deferred("task")
+    stats.deferred("task")
+    with stats.timing("scan"):
+        pass
+    with pytest.raises(ValueError):
+        with stats.timing("rename"):
+            raise ValueError()
+    assert stats.counts == {"stat": 7}
+    assert stats.deferrals == {"task": 2}
+    assert set(stats.times) == set(("scan", "rename"))
+
+
+def testCountsFromThreads():
+    stats = RunStats("manual")
+
+    def count():
+        for i in range(1000):
+            stats.count("stat")
+    workers = [threading.Thread(target=count) for i in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert stats.counts["stat"] == 4000
+
+
+def testRecentRuns(recentRuns):
+    for i in range(RunStatsModule.MAX_RUNS + 2):
+        stats = RunStats("background")
+        stats.done()
+        stats.done()
+    assert len(recentRuns) == RunStatsModule.MAX_RUNS
+    assert recentRuns[-1] is stats
+
+
+def testReport():
+    stats = RunStats("background")
+    stats.count("listdir", 2)
+    stats.deferred("file screen")
+    stats.done()
+    lines = stats.report().split("\n")
+    assert lines[0].startswith("background run at ")
+    assert [item.split()[0] for item in lines[1].split(", ")] == list(RunStatsModule.PHASES)
+    assert lines[2] == "  listdir 2"
+    assert lines[3] == "  deferred: file screen 1"
+
+
+def testRecentReport():
+    assert recentReport().startswith("No Series to Folder runs")
+    first = RunStats("manual")
+    first.done()
+    second = RunStats("background")
+    second.done()
+    report = recentReport()
+    assert report.index("background run") < report.index("manual run")
+
+
+def testDumpRecent(tmp_path, monkeypatch):
+    RunStats("manual").done()
+    logfile = str(tmp_path / "stats.log")
+    monkeypatch.setattr(RunStatsModule, "LOGFILE", logfile)
+    assert dumpRecent() == logfile
+    with open(logfile) as f:
+        assert f.read() == recentReport() + "\n"
+    monkeypatch.setattr(RunStatsModule, "LOGFILE", str(tmp_path / "missing" / "stats.log"))
+    assert dumpRecent() is None
@@ -0,0 +1,1234 @@
+import os
+import struct
+import time
+
+import enigma
+import pytest
+
+from Plugins.Extensions.Series2Folder import DirWatcher
+from Plugins.Extensions.Series2Folder.IndexSnapshot import indexSnapshot
+from Plugins.Extensions.Series2Folder.plugin import ChangeSet, Series2FolderActions, Series2FolderAutoActions
+
+
+@pytest.fixture
+def actions(session, movieDir):
+    return Series2FolderActions(session)
+
+
+# Plan the moves for the recordings in dir, with the current
+# settings, and return {recording name: (folder, reason, skipped)}
+
+def planFolder(actions, dir):
+    dir = str(dir)
+    actions.prepare(None)
+    plan = actions.planFolder(dir, actions.listDir(dir))
+    return dict((entry.rec.name, (entry.foldername, entry.reason, entry.skipped)) for entry in plan)
+
+
+# Write a .eit file for a recording with text as its short
+# event descriptor's text
+
+def writeEit(dir, fullname, text):
+    text = b"\x15" + text.encode("utf-8")
+    body = b"eng\x00" + struct.pack(">B", len(text)) + text
+    descriptor = struct.pack(">BB", 0x4D, len(body)) + body
+    with open(os.path.join(str(dir), os.path.splitext(fullname)[0] + ".eit"), "wb") as f:
+        f.write(struct.pack(">H5s3sH", 1, b"\0" * 5, b"\0\x30\0", len(descriptor)) + descriptor)
+
+
+@pytest.mark.parametrize("name, key", [
+    ("Doctor Who", "doctor who"),
+    ("DOCTOR WHO", "doctor who"),
+    ("  Doctor  Who ", "doctor who"),
+    ("Doctor_Who", "doctor who"),
+    ("Doctor-Who!", "doctor who"),
+    ("Doctor: Who?", "doctor who"),
+    ("Grey's Anatomy", "grey s anatomy"),
+    ("Stra\xdfe", "strasse"),
+    (b"Doctor Who", "doctor who"),
+    ("!!!", "!!!"),
+])
+def testSeriesKey(actions, name, key):
+    assert actions.seriesKey(name) == key
+
+
+def testSeriesGroupedByKey(actions, movieDir, makeRecording):
+    first = makeRecording(movieDir, "Doctor Who", 1)
+    second = makeRecording(movieDir, "DOCTOR WHO", 2)
+    third = makeRecording(movieDir, "Doctor-Who", 3)
+    lone = makeRecording(movieDir, "Lone", 4)
+    plan = planFolder(actions, movieDir)
+    for name in (first, second, third):
+        assert plan[name] == ("Doctor Who", "count", None)
+    assert plan[lone] == (None, None, "few")
+
+
+def testExistingFolderMatchedByKey(actions, movieDir, makeRecording):
+    (movieDir / "doctor who").mkdir()
+    name = makeRecording(movieDir, "Doctor Who", 1)
+    assert planFolder(actions, movieDir)[name] == ("doctor who", "existing", None)
+
+
+def testSeriesFolderItselfIsLeft(actions, movieDir, makeRecording):
+    folder = movieDir / "Doctor Who"
+    folder.mkdir()
+    makeRecording(folder, "Doctor Who", 1)
+    makeRecording(folder, "Doctor Who", 2)
+    assert planFolder(actions, folder) == {}
+
+
+def testRuleFolders(actions, movieDir, configDir, makeRecording):
+    (configDir / "series2folder.rules").write_text(
+        "channel: abc kids => Kids/{series}\n"
+        "title: ^news => News/{channel}\n"
+        "bad rule\n"
+    )
+    bluey = makeRecording(movieDir, "Bluey", 1, channel="ABC Kids")
+    news = makeRecording(movieDir, "News", 2, channel="SBS")
+    other = makeRecording(movieDir, "Other", 3)
+    plan = planFolder(actions, movieDir)
+    assert plan[bluey] == ("Kids/Bluey", "rule", None)
+    assert plan[news] == ("News/SBS", "rule", None)
+    assert plan[other] == (None, None, "few")
+    assert len(actions.errMess) == 1
+
+
+@pytest.mark.parametrize("subfolder, levels, path", [
+    ("", ["Kids", "Bluey"], "Kids/Bluey"),
+    ("Kids", ["Kids", "Bluey"], "Bluey"),
+    ("kids", ["Kids", "Bluey", "Season 1"], "Bluey/Season 1"),
+    ("Kids/Bluey", ["Kids", "Bluey", "Season 1"], "Season 1"),
+    ("Kids/Bluey", ["Bluey", "Season 1"], "Season 1"),
+    ("Kids/Bluey", ["Kids", "Bluey"], None),
+    ("Kids/Bluey", ["Bluey"], None),
+    ("Kids", ["Bluey"], "Bluey"),
+    ("Kids", [" ", ".", ".."], None),
+    ("Kids", [], None),
+])
+def testFolderPath(actions, movieDir, subfolder, levels, path):
+    actions.prepare(None)
+    actions.startRoot(os.path.join(str(movieDir), subfolder))
+    assert actions.folderPath(levels) == path
+
+
+# A folder in another destination root keeps all its levels, even
+# if the run is in a subfolder whose name matches them
+
+@pytest.mark.parametrize("subfolder, levels, path", [
+    ("", ["Doctor Who", "Season 3"], "Doctor Who/Season 3"),
+    ("Doctor Who", ["Doctor Who", "Season 3"], "Doctor Who/Season 3"),
+    ("Doctor Who", ["Season 3"], "Season 3"),
+])
+def testFolderPathInDestRoot(actions, movieDir, tmp_path, settings, subfolder, levels, path):
+    settings("destroot", str(tmp_path / "archive"))
+    actions.prepare(None)
+    actions.startRoot(os.path.join(str(movieDir), subfolder))
+    assert actions.folderPath(levels) == path
+
+
+def testFolderPathIsDestRoot(actions, movieDir, tmp_path, settings):
+    settings("destroot", str(tmp_path / "archive"))
+    actions.prepare(None)
+    actions.startRoot(str(tmp_path / "archive" / "Doctor Who" / "Season 3"))
+    assert actions.folderPath(["Doctor Who", "Season 3"]) is None
+    assert actions.folderPath(["Doctor Who", "Season 4"]) == "Doctor Who/Season 4"
+
+
+def testRuleFolderInDestRootFromSubfolder(actions, movieDir, configDir, tmp_path, settings, makeRecording):
+    (configDir / "series2folder.rules").write_text("channel: abc kids => Kids/{series}\n")
+    settings("destroot", str(tmp_path / "archive"))
+    kids = movieDir / "Kids"
+    kids.mkdir()
+    bluey = makeRecording(kids, "Bluey", 1, channel="ABC Kids")
+    actions.prepare(None)
+    entry, = actions.planFolder(str(kids), actions.listDir(str(kids)))
+    assert entry.rec.name == bluey
+    assert entry.foldername == "Kids/Bluey"
+    assert entry.destDir == str(tmp_path / "archive" / "Kids" / "Bluey")
+
+
+def testSeasonFolders(actions, movieDir, settings, makeRecording):
+    settings("seasonfolders", True)
+    folder = movieDir / "Doctor Who"
+    folder.mkdir()
+    first = makeRecording(movieDir, "Doctor Who", 1)
+    writeEit(movieDir, first, "S02E03 The thing")
+    second = makeRecording(movieDir, "Doctor Who", 2)
+    writeEit(movieDir, second, "no season")
+    third = makeRecording(folder, "Doctor Who", 3)
+    writeEit(folder, third, "Series 3, Episode 1")
+    fourth = makeRecording(folder, "Doctor Who", 4)
+    writeEit(folder, fourth, "no season")
+
+    plan = planFolder(actions, movieDir)
+    assert plan[first] == ("Doctor Who/Season 2", "season", None)
+    assert plan[second] == ("Doctor Who", "existing", None)
+    plan = planFolder(actions, folder)
+    assert plan == {third: ("Season 3", "season", None)}
+
+
+def testSeasonFolderInDestRootFromSubfolder(actions, movieDir, tmp_path, settings, makeRecording):
+    settings("seasonfolders", True)
+    settings("destroot", str(tmp_path / "archive"))
+    folder = movieDir / "Doctor Who"
+    folder.mkdir()
+    name = makeRecording(folder, "Doctor Who", 1)
+    writeEit(folder, name, "Series 3, Episode 1")
+    actions.prepare(None)
+    entry, = actions.planFolder(str(folder), actions.listDir(str(folder)))
+    assert (entry.foldername, entry.reason, entry.skipped) == ("Doctor Who/Season 3", "season", None)
+    assert entry.destDir == str(tmp_path / "archive" / "Doctor Who" / "Season 3")
+
+
+def makeSeries(movieDir, makeRecording):
+    names = [makeRecording(movieDir, "News", day) for day in (1, 2)]
+    names += [makeRecording(movieDir, "Sport", day) for day in (3, 4)]
+    return names
+
+
+def testPlanDoesntChangeFolders(actions, movieDir, makeRecording):
+    makeSeries(movieDir, makeRecording)
+    before = sorted(os.listdir(str(movieDir)))
+    planFolder(actions, movieDir)
+    assert sorted(os.listdir(str(movieDir))) == before
+
+
+def testApplyPlan(actions, movieDir, session, makeRecording):
+    names = makeSeries(movieDir, makeRecording)
+    actions.prepare(None)
+    plan = actions.planFolder(str(movieDir), actions.listDir(str(movieDir)))
+    assert [entry.describe() for entry in plan if entry.skipped] == []
+
+    other = Series2FolderActions(session)
+    other.prepare(None)
+    other.applyPlan(plan)
+    assert [error for rec, error in other.moves] == [""] * 4
+    assert sorted(os.listdir(str(movieDir))) == ["News", "Sport"]
+    assert sorted(os.listdir(str(movieDir / "News"))) == sorted(
+        name[:-3] + ext for name in names[:2] for ext in (".ts", ".ts.meta", ".eit"))
+
+
+def testApplyPlanSkipsChangedFiles(actions, movieDir, session, makeRecording):
+    names = makeSeries(movieDir, makeRecording)
+    actions.prepare(None)
+    plan = actions.planFolder(str(movieDir), actions.listDir(str(movieDir)))
+    os.remove(str(movieDir / (names[0][:-3] + ".eit")))
+    (movieDir / "Sport").mkdir()
+    (movieDir / "Sport" / names[2]).write_text("")
+
+    other = Series2FolderActions(session)
+    other.prepare(None)
+    other.applyPlan(plan)
+    skipped = dict((entry.rec.name, entry.skipped) for entry in plan)
+    assert skipped == {names[0]: "changed", names[1]: None, names[2]: "changed", names[3]: None}
+    assert "changed since the plan was made" in [entry for entry in plan if entry.skipped][0].describe()
+    assert os.path.exists(str(movieDir / names[0]))
+    assert os.path.exists(str(movieDir / "News" / names[1]))
+
+
+def testApplyPlanAfterDestRootChange(actions, movieDir, session, tmp_path, settings, makeRecording):
+    makeSeries(movieDir, makeRecording)
+    actions.prepare(None)
+    plan = actions.planFolder(str(movieDir), actions.listDir(str(movieDir)))
+    settings("destroot", str(tmp_path / "archive"))
+
+    other = Series2FolderActions(session)
+    other.prepare(None)
+    other.applyPlan(plan)
+    assert set(entry.skipped for entry in plan) == set(("changed", ))
+    assert not os.path.exists(str(tmp_path / "archive"))
+    assert len(os.listdir(str(movieDir))) == 12
+
+
+def testDryRunLeavesJournal(actions, movieDir, makeRecording):
+    from Plugins.Extensions.Series2Folder.RenameJournal import renameJournal
+
+    name = makeRecording(movieDir, "News", 1)
+    group = [(str(movieDir / name), str(movieDir / "News" / name))]
+    renameJournal.write([group])
+    actions.prepare(None, dryRun=True)
+    assert renameJournal.pending()
+    assert len(actions.errMess) == 1
+    actions.prepare(None)
+    assert not renameJournal.pending()
+    assert actions.errMess == []
+
+
+@pytest.fixture
+def autoActions(session, movieDir):
+    instances = []
+
+    def make():
+        actions = Series2FolderAutoActions(session)
+        instances.append(actions)
+        return actions
+    yield make
+    for actions in instances:
+        actions.__del__()
+
+
+def runBackground(actions):
+    while actions.iterTimer.isActive() or actions.runTimer.isActive():
+        enigma.runMainLoop(limit=1)
+
+
+def testIndexSavedAfterBackgroundRun(autoActions, movieDir, makeRecording):
+    makeSeries(movieDir, makeRecording)
+    actions = autoActions()
+    actions.runMoves()
+    runBackground(actions)
+    assert sorted(os.listdir(str(movieDir))) == ["News", "Sport"]
+    snapshot = indexSnapshot.load()
+    assert snapshot is not None
+    assert [folder[0] for folder in snapshot["folders"]] == [actions.roots[0]]
+
+
+def testWarmStartFromSnapshot(autoActions, movieDir, makeRecording):
+    makeSeries(movieDir, makeRecording)
+    actions = autoActions()
+    actions.autoStart()
+    runBackground(actions)
+    actions.autoStop()
+
+    # A recording made while Series2Folder wasn't running
+    name = makeRecording(movieDir, "News", 5)
+    os.utime(str(movieDir), (0, 0))
+    actions = autoActions()
+    actions.autoStart()
+    runBackground(actions)
+    assert actions.incremental
+    assert os.path.exists(str(movieDir / "News" / name))
+
+
+def testSnapshotForOtherSettingsIsntUsed(autoActions, movieDir, settings, makeRecording):
+    makeSeries(movieDir, makeRecording)
+    actions = autoActions()
+    actions.autoStart()
+    runBackground(actions)
+    actions.autoStop()
+
+    settings("scandepth", "1")
+    actions = autoActions()
+    actions.autoStart()
+    runBackground(actions)
+    assert not actions.incremental
+
+
+def testChangeSet():
+    changes = ChangeSet()
+    assert len(changes) == 0
+    changes.moved.append(("/movie/a.ts", "/movie/News"))
+    changes.moved.append(("/movie/b.ts", "/movie/Kids/Bluey/Season 1"))
+    changes.moved.append(("/movie/Kids/c.ts", "/movie/Kids/Bluey"))
+    changes.folders.append("/movie/Kids/Bluey")
+    assert len(changes) == 4
+    assert changes.removedFrom("/movie") == set(("/movie/a.ts", "/movie/b.ts"))
+    assert changes.removedFrom("/movie/News") == set()
+    assert changes.addedTo("/movie/News")
+    assert changes.addedTo("/movie/Kids")
+    assert not changes.addedTo("/movie")
+    assert changes.changedFolders("/movie") == set(("/movie/News", "/movie/Kids"))
+    assert changes.changedFolders("/movie/Kids") == set(("/movie/Kids/Bluey", ))
+    assert changes.changedFolders("/other") == set()
+
+
+class ServiceRef(object):
+    def __init__(self, path):
+        self.path = path
+
+    def getPath(self):
+        return self.path
+
+
+class MovieList(object):
+    def __init__(self, dir, names):
+        self.root = ServiceRef(dir + "/")
+        self.list = [(ServiceRef(os.path.join(dir, name)), ) for name in names] + [(None, )]
+        self.invalidated = []
+
+    def removeService(self, serviceRef):
+        self.list = [row for row in self.list if row[0] is not serviceRef]
+
+    def invalidateItem(self, i):
+        self.invalidated.append(i)
+
+
+def rowNames(movieList):
+    return [os.path.basename(row[0].getPath()) for row in movieList.list if row[0]]
+
+
+def testUpdateInPlace(actions, movieDir, makeRecording):
+    (movieDir / "News").mkdir()
+    names = makeSeries(movieDir, makeRecording)
+    actions.prepare(None)
+    plan = actions.planFolder(str(movieDir), actions.listDir(str(movieDir)))
+    actions.applyPlan([entry for entry in plan if entry.rec.showname == "News"])
+    assert actions.changes.folders == []
+
+    movieList = MovieList(str(movieDir), ["News"] + names)
+    assert actions.updateInPlace({"list": movieList})
+    assert rowNames(movieList) == ["News"] + names[2:]
+    assert movieList.invalidated == [0]
+
+
+def testUpdateInPlaceNeedsReload(actions, movieDir, makeRecording):
+    names = makeSeries(movieDir, makeRecording)
+    actions.prepare(None)
+    actions.applyPlan(actions.planFolder(str(movieDir), actions.listDir(str(movieDir))))
+    assert sorted(actions.changes.folders) == [str(movieDir / "News"), str(movieDir / "Sport")]
+
+    # Rows for the new folders would need to be added
+    movieList = MovieList(str(movieDir), names)
+    assert not actions.updateInPlace({"list": movieList})
+    assert rowNames(movieList) == names
+    # Screens without a movie list
+    assert not actions.updateInPlace({})
+    assert not actions.updateInPlace(object())
+
+
+# os.rename(), failing for the renames in fails, given as
+# (fromPath, toPath) pairs matched by their endings
+
+def failingRename(monkeypatch, fails):
+    rename = os.rename
+
+    def failing(fromPath, toPath):
+        if any(fromPath.endswith(fromEnd) and toPath.endswith(toEnd) for fromEnd, toEnd in fails):
+            raise OSError(13, "Permission denied", toPath)
+        rename(fromPath, toPath)
+    monkeypatch.setattr(os, "rename", failing)
+
+
+def testFailedRenameIsUndone(actions, movieDir, monkeypatch, makeRecording):
+    from Plugins.Extensions.Series2Folder.RenameJournal import renameJournal
+
+    names = [makeRecording(movieDir, "News", day) for day in (1, 2)]
+    failingRename(monkeypatch, [(names[0] + ".meta", "News/" + names[0] + ".meta")])
+    actions.prepare(None)
+    actions.applyPlan(actions.planFolder(str(movieDir), actions.listDir(str(movieDir))))
+    assert dict((rec.name, error) for rec, error in actions.moves) == {names[0]: " - Error", names[1]: ""}
+    assert len(actions.errMess) == 1
+    assert sorted(os.listdir(str(movieDir))) == sorted(["News"] + [names[0][:-3] + ext for ext in (".ts", ".ts.meta", ".eit")])
+    assert sorted(os.listdir(str(movieDir / "News"))) == sorted(names[1][:-3] + ext for ext in (".ts", ".ts.meta", ".eit"))
+    assert not renameJournal.pending()
+
+
+def testFailedUndoKeepsJournal(actions, movieDir, monkeypatch, makeRecording):
+    from Plugins.Extensions.Series2Folder.RenameJournal import renameJournal
+
+    names = [makeRecording(movieDir, "News", day) for day in (1, 2)]
+    eit = names[0][:-3] + ".eit"
+    fails = [(names[0] + ".meta", "News/" + names[0] + ".meta"), ("News/" + eit, eit)]
+    failingRename(monkeypatch, fails)
+    actions.prepare(None)
+    actions.applyPlan(actions.planFolder(str(movieDir), actions.listDir(str(movieDir))))
+    assert len(actions.errMess) == 2
+    assert os.path.exists(str(movieDir / "News" / eit))
+    assert renameJournal.pending()
+    group, = renameJournal.read()
+    assert group[0] == (str(movieDir / names[0]), str(movieDir / "News" / names[0]))
+
+    # The next run completes the move
+    del fails[:]
+    actions.prepare(None)
+    assert actions.errMess == []
+    assert not renameJournal.pending()
+    assert sorted(os.listdir(str(movieDir))) == ["News"]
+
+
+class Service(object):
+    pass
+
+
+# A SWIG proxy for a service: proxies for the same service are
+# different objects that don't compare equal
+
+class ServiceProxy(object):
+    def __init__(self, service):
+        self.service = service
+
+    def __deref__(self):
+        return self.service
+
+
+class RecordTimerEntry(object):
+    def __init__(self, filename, recordService=None, end=0):
+        self.Filename = filename
+        self.record_service = recordService
+        self.end = end
+
+
+@pytest.fixture
+def recordTimers(monkeypatch):
+    import NavigationInstance
+
+    recordTimer = NavigationInstance.instance.RecordTimer
+    monkeypatch.setattr(recordTimer, "timer_list", [])
+    monkeypatch.setattr(recordTimer, "processed_timers", [])
+    return recordTimer
+
+
+def indexedActions(autoActions, movieDir, makeRecording):
+    makeRecording(movieDir, "Sport", 1)
+    actions = autoActions()
+    actions.runMoves()
+    runBackground(actions)
+    assert not actions.needFullScan
+    return actions
+
+
+def testRecordStoppedQueuesRecording(autoActions, movieDir, recordTimers, makeRecording):
+    actions = indexedActions(autoActions, movieDir, makeRecording)
+    service = Service()
+    name = makeRecording(movieDir, "News", 2)
+    other = makeRecording(movieDir, "News", 3)
+    recordTimers.timer_list.append(RecordTimerEntry(str(movieDir / other)[:-3], ServiceProxy(Service())))
+    recordTimers.processed_timers.append(RecordTimerEntry(str(movieDir / name)[:-3], ServiceProxy(service)))
+    actions.gotRecordEvent(ServiceProxy(service), enigma.iRecordableService.evRecordStopped)
+    assert actions.pendingFiles == {actions.roots[0].rstrip("/"): set((name, ))}
+    assert not actions.needFullScan
+    assert actions.runTimer.isActive()
+
+
+def testRecordStoppedFindsEndedTimer(autoActions, movieDir, recordTimers, makeRecording):
+    actions = indexedActions(autoActions, movieDir, makeRecording)
+    name = makeRecording(movieDir, "News", 2)
+    old = makeRecording(movieDir, "News", 3)
+    recordTimers.processed_timers.append(RecordTimerEntry(str(movieDir / old)[:-3], end=time.time() - 3600))
+    recordTimers.processed_timers.append(RecordTimerEntry(str(movieDir / name)[:-3], end=time.time()))
+    actions.gotRecordEvent(ServiceProxy(Service()), enigma.iRecordableService.evRecordStopped)
+    assert actions.pendingFiles == {actions.roots[0].rstrip("/"): set((name, ))}
+    assert not actions.needFullScan
+
+
+def testRecordStoppedWithoutTimer(autoActions, movieDir, recordTimers, makeRecording):
+    actions = indexedActions(autoActions, movieDir, makeRecording)
+    actions.gotRecordEvent(ServiceProxy(Service()), enigma.iRecordableService.evRecordStopped)
+    assert actions.needFullScan
+
+
+@pytest.fixture
+def job(monkeypatch):
+    from Components.Task import Job, job_manager
+
+    monkeypatch.setattr(job_manager, "active_jobs", [])
+    return Job("test job")
+
+
+def endJob(job):
+    from Components.Task import job_manager
+
+    job_manager.active_jobs.remove(job)
+    for callback in list(job.state_changed):
+        callback(job)
+
+
+def testIncrementalRunResumedAfterDeferral(autoActions, movieDir, job, makeRecording):
+    from Components.Task import job_manager
+
+    actions = indexedActions(autoActions, movieDir, makeRecording)
+    names = [makeRecording(movieDir, "News", day) for day in (2, 3)]
+    for name in names:
+        actions.addPending(str(movieDir / name))
+
+    job_manager.active_jobs.append(job)
+    actions.runMoves()
+    while not actions.deferred:
+        enigma.runMainLoop(limit=1)
+    assert actions.incremental
+    assert actions.deferralEvent in job.state_changed
+
+    endJob(job)
+    runBackground(actions)
+    assert not actions.deferred
+    assert actions.incremental
+    assert sorted(os.listdir(str(movieDir / "News"))) == sorted(name[:-3] + ext for name in names for ext in (".ts", ".ts.meta", ".eit"))
+
+
+def testRestartAfterIndexUpdateStartedScansAll(autoActions, movieDir, makeRecording):
+    actions = indexedActions(autoActions, movieDir, makeRecording)
+    name = makeRecording(movieDir, "News", 2)
+    actions.addPending(str(movieDir / name))
+    actions.runMoves()
+    assert actions.incremental
+    while not actions.plan:
+        enigma.runMainLoop(limit=1)
+
+    actions.runMoves()
+    assert not actions.incremental
+    runBackground(actions)
+    assert not actions.needFullScan
+
+
+# The recording folder is a root of the run, not a series folder,
+# even if a series has the same name
+
+def testSeriesNamedLikeRoot(actions, movieDir, configDir, makeRecording):
+    (configDir / "series2folder.rules").write_text("channel: sbs => Movie/{year}\n")
+    names = [makeRecording(movieDir, "Movie", day) for day in (1, 2)]
+    rule = makeRecording(movieDir, "Film", 3, channel="SBS")
+    plan = planFolder(actions, movieDir)
+    assert plan == {
+        names[0]: ("Movie", "count", None),
+        names[1]: ("Movie", "count", None),
+        rule: ("Movie/2015", "rule", None),
+    }
+
+
+def testSeriesFolderBelowRoot(actions, movieDir, configDir, makeRecording):
+    (configDir / "series2folder.rules").write_text("channel: sbs => Movie/{year}\n")
+    folder = movieDir / "Movie"
+    folder.mkdir()
+    makeRecording(folder, "Movie", 1)
+    rule = makeRecording(folder, "Film", 3, channel="SBS")
+    assert planFolder(actions, folder) == {rule: ("2015", "rule", None)}
+
+
+def runManual(actions, **kwargs):
+    actions.doMoves(**kwargs)
+    waitManual(actions)
+
+
+def waitManual(actions):
+    while actions.prefetchTimer.isActive():
+        time.sleep(0.001)
+        enigma.runMainLoop(limit=1)
+
+
+def testDryRunPreview(actions, movieDir, session, configDir, makeRecording):
+    (configDir / "series2folder.rules").write_text("bad rule\n")
+    names = [makeRecording(movieDir, "News", day) for day in (1, 2)]
+    runManual(actions, dryRun=True)
+    args, kwargs = session.opened[-1]
+    lines = kwargs["text"].split("\n")
+    assert lines[2] == "--------"
+    assert lines[3].startswith("Folder rules line 1")
+    assert sorted(os.listdir(str(movieDir))) == sorted(name[:-3] + ext for name in names for ext in (".ts", ".ts.meta", ".eit"))
+
+
+def testDryRunPreviewWithoutMoves(actions, movieDir, session, configDir, makeRecording):
+    (configDir / "series2folder.rules").write_text("bad rule\n")
+    makeRecording(movieDir, "News", 1)
+    runManual(actions, dryRun=True)
+    args, kwargs = session.opened[-1]
+    assert kwargs["text"].startswith("Folder rules line 1")
+
+
+def testDirEvents(autoActions, movieDir, makeRecording):
+    actions = indexedActions(autoActions, movieDir, makeRecording)
+    dir = actions.roots[0]
+    name = makeRecording(movieDir, "News", 2)
+    actions.gotDirEvent(dir, name[:-3] + ".ts.meta", DirWatcher.IN_CLOSE_WRITE)
+    actions.gotDirEvent(dir, "notes.txt", DirWatcher.IN_CLOSE_WRITE)
+    assert actions.pendingFiles == {dir: set((name, ))}
+    assert actions.runTimer.isActive()
+    actions.gotDirEvent(dir, name, DirWatcher.IN_DELETE)
+    assert actions.pendingFiles == {dir: set()}
+
+    actions.gotDirEvent(dir, "News", DirWatcher.IN_CREATE | DirWatcher.IN_ISDIR)
+    assert "News" in actions.indexes[dir][1]
+    actions.gotDirEvent(dir, "News", DirWatcher.IN_MOVED_FROM | DirWatcher.IN_ISDIR)
+    assert "News" not in actions.indexes[dir][1]
+    assert not actions.needFullScan
+
+    actions.gotDirEvent(None, None, DirWatcher.IN_Q_OVERFLOW)
+    assert actions.needFullScan
+
+
+@pytest.mark.parametrize("mask", ["IN_DELETE_SELF", "IN_MOVE_SELF", "IN_IGNORED"])
+def testLostWatch(autoActions, movieDir, makeRecording, mask):
+    actions = indexedActions(autoActions, movieDir, makeRecording)
+    dir = actions.roots[0]
+    actions.watchedDirs = set((dir, ))
+    actions.gotDirEvent(dir, "", getattr(DirWatcher, mask))
+    assert actions.watchedDirs == set()
+    assert actions.needFullScan
+
+
+@pytest.mark.skipif(not DirWatcher.isAvailable(), reason="inotify isn't available")
+def testWatchedFolder(autoActions, movieDir, settings, makeRecording):
+    settings("watchdir", True)
+    actions = indexedActions(autoActions, movieDir, makeRecording)
+    dir = actions.roots[0]
+    assert actions.watchedDirs == set((dir, ))
+    name = makeRecording(movieDir, "News", 2)
+    for callback in list(actions.dirWatcher.notifier.callback):
+        callback(actions.dirWatcher.fd)
+    assert actions.pendingFiles == {dir: set((name, ))}
+
+    settings("watchdir", False)
+    actions.updateWatch()
+    assert actions.dirWatcher is None
+    assert actions.watchedDirs == set()
+
+
+class Timer(object):
+    StateWaiting, StatePrepared, StateRunning, StateEnded = range(4)
+
+    def __init__(self, filename, state, justplay=False):
+        self.Filename = filename
+        self.state = state
+        self.justplay = justplay
+
+
+class PlayingService(object):
+    def __init__(self, path):
+        self.path = path
+
+    def valid(self):
+        return bool(self.path)
+
+    def getPath(self):
+        return self.path
+
+
+@pytest.fixture
+def playing(monkeypatch):
+    import NavigationInstance
+
+    def play(path):
+        monkeypatch.setattr(NavigationInstance.instance, "playing", PlayingService(path))
+    return play
+
+
+def testBusyPaths(actions, movieDir, recordTimers, playing):
+    movie = str(movieDir)
+    recordTimers.timer_list += [
+        Timer(movie + "/recording", Timer.StateRunning),
+        Timer(movie + "/prepared", Timer.StatePrepared),
+        Timer(movie + "/waiting", Timer.StateWaiting),
+        Timer(movie + "/zap", Timer.StateRunning, justplay=True),
+    ]
+    playing(movie + "//News/played.ts")
+    assert actions.getBusyPaths() == frozenset((movie + "/recording.ts", movie + "/prepared.ts", movie + "/News/played.ts"))
+    playing("")
+    assert actions.getBusyPaths() == frozenset((movie + "/recording.ts", movie + "/prepared.ts"))
+
+
+def testBusyPathsSnapshot(actions, movieDir, recordTimers, monkeypatch):
+    from Plugins.Extensions.Series2Folder import plugin
+
+    now = [1000.0]
+    monkeypatch.setattr(plugin, "time", lambda: now[0])
+    actions.prepare(None)
+    path = str(movieDir / "recording.ts")
+    assert not actions.isBusy(path)
+    recordTimers.timer_list.append(Timer(path[:-3], Timer.StateRunning))
+    assert not actions.isBusy(path)
+    now[0] += actions.BUSY_REFRESH + 1
+    assert actions.isBusy(path)
+
+    del recordTimers.timer_list[:]
+    assert actions.isBusy(path)
+    actions.invalidateBusy()
+    assert not actions.isBusy(path)
+
+
+def testBusyRecordingIsntMoved(actions, movieDir, recordTimers, playing, makeRecording):
+    names = [makeRecording(movieDir, "News", day) for day in (1, 2, 3, 4)]
+    recordTimers.timer_list.append(Timer(str(movieDir / names[0])[:-3], Timer.StateRunning))
+    playing(str(movieDir / names[1]))
+    plan = planFolder(actions, movieDir)
+    assert plan == {
+        names[2]: ("News", "count", None),
+        names[3]: ("News", "count", None),
+    }
+
+
+def testRecordEventInvalidatesBusyPaths(session, movieDir, recordTimers):
+    import NavigationInstance
+
+    actions = Series2FolderActions(session)
+    actions.doMoves()
+    try:
+        actions.busyPaths()
+        assert actions.busyTime is not None
+        for callback in list(NavigationInstance.instance.record_event):
+            callback(None, enigma.iRecordableService.evRecordStopped)
+        assert actions.busyTime is None
+    finally:
+        while actions.prefetchTimer.isActive():
+            time.sleep(0.001)
+            enigma.runMainLoop(limit=1)
+    assert actions.invalidateBusy not in NavigationInstance.instance.record_event
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    from Plugins.Extensions.Series2Folder import plugin
+
+    now = [1000.0]
+    monkeypatch.setattr(plugin, "time", lambda: now[0])
+    return now
+
+
+# Run adaptSlice() for a step that is late by latency ms, after
+# a step that did or didn't use all its time
+
+def adaptSlice(actions, clock, latency, sliceUsed=True):
+    actions.stepDue = clock[0] - latency / 1000.0
+    actions.sliceUsed = sliceUsed
+    actions.adaptSlice()
+    return actions.stepSlice
+
+
+def testStepTimeGrowsWhileIdle(autoActions, clock):
+    actions = autoActions()
+    actions.stepSlice = actions.MIN_SLICE
+    assert adaptSlice(actions, clock, 0) == actions.MIN_SLICE + actions.SLICE_GROW
+    assert adaptSlice(actions, clock, actions.IDLE_LATENCY) == actions.MIN_SLICE + 2 * actions.SLICE_GROW
+    # Not while the UI has some work, or the last step had time left
+    assert adaptSlice(actions, clock, actions.IDLE_LATENCY + 1) == actions.MIN_SLICE + 2 * actions.SLICE_GROW
+    assert adaptSlice(actions, clock, 0, sliceUsed=False) == actions.MIN_SLICE + 2 * actions.SLICE_GROW
+    assert not actions.sliceUsed
+    for i in range(10):
+        adaptSlice(actions, clock, 0)
+    assert actions.stepSlice == actions.MAX_SLICE == 50
+
+
+def testStepTimeShrinksWhenBusy(autoActions, clock):
+    actions = autoActions()
+    actions.stepSlice = actions.MAX_SLICE
+    assert adaptSlice(actions, clock, actions.LATENCY_LIMIT) == actions.MAX_SLICE
+    assert adaptSlice(actions, clock, actions.LATENCY_LIMIT + 1, sliceUsed=False) == actions.MAX_SLICE // 2
+    assert adaptSlice(actions, clock, 500) == actions.MAX_SLICE // 4
+    for i in range(5):
+        adaptSlice(actions, clock, 500)
+    assert actions.stepSlice == actions.MIN_SLICE
+
+
+def testConfiguredStepTime(autoActions, clock, settings):
+    settings("stepslice", "100")
+    actions = autoActions()
+    assert adaptSlice(actions, clock, 500) == 100
+    assert adaptSlice(actions, clock, 0) == 100
+
+
+def testFirstStepTime(autoActions, clock):
+    actions = autoActions()
+    assert actions.stepSlice == actions.STEP_SLICE
+    # A step that wasn't scheduled isn't late
+    actions.stepSlice = actions.MIN_SLICE
+    actions.stepDue = None
+    actions.sliceUsed = True
+    actions.adaptSlice()
+    assert actions.stepSlice == actions.MIN_SLICE + actions.SLICE_GROW
+
+
+class FileScreen(object):
+    def __init__(self):
+        self.onClose = []
+
+
+# Open a registered file screen in the session, and return a
+# function that closes it
+
+@pytest.fixture
+def fileScreen(session, monkeypatch):
+    from Plugins.Extensions.Series2Folder import FileScreens
+
+    monkeypatch.setattr(FileScreens, "fileScreens", FileScreens.defaultdict(tuple))
+    monkeypatch.setattr(FileScreens, "__typeActions", {})
+    FileScreens.registerFileScreen(FileScreen)
+
+    def open():
+        dialog = FileScreen()
+        session.current_dialog = dialog
+
+        def close():
+            session.current_dialog = None
+            for callback in list(dialog.onClose):
+                callback()
+        return dialog, close
+    return open
+
+
+def runUntilDeferred(actions):
+    actions.runMoves()
+    while not actions.deferred:
+        enigma.runMainLoop(limit=1)
+
+
+# The deferral check after an event is the first timer to fire, so
+# a run that resumes after it doesn't wait for its deferral timer
+
+def checkResumed(actions):
+    assert actions.resumeTimer.isActive()
+    enigma.runMainLoop(limit=1)
+    assert not actions.deferred
+    assert actions.iterTimer.isActive()
+
+
+def testDeferralWatches(autoActions, movieDir, job, fileScreen, makeRecording):
+    from Components.Task import job_manager
+    from Components.config import config
+
+    makeSeries(movieDir, makeRecording)
+    actions = autoActions()
+    job_manager.active_jobs.append(job)
+    dialog, close = fileScreen()
+    runUntilDeferred(actions)
+    assert actions.deferralEvent in job.state_changed
+    assert actions.deferralEvent in dialog.onClose
+    assert actions.deferralEvent in config.timeshift.isRecording.notifiers
+
+    actions.unwatchDeferral()
+    assert not actions.deferred
+    assert actions.deferralEvent not in job.state_changed
+    assert actions.deferralEvent not in dialog.onClose
+    assert actions.deferralEvent not in config.timeshift.isRecording.notifiers
+
+
+def testResumeAfterJob(autoActions, movieDir, job, makeRecording):
+    from Components.Task import job_manager
+
+    makeSeries(movieDir, makeRecording)
+    actions = autoActions()
+    job_manager.active_jobs.append(job)
+    runUntilDeferred(actions)
+    endJob(job)
+    checkResumed(actions)
+    runBackground(actions)
+    assert sorted(os.listdir(str(movieDir))) == ["News", "Sport"]
+
+
+def testResumeAfterFileScreen(autoActions, movieDir, fileScreen, makeRecording):
+    makeSeries(movieDir, makeRecording)
+    actions = autoActions()
+    dialog, close = fileScreen()
+    runUntilDeferred(actions)
+    close()
+    checkResumed(actions)
+
+
+def testResumeAfterTimeshift(autoActions, movieDir, makeRecording):
+    from Components.config import config
+
+    makeSeries(movieDir, makeRecording)
+    actions = autoActions()
+    config.timeshift.isRecording.value = True
+    try:
+        runUntilDeferred(actions)
+    finally:
+        config.timeshift.isRecording.value = False
+    for notifier in list(config.timeshift.isRecording.notifiers):
+        notifier(config.timeshift.isRecording)
+    checkResumed(actions)
+
+
+# A file screen opened while a run is deferred by a job keeps it
+# deferred, and is watched in its turn
+
+def testDeferralRewatched(autoActions, movieDir, job, fileScreen, makeRecording):
+    from Components.Task import job_manager
+
+    makeSeries(movieDir, makeRecording)
+    actions = autoActions()
+    job_manager.active_jobs.append(job)
+    runUntilDeferred(actions)
+    dialog, close = fileScreen()
+    endJob(job)
+    enigma.runMainLoop(limit=1)
+    assert actions.deferred
+    assert actions.deferralEvent not in job.state_changed
+    assert actions.deferralEvent in dialog.onClose
+    assert actions.runTimer.isActive()
+
+    close()
+    checkResumed(actions)
+
+
+# A background run scans as many entries as fit in a step...
+
+def testStepScansBatch(autoActions, movieDir, clock, makeRecording):
+    makeSeries(movieDir, makeRecording)
+    actions = autoActions()
+    actions.runMoves()
+    runBackground(actions)
+    assert sorted(os.listdir(str(movieDir))) == ["News", "Sport"]
+    # One step for the scan and one for the moves
+    assert actions.stats.counts["step"] == 2
+
+
+# ... but always at least one, however long they take
+
+def testStepScansOneEntryWhenSlow(autoActions, movieDir, monkeypatch, makeRecording):
+    from Plugins.Extensions.Series2Folder import plugin
+
+    makeSeries(movieDir, makeRecording)
+    now = [1000.0]
+
+    def slowTime():
+        now[0] += 1
+        return now[0]
+    monkeypatch.setattr(plugin, "time", slowTime)
+    actions = autoActions()
+    actions.runMoves()
+    runBackground(actions)
+    assert sorted(os.listdir(str(movieDir))) == ["News", "Sport"]
+    # One step for each of the 12 files and each of the 4 moves
+    assert actions.stats.counts["step"] == 16
+
+
+def testListdirFallback(actions, movieDir, monkeypatch, makeRecording):
+    from Plugins.Extensions.Series2Folder import plugin
+
+    makeSeries(movieDir, makeRecording)
+    os.mkdir(str(movieDir / "Other"))
+    plan = planFolder(actions, movieDir)
+    monkeypatch.setattr(plugin, "scandir", None)
+    entries = actions.listDir(str(movieDir))
+    types = dict((entry.name, (entry.is_file(), entry.is_dir())) for entry in entries)
+    assert types.pop("Other") == (False, True)
+    assert len(types) == 12 and set(types.values()) == {(True, False)}
+    assert planFolder(actions, movieDir) == plan
+
+
+# A manual run reads the folders in worker threads, and does the
+# moves in the main thread
+
+def testManualRun(actions, movieDir, monkeypatch, makeRecording):
+    import threading
+    import NavigationInstance
+
+    makeSeries(movieDir, makeRecording)
+    threads = set()
+    classifyEntry = actions.classifyEntry
+
+    def classify(entry, rootdir):
+        threads.add(threading.current_thread())
+        return classifyEntry(entry, rootdir)
+    monkeypatch.setattr(actions, "classifyEntry", classify)
+
+    actions.doMoves()
+    assert Series2FolderActions.running is actions
+    assert actions.invalidateBusy in NavigationInstance.instance.record_event
+    waitManual(actions)
+    assert sorted(os.listdir(str(movieDir))) == ["News", "Sport"]
+    assert threads and threading.current_thread() not in threads
+    assert Series2FolderActions.running is None
+    assert actions.invalidateBusy not in NavigationInstance.instance.record_event
+    assert actions.invalidateBusy not in NavigationInstance.instance.event
+
+
+def testFailedManualRunIsCleanedUp(actions, movieDir, monkeypatch, makeRecording):
+    import NavigationInstance
+
+    makeSeries(movieDir, makeRecording)
+
+    def failing(*args):
+        raise RuntimeError("test failure")
+    monkeypatch.setattr(actions, "prefetchDone", failing)
+    with pytest.raises(RuntimeError):
+        runManual(actions)
+    assert not actions.prefetchTimer.isActive()
+    assert Series2FolderActions.running is None
+    assert actions.invalidateBusy not in NavigationInstance.instance.record_event
+
+
+def testManualRunRefused(actions, movieDir, session, monkeypatch, job, makeRecording):
+    from Components.Task import job_manager
+
+    names = makeSeries(movieDir, makeRecording)
+    monkeypatch.setattr(Series2FolderActions, "running", Series2FolderActions(session))
+    actions.doMoves()
+    monkeypatch.setattr(Series2FolderActions, "running", None)
+    job_manager.active_jobs.append(job)
+    actions.doMoves()
+    messages = [args[1] for args, kwargs in session.opened]
+    assert messages[0] == "Series to Folder is already running."
+    assert "running tasks" in messages[1]
+    assert not actions.prefetchTimer.isActive()
+    assert len(os.listdir(str(movieDir))) == 3 * len(names)
+
+
+# The recordings' other files are found from the folder listing
+
+def testIndexSiblings(actions, movieDir, makeRecording):
+    exts = (".ts", ".eit", ".ts.ap", ".ts.cuts", ".ts.meta", ".ts.sc")
+    full = makeRecording(movieDir, "News", 1, exts=exts)
+    bare = makeRecording(movieDir, "News", 2, exts=(".ts", ".ts.cuts"))
+    os.mkdir(str(movieDir / (bare[:-3] + ".eit")))
+    (movieDir / "Other.meta").write_text("")
+    (movieDir / "Other.ts.txt").write_text("")
+    siblings = actions.indexSiblings(actions.listDir(str(movieDir)))
+    assert siblings == {
+        full: sum(actions.SIBLING_BITS.values()),
+        bare: actions.SIBLING_BITS[".ts.cuts"],
+    }
+
+
+def testRecFileListFromSiblings(actions, movieDir, monkeypatch, makeRecording):
+    from Plugins.Extensions.Series2Folder import plugin
+    from Plugins.Extensions.Series2Folder.plugin import Recording
+
+    name = makeRecording(movieDir, "News", 1, exts=(".ts", ".eit", ".ts.meta", ".ts.sc"))
+    files = [name, name[:-3] + ".eit", name + ".meta", name + ".sc"]
+    siblings = actions.indexSiblings(actions.listDir(str(movieDir)))[name]
+    rec = Recording("News", name, None, None, "news")
+    assert sorted(actions.recFileList(str(movieDir), rec)) == sorted(files)
+
+    def noStat(path):
+        raise AssertionError("stat of " + path)
+    monkeypatch.setattr(plugin, "isfile", noStat)
+    rec.siblings = siblings
+    assert sorted(actions.recFileList(str(movieDir), rec)) == sorted(files)
+
+
+def testPlanMovesAllSiblings(actions, movieDir, makeRecording):
+    exts = (".ts", ".eit", ".ts.ap", ".ts.cuts", ".ts.meta", ".ts.sc")
+    names = [makeRecording(movieDir, "News", day, exts=exts) for day in (1, 2)]
+    actions.prepare(None)
+    plan = actions.planFolder(str(movieDir), actions.listDir(str(movieDir)))
+    assert sorted(os.path.basename(toPath) for entry in plan for fromPath, toPath in entry.renameList) == sorted(
+        name[:-3] + ext for name in names for ext in exts)
+
+
+@pytest.mark.parametrize("f, stem, num, suffixed", [
+    ("News.ts", "News", 0, "News_004.ts"),
+    ("News.eit", "News", 0, "News_004.eit"),
+    ("News.ts.meta", "News", 0, "News_004.ts.meta"),
+    ("News_012.ts", "News", 12, "News_004.ts"),
+    ("News_012.ts.cuts", "News", 12, "News_004.ts.cuts"),
+    ("News_12.ts", "News_12", 0, "News_12_004.ts"),
+    ("News_abc.eit", "News_abc", 0, "News_abc_004.eit"),
+])
+def testSuffixes(actions, f, stem, num, suffixed):
+    assert actions.splitSuffix(f) == (stem, num)
+    assert actions.addSuffix(f, "_004") == suffixed
+    assert actions.addSuffix(f, "") == f
+
+
+# Plan a move of a recording into an existing News folder that
+# holds recordings with the same name and the given suffixes, and
+# return the suffix given to the recording
+
+def collisionSuffix(actions, movieDir, makeRecording, suffixes):
+    folder = movieDir / "News"
+    folder.mkdir()
+    name = makeRecording(movieDir, "News", 1)
+    for suffix in suffixes:
+        for f in os.listdir(str(movieDir)):
+            if f.startswith(name[:-3]):
+                (folder / actions.addSuffix(f, suffix)).write_text("")
+    actions.prepare(None)
+    plan = actions.planFolder(str(movieDir), actions.listDir(str(movieDir)))
+    assert [entry.rec.name for entry in plan] == [name]
+    entry = plan[0]
+    assert [os.path.basename(toPath) for fromPath, toPath in entry.renameList] == [
+        actions.addSuffix(os.path.basename(fromPath), entry.suffix) for fromPath, toPath in entry.renameList]
+    return entry.suffix
+
+
+@pytest.mark.parametrize("suffixes, suffix", [
+    ((), ""),
+    (("", ), "_001"),
+    (("", "_003"), "_004"),
+    (("_003", ), ""),
+    (("", "_001", "_999"), "_002"),
+])
+def testCollisionSuffix(actions, movieDir, makeRecording, suffixes, suffix):
+    assert collisionSuffix(actions, movieDir, makeRecording, suffixes) == suffix
+
+
+# The planned names are added to the destination folder's index,
+# so later recordings in the run don't collide with them
+
+def testSuffixIndexUpdated(actions, movieDir, makeRecording):
+    assert collisionSuffix(actions, movieDir, makeRecording, ("", )) == "_001"
+    name = os.listdir(str(movieDir / "News"))[0]
+    stem = actions.splitSuffix(name)[0]
+    assert actions.addSuffix(name, "_001") in actions.folderContents("News")
+    assert actions.folderSuffixes("News")[stem] == 1
+    actions.addFolderName("News", actions.addSuffix(name, "_007"))
+    assert actions.folderSuffixes("News")[stem] == 7
+    actions.addFolderName("News", actions.addSuffix(name, "_002"))
+    assert actions.folderSuffixes("News")[stem] == 7
+    assert actions.addSuffix(name, "_002") in actions.folderContents("News")
+
+
+def testRunStatsRecorded(autoActions, movieDir, job, makeRecording):
+    from Components.Task import job_manager
+    from Plugins.Extensions.Series2Folder import RunStats
+
+    makeSeries(movieDir, makeRecording)
+    actions = autoActions()
+    job_manager.active_jobs.append(job)
+    runUntilDeferred(actions)
+    assert RunStats.recentRuns[-1].deferrals == {"task": 1}
+    endJob(job)
+    runBackground(actions)
+    stats = RunStats.recentRuns[-1]
+    assert stats.mode == "background" and stats.end is not None
+    assert stats.counts["rename"] == 12
+    assert stats.counts["listdir"] >= 1
+
+
+def testRecording():
+    from Plugins.Extensions.Series2Folder.plugin import Recording
+
+    start = time.mktime((2015, 1, 2, 20, 15, 0, 0, 0, -1))
+    rec = Recording("News", "20150102 2015 - ABC - News_002.ts", start, 3, "news", "Archive", 4)
+    assert not hasattr(rec, "__dict__")
+    assert str(rec) == "News - 02.01.2015 20:15#002"
+    # Without a start time from the .meta file, the file name's is used
+    rec.start = None
+    assert rec.dateTime() == "02.01.2015 20:15#002"
+    rec.name = "News.ts"
+    assert rec.dateTime() == ""
+
+
+def testRecordingTuple():
+    from Plugins.Extensions.Series2Folder.plugin import Recording
+
+    rec = Recording("News", "20150102 2015 - ABC - News.ts", 1420226100, 3, "news", "Archive", 4)
+    copy = Recording.fromTuple(rec.toTuple())
+    assert [getattr(copy, slot) for slot in Recording.__slots__] == ["News", "20150102 2015 - ABC - News.ts", 1420226100, None, "news", "Archive", 4]
+
+
+# The results of a run are formatted from its recordings when
+# they are shown
+
+def testMovesShown(actions, movieDir, session, makeRecording):
+    makeSeries(movieDir, makeRecording)
+    runManual(actions)
+    args, kwargs = session.opened[-1]
+    lines = args[1].split("\n")
+    assert sorted(lines[1:]) == sorted(
+        "%s - %s" % (show, time.strftime("%d.%m.%Y %H:%M", time.localtime(1420070400 + day * 86400)))
+        for show, day in (("News", 1), ("News", 2), ("Sport", 3), ("Sport", 4)))
+    assert actions.moves == []
+
+
+# An incremental run only reads the pending recordings, and the
+# index of their folder
+
+def testIncrementalRunReadsPendingOnly(autoActions, movieDir, monkeypatch, makeRecording):
+    actions = indexedActions(autoActions, movieDir, makeRecording)
+    names = [makeRecording(movieDir, "News", day) for day in (2, 3)]
+    makeRecording(movieDir, "Weather", 4)
+    read = []
+    classifyEntry = actions.classifyEntry
+
+    def classify(entry, rootdir):
+        read.append(entry.name)
+        return classifyEntry(entry, rootdir)
+    monkeypatch.setattr(actions, "classifyEntry", classify)
+    for name in names:
+        actions.addPending(str(movieDir / name))
+    actions.runMoves()
+    assert actions.incremental
+    runBackground(actions)
+    assert sorted(read) == sorted(names)
+    assert sorted(os.listdir(str(movieDir / "News"))) == sorted(name[:-3] + ext for name in names for ext in (".ts", ".ts.meta", ".eit"))
+
+
+@pytest.mark.parametrize("depth", ["0", "1"])
+def testScanDepth(actions, movieDir, settings, depth, makeRecording):
+    settings("scandepth", depth)
+    folder = movieDir / "Archive"
+    folder.mkdir()
+    names = [makeRecording(folder, "News", day) for day in (1, 2)]
+    runManual(actions)
+    moved = os.path.exists(str(folder / "News" / names[0]))
+    assert moved == (depth == "1")